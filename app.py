@@ -16,6 +16,8 @@ Welcome to the MTG Deck Builder application! This tool helps you manage your car
 ### 📋 Available Tools:
 - **Card Collection Manager**: Clean and update your card collection data using Scryfall API and Gemini AI
 - **Deck Builder**: Build optimized Commander and Standard decks from your collection
+- **Collection Search**: Search and browse your collection by name, card text, colors, mana value, rarity and set
+- **Run Metrics**: Throughput, cache hit rate, API calls and latency of past enrichment and deck-build runs
 
 ### 🚀 Getting Started:
 1. Navigate to **Card Collection Manager** to clean/update your CSV data
@@ -30,6 +32,10 @@ st.sidebar.info("""
 **Card Collection Manager**: Upload and clean your MTG card collection CSV
 
 **Deck Builder**: Generate optimized decks from your collection
+
+**Collection Search**: Find cards in your collection
+
+**Run Metrics**: Track enrichment and deck-build runs
 """)
 
 st.sidebar.markdown("---")
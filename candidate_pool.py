@@ -0,0 +1,141 @@
+import re
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from card_features import ROLES, extract_features
+from deck_drafter import card_name, is_land
+from synergy_graph import SynergyGraph
+
+NOTE_WORD = re.compile(r"[a-z][a-z'-]{3,}")
+STOPWORDS = {
+    'deck', 'decks', 'cards', 'card', 'with', 'that', 'this', 'focus', 'focused', 'want', 'some',
+    'more', 'less', 'like', 'make', 'very', 'good', 'best', 'strategy', 'please', 'into', 'from',
+    'have', 'should', 'would', 'build', 'play', 'lots', 'heavy', 'theme', 'themed', 'synergy',
+    'synergies', 'budget', 'friendly', 'competitive', 'casual', 'aggressive', 'control',
+}
+# Score per unit of synergy-graph weight with the commander
+SYNERGY_WEIGHT = 3.0
+# Default pool size: top K per role, K more creatures and other spells, K lands
+PER_ROLE_K = 40
+GENERAL_K = 80
+LAND_K = 40
+
+
+def note_terms(additional_notes: str) -> List[str]:
+    """Meaningful words from the user's notes (e.g. 'tribal allies' -> ['tribal', 'allies'])"""
+    words = NOTE_WORD.findall((additional_notes or '').lower())
+    return sorted({w for w in words if w not in STOPWORDS})
+
+
+def score_candidates(cards: List[Dict], features: pd.DataFrame, commander: Optional[str] = None,
+                     additional_notes: str = "", synergy: Optional[SynergyGraph] = None) -> np.ndarray:
+    """Relevance score per card from keyword overlap, creature types, notes and role coverage
+
+    With the collection's `synergy` graph, synergy with the commander (tribes, mechanics,
+    enabler/payoff themes) adds to the score too.
+    """
+    keyword_columns = [c for c in features.columns if c.startswith('kw_')]
+    keywords = features[keyword_columns].to_numpy(dtype=np.int8)
+    role_count = features[ROLES].to_numpy(dtype=np.int8).sum(axis=1)
+    types = features['creature_types'].fillna('')
+    texts = pd.Series([(card.get('Card Text') or '').lower() for card in cards], index=features.index)
+    names = [card_name(card).lower() for card in cards]
+
+    score = 0.5 * role_count - 0.1 * np.abs(features['cmc'].to_numpy() - 3)
+
+    # Overlap with the commander's keywords and creature types
+    if commander:
+        wanted = commander.strip().lower()
+        matches = [i for i, name in enumerate(names) if name == wanted] or \
+                  [i for i, name in enumerate(names) if name.startswith(wanted)]
+        if matches:
+            leader = matches[0]
+            score = score + 2.0 * (keywords @ keywords[leader])
+            for creature_type in filter(None, types.iloc[leader].split(', ')):
+                score = score + 3.0 * types.str.contains(creature_type, regex=False).to_numpy()
+            if synergy is not None:
+                weights = synergy.weights(names[leader])
+                score = score + SYNERGY_WEIGHT * np.array([weights.get(name, 0.0) for name in names])
+            score[leader] += 1000.0
+
+    # Words from the notes found in card text or creature types ("allies", "waterbend")
+    for term in note_terms(additional_notes):
+        stem = term[:-3] + 'y' if term.endswith('ies') else term.rstrip('s')
+        score = score + 1.5 * texts.str.contains(stem, regex=False).to_numpy()
+        score = score + 1.5 * types.str.lower().str.contains(stem, regex=False).to_numpy()
+
+    return score
+
+
+def preselect_candidates(cards: List[Dict], features: Optional[pd.DataFrame] = None,
+                         commander: Optional[str] = None, additional_notes: str = "",
+                         per_role_k: int = PER_ROLE_K, general_k: int = GENERAL_K,
+                         land_k: int = LAND_K, synergy: Optional[SynergyGraph] = None,
+                         max_cards: Optional[int] = None) -> Tuple[List[Dict], Dict]:
+    """Keep a bounded top-K pool per role so prompt size stays flat as the collection grows
+
+    The role, creature, other and land pools overlap but can add up to more than `max_cards`;
+    the combined pool is then cut back to `max_cards`, lowest scores first, keeping its share
+    of lands. Returns the kept cards (collection order, one row per card name) and a report
+    describing what was pruned.
+    """
+    if features is None:
+        features = extract_features(pd.DataFrame(cards))
+
+    # One row per card name; extra printings only cost prompt space
+    seen = {}
+    for i, card in enumerate(cards):
+        name = card_name(card).lower()
+        if name and name not in seen:
+            seen[name] = i
+    unique_rows = np.array(sorted(seen.values()), dtype=np.int64)
+    if len(unique_rows) == 0:
+        return [], {'total': len(cards), 'unique': 0, 'kept': 0, 'pruned': [], 'per_role': {}}
+
+    cards_u = [cards[i] for i in unique_rows]
+    features_u = features.iloc[unique_rows].reset_index(drop=True)
+    score = score_candidates(cards_u, features_u, commander, additional_notes, synergy)
+
+    lands = np.array([is_land(card) for card in cards_u], dtype=bool)
+    order = np.argsort(-score, kind='stable')
+
+    keep = np.zeros(len(cards_u), dtype=bool)
+    per_role = {}
+
+    def take_top(mask: np.ndarray, k: int) -> int:
+        picked = order[mask[order]][:k]
+        keep[picked] = True
+        return len(picked)
+
+    for role in ROLES:
+        per_role[role] = take_top(features_u[role].to_numpy() & ~lands, per_role_k)
+    per_role['creatures'] = take_top(features_u['is_creature'].to_numpy() & ~lands, general_k)
+    per_role['other'] = take_top(~lands, general_k)
+    per_role['lands'] = take_top(lands, land_k)
+    # Anything scored far above the rest (the commander) always stays
+    keep[score >= 1000.0] = True
+
+    if max_cards is not None and keep.sum() > max_cards:
+        kept_lands = order[keep[order] & lands[order]]
+        kept_spells = order[keep[order] & ~lands[order]]
+        land_slots = round(max_cards * len(kept_lands) / (len(kept_lands) + len(kept_spells)))
+        keep[:] = False
+        keep[kept_lands[:land_slots]] = True
+        keep[kept_spells[:max_cards - land_slots]] = True
+
+    kept = [card for card, k in zip(cards_u, keep) if k]
+    pruned = [
+        {'name': card_name(card), 'score': round(float(s), 2)}
+        for card, k, s in zip(cards_u, keep, score) if not k
+    ]
+    pruned.sort(key=lambda p: -p['score'])
+    report = {
+        'total': len(cards),
+        'unique': len(cards_u),
+        'kept': len(kept),
+        'pruned': pruned,
+        'per_role': per_role,
+    }
+    return kept, report
@@ -0,0 +1,256 @@
+import hashlib
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mana import COLORS, COLOR_SLICE, COLUMN, mana_matrix
+
+# Card roles recognised from oracle text (lowercased, CSV uses " | " for line breaks).
+# Each alternative starts with a literal so the regex engine can skip ahead with a fast
+# substring search; a single alternation without a literal prefix is several times slower.
+ROLE_PATTERNS = {
+    'ramp': [
+        r"add(?: \{[wubrgc]\}| (?:one|two|three|x) mana|s? an additional)",
+        r"search your library for (?:a|an|up to \w+) (?:basic )?(?:land|plains|island|swamp|mountain|forest)",
+        r"put (?:a|that|those) lands? cards? onto the battlefield",
+        r"play an additional land",
+    ],
+    'draw': [
+        r"draws? (?:a|an additional|two|three|four|x|that many) cards?",
+        r"investigate",
+        r"put (?:it|one of them|that card) into your hand",
+    ],
+    'removal': [
+        r"destroy (?:target|each|all)",
+        r"exile (?:target|each|all)",
+        r"deals? \d+ damage to (?:any target|target)",
+        r"deals damage equal to .{0,60}? to (?:any target|target)",
+        r"target creature gets -\d+/-\d+",
+        r"return target (?:nonland )?(?:creature|permanent|artifact|enchantment).{0,40}? to (?:its|their) owner'?s? hand",
+        r"counter target",
+        r"fights? (?:target|another target|up to one target)",
+        r"target player sacrifices",
+        r"target opponent sacrifices",
+        r"each player sacrifices",
+        r"each opponent sacrifices",
+    ],
+    'board_wipe': [
+        r"destroy all (?:other )?(?:creatures|nonland permanents|permanents|artifacts|enchantments)",
+        r"exile all (?:other )?(?:creatures|nonland permanents|permanents|artifacts|enchantments)",
+        r"deals? \d+ damage to each (?:other )?creature",
+        r"all creatures get -\d+/-\d+",
+        r"all other creatures get -\d+/-\d+",
+        r"return all (?:other )?(?:creatures|nonland permanents) to (?:its|their) owners'? hands?",
+    ],
+    'token_maker': [
+        r"creates? (?:a|an|one|two|three|four|five|x|that many|\d+) .{0,80}?tokens?",
+    ],
+    'wincon': [
+        r"you win the game",
+        r"each opponent loses \d+ life",
+        r"target opponent loses \d+ life",
+        r"double strike",
+        r"additional combat phase",
+        r"creatures you control get \+\d+/\+\d+",
+        r"put a \+1/\+1 counter on each",
+        r"can't be blocked",
+    ],
+}
+ROLE_PATTERNS = {role: [re.compile(p) for p in patterns] for role, patterns in ROLE_PATTERNS.items()}
+ROLES = list(ROLE_PATTERNS)
+PIP_COLUMNS = [f'pips_{color}' for color in COLORS]
+
+# Evergreen keywords plus the bending mechanics from Avatar: The Last Airbender.
+# Stems also match inflections ("waterbend" in "waterbends"), "cycling" matches "forestcycling".
+KEYWORDS = [
+    'flying', 'reach', 'trample', 'haste', 'vigilance', 'lifelink', 'deathtouch',
+    'first strike', 'double strike', 'menace', 'flash', 'hexproof', 'indestructible',
+    'ward', 'defender', 'prowess', 'scry', 'surveil', 'mill', 'kicker', 'cycling',
+    'waterbend', 'airbend', 'earthbend', 'firebend',
+]
+STEM_KEYWORDS = {'waterbend', 'airbend', 'earthbend', 'firebend', 'cycling'}
+PREFIXED_KEYWORDS = {'cycling'}
+REMINDER_TEXT = re.compile(r"\([^()]*\)")
+
+CREATURE_TYPES = [
+    'Ally', 'Human', 'Soldier', 'Warrior', 'Monk', 'Rebel', 'Advisor', 'Noble', 'Citizen',
+    'Spirit', 'Avatar', 'Dragon', 'Bird', 'Bison', 'Lemur', 'Bear', 'Cat', 'Dog', 'Fish',
+    'Elf', 'Goblin', 'Zombie', 'Vampire', 'Wizard', 'Knight', 'Cleric', 'Rogue', 'Shaman',
+    'Elemental', 'Beast', 'Merfolk', 'Pirate', 'Artificer', 'Scout',
+]
+
+
+def _plural_forms(creature_type: str) -> List[str]:
+    forms = [creature_type, f"{creature_type}s", f"{creature_type}es"]
+    if creature_type.endswith('y'):
+        forms.append(f"{creature_type[:-1]}ies")
+    if creature_type.endswith('f'):
+        forms.append(f"{creature_type[:-1]}ves")
+    return forms
+
+
+def content_hash(csv_content: str) -> str:
+    """Stable identifier for a collection's raw CSV content"""
+    return hashlib.sha256(csv_content.encode('utf-8')).hexdigest()
+
+
+def _text_column(df: pd.DataFrame, *names: str) -> pd.Series:
+    for name in names:
+        if name in df.columns:
+            return df[name].fillna('').astype(str)
+    return pd.Series('', index=df.index)
+
+
+def _type_pattern(creature_type: str) -> re.Pattern:
+    """Any of a creature type's forms as a whole word"""
+    forms = sorted(_plural_forms(creature_type), key=len, reverse=True)
+    return re.compile(r"(?:^|[^A-Za-z])(?:" + '|'.join(forms) + r")\b")
+
+
+# Word boundaries are spelled out instead of lookarounds so pyarrow can run them with RE2
+TYPE_PATTERNS = {creature_type: _type_pattern(creature_type) for creature_type in sorted(CREATURE_TYPES)}
+KEYWORD_PATTERNS = {
+    keyword: re.compile(
+        ('' if keyword in PREFIXED_KEYWORDS else r"(?:^|[^a-z])") + re.escape(keyword)
+        + ('' if keyword in STEM_KEYWORDS else r"(?:[^a-z]|$)")
+    )
+    for keyword in KEYWORDS
+}
+
+
+class _CardTexts:
+    """Distinct oracle texts as a Series of their distinct lines, matched with pandas str methods
+
+    Each ability sits on its own " | "-separated line and keywords and stock abilities repeat
+    across cards, so patterns scan every distinct line once and a text matches when any of its
+    lines does. Patterns never reach from one ability into the next.
+
+    A batch of patterns is searched by halving: one pass with their alternation keeps the lines
+    that match any of them and each half of the batch repeats that on the lines kept, so a
+    pattern only runs on the few lines that can match it.
+    """
+
+    def __init__(self, texts: Sequence[str]):
+        text = pd.Series(texts, dtype=str)
+        # Reminder text explains rules ("(Each one pays for {1}.)") and only adds false positives
+        reminder = np.array(text.str.contains('(', regex=False), dtype=bool)
+        if reminder.any():
+            text[reminder] = text[reminder].str.replace(REMINDER_TEXT.pattern, '', regex=True)
+        lines = text.str.split(' | ', regex=False).explode()
+        self.line_codes, unique_lines = pd.factorize(lines)
+        self.line_rows = lines.index.to_numpy()
+        self.lines = pd.Series(unique_lines, dtype=str)
+        self.lower = self.lines.str.lower()
+        self.size = len(text)
+
+    def _matching_lines(self, lines: pd.Series, patterns: List[re.Pattern],
+                        candidates: Optional[np.ndarray] = None) -> List[np.ndarray]:
+        """Indices of the lines matching each pattern, looking only at the candidate lines"""
+        if candidates is None:
+            candidates = np.arange(len(lines))
+        # Pattern strings run with RE2 on pyarrow-backed strings; compiled ones fall back to re
+        alternation = '|'.join(f"(?:{pattern.pattern})" for pattern in patterns)
+        candidates = candidates[np.array(lines.iloc[candidates].str.contains(alternation), dtype=bool)]
+        if len(patterns) == 1 or not len(candidates):
+            return [candidates] * len(patterns)
+        half = len(patterns) // 2
+        return (self._matching_lines(lines, patterns[:half], candidates)
+                + self._matching_lines(lines, patterns[half:], candidates))
+
+    def _rows(self, line_indices: np.ndarray) -> np.ndarray:
+        """Texts containing any of the lines"""
+        line_hits = np.zeros(len(self.lines), dtype=bool)
+        line_hits[line_indices] = True
+        hits = np.zeros(self.size, dtype=bool)
+        hits[self.line_rows[line_hits[self.line_codes]]] = True
+        return hits
+
+    def mask(self, patterns: List[re.Pattern]) -> np.ndarray:
+        """Rows where any of the patterns match the lowercased text"""
+        alternation = re.compile('|'.join(f"(?:{pattern.pattern})" for pattern in patterns))
+        return self._rows(self._matching_lines(self.lower, [alternation])[0])
+
+    def keywords(self) -> Dict[str, np.ndarray]:
+        """Rows per keyword, as a word of its own ("flash" but not "flashback")"""
+        lines = self._matching_lines(self.lower, [KEYWORD_PATTERNS[keyword] for keyword in KEYWORDS])
+        return {keyword: self._rows(indices) for keyword, indices in zip(KEYWORDS, lines)}
+
+    def creature_types(self) -> Dict[str, np.ndarray]:
+        """Rows per creature type named in the text (case-sensitive, any plural form)"""
+        lines = self._matching_lines(self.lines, list(TYPE_PATTERNS.values()))
+        return {creature_type: self._rows(indices) for creature_type, indices in zip(TYPE_PATTERNS, lines)}
+
+
+def _text_features(texts: _CardTexts) -> pd.DataFrame:
+    """Role and keyword flags per text"""
+    features = {role: texts.mask(patterns) for role, patterns in ROLE_PATTERNS.items()}
+    for keyword, hits in texts.keywords().items():
+        features[f"kw_{keyword.replace(' ', '_')}"] = hits
+    return pd.DataFrame(features)
+
+
+def _creature_types(texts: _CardTexts) -> List[str]:
+    """Creature types mentioned in each text (tokens created, tribal payoffs)"""
+    found = [[] for _ in range(texts.size)]
+    for creature_type, hits in texts.creature_types().items():
+        for row in np.flatnonzero(hits).tolist():
+            found[row].append(creature_type)
+    return [', '.join(types) for types in found]
+
+
+def extract_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Boolean and numeric card features, row-aligned with the collection DataFrame
+
+    Patterns are evaluated once per distinct card text / mana cost and broadcast back,
+    so large collections with many duplicate printings stay fast.
+    """
+    text = _text_column(df, 'Card Text')
+    codes, unique_texts = pd.factorize(text)
+    texts = _CardTexts(unique_texts)
+    text_features = _text_features(texts)
+    text_features['creature_types'] = _creature_types(texts)
+    features = text_features.iloc[codes].reset_index(drop=True)
+    features.index = df.index
+
+    # Mana value and per-color pips from the parsed cost matrix
+    mana = mana_matrix(_text_column(df, 'Mana Cost'))
+    features['cmc'] = mana[:, COLUMN['cmc']].astype(np.int64)
+    features['colored_pips'] = mana[:, COLOR_SLICE].sum(axis=1)
+    features[PIP_COLUMNS] = mana[:, COLOR_SLICE]
+
+    # Power/Toughness is stored as "power.toughness" to dodge spreadsheet date conversion
+    pt_codes, unique_pt = pd.factorize(_text_column(df, 'Power/Toughness'))
+    pt = pd.Series(unique_pt).str.split(r"[./]", n=1, regex=True).map(lambda parts: parts + [''] * (2 - len(parts)))
+    features['power'] = pd.to_numeric(pt.str[0], errors='coerce').iloc[pt_codes].to_numpy()
+    features['toughness'] = pd.to_numeric(pt.str[1], errors='coerce').iloc[pt_codes].to_numpy()
+    features['is_creature'] = ~np.isnan(features['power'].to_numpy())
+    return features
+
+
+def load_collection_features(csv_content: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Parsed collection and its features, shared with every other stage via collection_cache"""
+    from collection_cache import parse_collection  # collection_cache builds on this module
+
+    parsed = parse_collection(csv_content)
+    return parsed.df, parsed.features
+
+
+def card_roles(features: pd.DataFrame, roles: Optional[List[str]] = None) -> pd.Series:
+    """List of role names per card, in the given order"""
+    roles = roles or ROLES
+    flags = features[roles].to_numpy()
+    return pd.Series([[r for r, hit in zip(roles, row) if hit] for row in flags], index=features.index)
+
+
+def feature_summary(features: pd.DataFrame) -> Dict[str, Dict[str, int]]:
+    """Card counts per role and keyword for quick analytics"""
+    roles = {role: int(features[role].sum()) for role in ROLES}
+    keywords = {
+        column[3:].replace('_', ' '): int(features[column].sum())
+        for column in features.columns if column.startswith('kw_') and features[column].any()
+    }
+    types = features['creature_types'].str.split(', ').explode()
+    tribes = types[types != ''].value_counts().to_dict()
+    return {'roles': roles, 'keywords': keywords, 'creature_types': tribes}
@@ -0,0 +1,109 @@
+from typing import List, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from legality import format_mask, legality_column
+
+# Columns written by the enrichment scripts (data_clean/main.py and the Collection Manager)
+ENRICHED_COLUMNS = ['Type Line', 'CMC', 'Color Identity', 'Legalities', 'Oracle ID', 'Power', 'Toughness']
+COLOR_BITS = {'W': 1, 'U': 2, 'B': 4, 'R': 8, 'G': 16}
+COLOR_NAMES = {'WHITE': 'W', 'BLUE': 'U', 'BLACK': 'B', 'RED': 'R', 'GREEN': 'G'}
+
+def identity_mask(colors) -> int:
+    """Bitmask of WUBRG for 'U, B', ['Blue', 'Black'] or 'Colorless' (0)"""
+    if isinstance(colors, str):
+        colors = colors.split(',')
+    mask = 0
+    for color in colors or []:
+        color = color.strip().upper()
+        mask |= COLOR_BITS.get(COLOR_NAMES.get(color, color), 0)
+    return mask
+
+
+def has_type_line(card: Dict) -> bool:
+    return bool((card.get('Type Line') or '').strip())
+
+
+def front_type_line(card: Dict) -> str:
+    """Type line of the front face ("Legendary Creature — Human Avatar")"""
+    return (card.get('Type Line') or '').split('//')[0].strip()
+
+
+def is_legendary_creature(card: Dict) -> bool:
+    type_line = front_type_line(card)
+    return 'Legendary' in type_line and 'Creature' in type_line
+
+
+class CardIndex:
+    """Typed indexes over the enriched columns, row-aligned with the collection DataFrame
+
+    Lookups are boolean masks, so "legendary creatures in U/B that are Standard-legal" is a
+    couple of vectorized ANDs. Collections enriched before these columns existed simply report
+    `enriched == False` and every mask is empty.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.enriched = 'Type Line' in df.columns and df['Type Line'].astype(str).str.strip().ne('').any()
+
+        def column(name: str) -> pd.Series:
+            if name in df.columns:
+                return df[name].fillna('').astype(str)
+            return pd.Series([''] * len(df), index=df.index, dtype=object)
+
+        self.names = column('Name').where(column('Name') != '', column('Card Name')).str.strip()
+        type_line = column('Type Line').str.split('//').str[0]
+        self.type_line = column('Type Line')
+        self.is_legendary = type_line.str.contains('Legendary', regex=False).to_numpy()
+        self.is_creature = type_line.str.contains('Creature', regex=False).to_numpy()
+        self.is_land = type_line.str.contains('Land', regex=False).to_numpy()
+        self.cmc = pd.to_numeric(column('CMC'), errors='coerce').to_numpy()
+        self.oracle_id = column('Oracle ID')
+
+        # Color identity as a WUBRG bitmask per row
+        codes, unique_identities = pd.factorize(column('Color Identity'))
+        unique_masks = np.array([identity_mask(value) for value in unique_identities], dtype=np.uint8)
+        self.identity = unique_masks[codes] if len(unique_masks) else np.zeros(len(df), dtype=np.uint8)
+
+        # Legal formats as a bitset per row (see legality.FORMATS)
+        self.has_legalities = column('Legalities').str.strip().ne('').any()
+        self.legality = legality_column(column('Legalities'))
+
+    def within_identity(self, colors: Optional[List[str]]) -> np.ndarray:
+        """Rows whose color identity fits inside the given colors (everything if none given)"""
+        allowed = identity_mask(colors)
+        if not allowed:
+            return np.ones(len(self.df), dtype=bool)
+        return (self.identity & np.uint8(~allowed & 0x1F)) == 0
+
+    def legal_in(self, format_type: str) -> np.ndarray:
+        """Rows legal in a format; all False when the collection has no legality data"""
+        return format_mask(self.legality, format_type)
+
+    def commander_mask(self, colors: Optional[List[str]] = None) -> np.ndarray:
+        """Legendary creatures that are Commander-legal and fit the colors"""
+        mask = self.is_legendary & self.is_creature & self.within_identity(colors)
+        if self.has_legalities:
+            mask &= self.legal_in('commander')
+        return mask
+
+    def commander_candidates(self, colors: Optional[List[str]] = None) -> List[str]:
+        """Distinct names of possible commanders, widest color identity first"""
+        mask = self.commander_mask(colors)
+        rows = pd.DataFrame({'name': self.names[mask], 'identity': self.identity[mask]})
+        rows['colors'] = rows['identity'].map(lambda bits: bin(int(bits)).count('1'))
+        rows = rows.drop_duplicates('name').sort_values(['colors', 'name'], ascending=[False, True])
+        return rows['name'].tolist()
+
+
+def build_card_index(cards: List[Dict]) -> CardIndex:
+    """Index a list of CSV rows (as loaded by the deck builders)"""
+    return CardIndex(pd.DataFrame(cards))
+
+
+def load_card_index(csv_content: str) -> CardIndex:
+    """Index for a collection CSV, built once per content hash alongside the parsed collection"""
+    from collection_cache import parse_collection  # collection_cache builds on this module
+
+    return parse_collection(csv_content).index
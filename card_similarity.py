@@ -0,0 +1,144 @@
+import re
+from collections import Counter
+from functools import cached_property
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from card_features import REMINDER_TEXT
+
+# Mana and tap symbols stay whole ("{t}", "{2}{u}"), as do "+1/+1" and "-2/-2"
+TOKEN = re.compile(r"\{[^}]*\}|[+-]?\d+/[+-]?\d+|[a-z0-9']+")
+
+
+def _column(df: pd.DataFrame, *names: str) -> pd.Series:
+    for name in names:
+        if name in df.columns:
+            return df[name].fillna('').astype(str)
+    return pd.Series([''] * len(df), index=df.index, dtype=object)
+
+
+def card_terms(name: str, text: str, type_line: str = "") -> List[str]:
+    """Unigram and bigram features of a card's oracle text, plus its type line words
+
+    The card's own name (and the short name before a comma) becomes "cardname", so "Katara
+    deals 2 damage" and "Zuko deals 2 damage" look the same. Reminder text is dropped.
+    """
+    text = REMINDER_TEXT.sub(' ', text.replace(' | ', '\n').lower())
+    for own_name in {name.lower(), name.split(',')[0].lower()}:
+        if own_name:
+            text = text.replace(own_name, '~')
+    words = TOKEN.findall(text.replace('~', ' cardname '))
+    terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    terms += [f"type:{word}" for word in TOKEN.findall(type_line.split('//')[0].lower())]
+    return terms
+
+
+class SimilarityIndex:
+    """TF-IDF vectors over oracle text, one per distinct card, with cosine top-K queries
+
+    Vectors are built on first query, or up front by `build`, and kept (the object is cached
+    per collection in collection_cache). The matrix is stored twice as flat numpy arrays: CSR rows to read a
+    card's own vector and CSC columns to score every card sharing one of its terms, so a
+    query only touches cards that overlap with it.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        names = _column(df, 'Name', 'Card Name').str.strip()
+        keys = names.str.lower()
+        first = ~keys.duplicated() & keys.ne('')
+        self.names: List[str] = names[first].tolist()
+        self.texts: List[str] = _column(df, 'Card Text')[first].tolist()
+        self.type_lines: List[str] = _column(df, 'Type Line')[first].tolist()
+        self.positions: Dict[str, int] = {name.lower(): i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def from_cards(cls, cards: List[Dict]) -> "SimilarityIndex":
+        return cls(pd.DataFrame(cards))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def build(self) -> "SimilarityIndex":
+        """Build the vectors now rather than on the first query (seconds for 100k+ cards)"""
+        self._matrix
+        return self
+
+    @cached_property
+    def _matrix(self) -> Dict[str, np.ndarray]:
+        vocabulary: Dict[str, int] = {}
+        indptr, indices, counts = [0], [], []
+        for name, text, type_line in zip(self.names, self.texts, self.type_lines):
+            for term, count in Counter(card_terms(name, text, type_line)).items():
+                indices.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+            indptr.append(len(indices))
+
+        indptr = np.array(indptr, dtype=np.int64)
+        indices = np.array(indices, dtype=np.int32)
+        rows = np.repeat(np.arange(len(self.names), dtype=np.int32), np.diff(indptr))
+
+        # Sublinear term frequency times smoothed inverse document frequency, rows L2-normalized
+        doc_freq = np.bincount(indices, minlength=len(vocabulary))
+        idf = np.log((1 + len(self.names)) / (1 + doc_freq)) + 1
+        data = ((1 + np.log(np.array(counts, dtype=np.float64))) * idf[indices])
+        norms = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=len(self.names)))
+        data = (data / np.where(norms > 0, norms, 1)[rows]).astype(np.float32)
+
+        order = np.argsort(indices, kind='stable')
+        col_indptr = np.concatenate(([0], np.cumsum(np.bincount(indices, minlength=len(vocabulary)))))
+        return {
+            'indptr': indptr, 'indices': indices, 'data': data,
+            'col_indptr': col_indptr, 'col_rows': rows[order], 'col_data': data[order],
+            'vocabulary': vocabulary, 'idf': idf,
+        }
+
+    def _scores(self, terms: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Cosine similarity of a (normalized) sparse query against every card"""
+        m = self._matrix
+        starts, ends = m['col_indptr'][terms], m['col_indptr'][terms + 1]
+        if not len(terms) or not (ends > starts).any():
+            return np.zeros(len(self.names))
+        hit_rows = np.concatenate([m['col_rows'][s:e] for s, e in zip(starts, ends)])
+        hit_weights = np.concatenate([m['col_data'][s:e] * w for s, e, w in zip(starts, ends, weights)])
+        return np.bincount(hit_rows, weights=hit_weights, minlength=len(self.names))
+
+    def _top(self, scores: np.ndarray, k: int, skip: Optional[int] = None,
+             accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        if skip is not None:
+            scores[skip] = 0
+        candidates = np.flatnonzero(scores > 0)
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        results = []
+        for i in candidates:
+            if accept is None or accept(self.names[i]):
+                results.append((self.names[i], float(scores[i])))
+                if len(results) == k:
+                    break
+        return results
+
+    def similar(self, name: str, k: int = 10,
+                accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """Top-k (name, cosine) cards most like `name`, best first; empty if the card is unknown
+
+        `accept` can veto candidates (already in the deck, off-color...) without shrinking k.
+        """
+        position = self.positions.get(name.strip().lower())
+        if position is None:
+            return []
+        m = self._matrix
+        start, end = m['indptr'][position], m['indptr'][position + 1]
+        scores = self._scores(m['indices'][start:end], m['data'][start:end])
+        return self._top(scores, k, position, accept)
+
+    def similar_to_text(self, text: str, k: int = 10,
+                        accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """Top-k cards whose oracle text is most like free text ("create a 1/1 Ally token")"""
+        vocabulary = self._matrix['vocabulary']
+        counts = Counter(term for term in card_terms('', text) if term in vocabulary)
+        if not counts:
+            return []
+        terms = np.array([vocabulary[term] for term in counts], dtype=np.int32)
+        weights = (1 + np.log(np.array(list(counts.values()), dtype=np.float64))) * self._matrix['idf'][terms]
+        return self._top(self._scores(terms, weights / np.linalg.norm(weights)), k, None, accept)
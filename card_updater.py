@@ -0,0 +1,252 @@
+import csv
+import time
+from io import StringIO
+from typing import Dict, Optional
+
+from cassette import install_from_env
+from collection_db import CollectionDB
+from gemini_pool import pooled_model
+from instrumentation import Tracer, default_sink, span
+from run_metrics import record_run
+
+# Scryfall answers 429 when called too fast; wait (Retry-After, else this long) and try again
+SCRYFALL_RETRIES = 2
+SCRYFALL_RETRY_SECONDS = 1.0
+
+
+class MagicCardUpdater:
+    def __init__(self, gemini_api_key: Optional[str] = None, session_id: str = "default",
+                 collection_db: Optional[CollectionDB] = None):
+        self.scryfall_api = "https://api.scryfall.com/cards/named"
+        self.session_id = session_id
+        # Scryfall and Gemini calls go through a cassette when CASSETTE_MODE is set
+        install_from_env()
+        
+        # Enriched rows are upserted here (by ManaBox ID) when a card database is given
+        self.collection_db = collection_db
+        
+        # Initialize Gemini if API key provided (shared model, calls queue with other sessions)
+        if gemini_api_key:
+            self.gemini_model = pooled_model(gemini_api_key, 'gemini-2.5-flash', session_id)
+        else:
+            self.gemini_model = None
+    
+    def search_scryfall(self, card_name: str) -> Optional[Dict]:
+        """Search Scryfall API for card information"""
+        import requests  # deferred so pages that never enrich don't pay for it
+
+        try:
+            params = {'fuzzy': card_name}
+            for attempt in range(SCRYFALL_RETRIES + 1):
+                with span('scryfall_call', attempt=attempt) as call:
+                    response = requests.get(self.scryfall_api, params=params)
+                    call['status'] = response.status_code
+                if response.status_code != 429 or attempt == SCRYFALL_RETRIES:
+                    break
+                time.sleep(float(response.headers.get('Retry-After') or SCRYFALL_RETRY_SECONDS))
+            
+            if response.status_code == 200:
+                return response.json()
+            else:
+                return None
+        except Exception as e:
+            return None
+    
+    @staticmethod
+    def _face_value(card_data: Dict, key: str) -> str:
+        """Top-level Scryfall field, falling back to the front face of double-faced cards"""
+        value = card_data.get(key)
+        if value is None and card_data.get('card_faces'):
+            value = card_data['card_faces'][0].get(key)
+        return str(value) if value is not None else ''
+    
+    def extract_card_data(self, card_data: Dict) -> Dict:
+        """Extract relevant information from Scryfall response"""
+        card_text = card_data.get('oracle_text', '')
+        card_text = card_text.replace('\n', ' | ')
+        
+        extracted = {
+            'colors': ', '.join(card_data.get('colors', [])) or 'Colorless',
+            'mana_cost': card_data.get('mana_cost', ''),
+            'card_text': card_text,
+            'power_toughness': '',
+            # Typed fields for instant lookups (commander candidates, lands, format legality)
+            'type_line': self._face_value(card_data, 'type_line'),
+            'cmc': f"{card_data.get('cmc', 0):g}",
+            'color_identity': ', '.join(card_data.get('color_identity', [])) or 'Colorless',
+            'legalities': ', '.join(
+                fmt for fmt, status in card_data.get('legalities', {}).items() if status in ('legal', 'restricted')
+            ) or 'None',
+            'oracle_id': self._face_value(card_data, 'oracle_id'),
+            'power': self._face_value(card_data, 'power'),
+            'toughness': self._face_value(card_data, 'toughness')
+        }
+        
+        if 'power' in card_data and 'toughness' in card_data:
+            power = card_data['power']
+            toughness = card_data['toughness']
+            extracted['power_toughness'] = f"{power}.{toughness}"
+        
+        return extracted
+    
+    def verify_with_gemini(self, card_name: str, card_data: Dict, progress_callback=None) -> bool:
+        """Use Gemini to verify the card information accuracy"""
+        if not self.gemini_model:
+            return True
+        
+        try:
+            prompt = f"""You are verifying Magic: The Gathering card data for consistency and completeness.
+
+IMPORTANT CONTEXT:
+- This card may be from a Universe Beyond set (like Avatar: The Last Airbender, Warhammer 40K, Doctor Who, etc.)
+- Universe Beyond cards are official MTG cards but feature characters/themes from other franchises
+- Focus on verifying the DATA CONSISTENCY, not whether the card name sounds like a traditional MTG card
+
+Card Name: {card_name}
+Colors: {card_data['colors']}
+Mana Cost: {card_data['mana_cost']}
+Card Text: {card_data['card_text']}
+Power/Toughness: {card_data['power_toughness']}
+
+VERIFICATION CHECKLIST:
+1. Does the mana cost format look valid?
+2. Do the colors match what's in the mana cost?
+3. If there's a Power/Toughness, does it make sense?
+4. Does the card text contain valid MTG mechanics and formatting?
+5. Is there any obvious data corruption or formatting errors?
+
+Respond with 'VERIFIED' if the data looks consistent and properly formatted, or 'CONCERN: [specific issue]' only if there's a clear data quality problem."""
+
+            response = self.gemini_model.generate_content(prompt)
+            result = response.text.strip()
+            
+            if progress_callback:
+                if 'VERIFIED' in result:
+                    progress_callback("✓ Gemini verification passed")
+                else:
+                    progress_callback(f"⚠️ Gemini flagged issue: {result}")
+            
+            return 'VERIFIED' in result
+        except Exception as e:
+            if progress_callback:
+                progress_callback(f"⚠️ Gemini verification failed: {e}")
+            return True
+    
+    def update_csv(self, csv_content: str, progress_callback=None, source: str = "") -> str:
+        """Process CSV content and return updated CSV
+
+        `source` names the CSV in the card database (usually its file name).
+        """
+        # One trace per run: Scryfall and Gemini calls are spans, and the finished trace
+        # becomes a row of run metrics
+        tracer = Tracer(default_sink(), on_finish=record_run, entry='enrichment', session=self.session_id)
+        with tracer.activate(), tracer.span('enrichment', source=source) as run:
+            return self._update_csv(csv_content, progress_callback, source, run)
+    
+    def _update_csv(self, csv_content: str, progress_callback, source: str, run: Dict) -> str:
+        """update_csv's work; row and cache counts go on the run span for the metrics"""
+        # Read the CSV
+        csv_file = StringIO(csv_content)
+        reader = csv.DictReader(csv_file)
+        fieldnames = list(reader.fieldnames) if reader.fieldnames else []
+        rows = list(reader)
+        
+        # Ensure Name column exists (required)
+        if 'Name' not in fieldnames and 'Card Name' not in fieldnames:
+            raise ValueError("CSV must have either 'Name' or 'Card Name' column")
+        
+        # Ensure required columns exist (will be auto-populated)
+        required_cols = ['Card color(s)', 'Card Text', 'Mana Cost', 'Power/Toughness',
+                         'Type Line', 'CMC', 'Color Identity', 'Legalities', 'Oracle ID']
+        added_cols = []
+        for col in required_cols + ['Power', 'Toughness']:
+            if col not in fieldnames:
+                fieldnames.append(col)
+                added_cols.append(col)
+        
+        if added_cols and progress_callback:
+            progress_callback(f"✨ Auto-added missing columns: {', '.join(added_cols)}")
+        
+        total_rows = len(rows)
+        updated_count = 0
+        # Rows already complete need no Scryfall call: the CSV itself is the cache
+        named_count = complete_count = 0
+        
+        # Process each row
+        for idx, row in enumerate(rows, 1):
+            card_name = row.get('Name', '').strip()
+            
+            if not card_name:
+                if progress_callback:
+                    progress_callback(f"Row {idx}/{total_rows}: Empty card name, skipping...")
+                continue
+            named_count += 1
+            
+            # Check if row needs updating
+            needs_update = any(not row.get(col, '').strip() for col in required_cols)
+            
+            if not needs_update:
+                complete_count += 1
+                if progress_callback:
+                    progress_callback(f"Row {idx}/{total_rows}: '{card_name}' - Already complete ✓")
+                continue
+            
+            if progress_callback:
+                progress_callback(f"Row {idx}/{total_rows}: Processing '{card_name}'...")
+            
+            # Search Scryfall
+            card_data = self.search_scryfall(card_name)
+            
+            if not card_data:
+                if progress_callback:
+                    progress_callback(f"  ❌ Could not find card data for '{card_name}'")
+                continue
+            
+            # Extract information
+            extracted = self.extract_card_data(card_data)
+            
+            # Update only empty fields
+            for csv_col, data_key in [
+                ('Card color(s)', 'colors'),
+                ('Card Text', 'card_text'),
+                ('Mana Cost', 'mana_cost'),
+                ('Power/Toughness', 'power_toughness'),
+                ('Type Line', 'type_line'),
+                ('CMC', 'cmc'),
+                ('Color Identity', 'color_identity'),
+                ('Legalities', 'legalities'),
+                ('Oracle ID', 'oracle_id'),
+                ('Power', 'power'),
+                ('Toughness', 'toughness')
+            ]:
+                if not row.get(csv_col, '').strip():
+                    row[csv_col] = extracted[data_key]
+            
+            # Verify with Gemini
+            self.verify_with_gemini(card_name, extracted, progress_callback)
+            
+            if progress_callback:
+                progress_callback(f"  ✅ Updated '{card_name}' successfully")
+            updated_count += 1
+            
+            # Rate limiting
+            time.sleep(0.1)
+        
+        run.update(rows=total_rows, updated=updated_count, cache_hits=complete_count, cache_lookups=named_count,
+                   outcome='ok')
+        
+        # Write to string
+        output = StringIO()
+        writer = csv.DictWriter(output, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+        
+        if progress_callback:
+            progress_callback(f"\n✅ Complete! Updated {updated_count} cards out of {total_rows} total cards")
+        
+        if self.collection_db is not None:
+            stored = self.collection_db.upsert_rows(rows, source)
+            if progress_callback:
+                progress_callback(f"🗄️ Saved {stored} cards to the card database")
+        
+        return output.getvalue()
@@ -0,0 +1,321 @@
+import argparse
+import base64
+import hashlib
+import inspect
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, Optional
+
+MODES = ('record', 'replay')
+DEFAULT_CASSETTE = os.path.join("cassettes", "session.jsonl")
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recording for a request"""
+
+
+class ReplayedError(RuntimeError):
+    """A call that failed while recording fails the same way on replay"""
+
+
+def _digest(*parts) -> str:
+    text = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+class ReplayedGeminiResponse:
+    """Stands in for a GenerateContentResponse: `text` and `usage_metadata` as recorded"""
+
+    def __init__(self, entry: Dict):
+        self._text = entry.get('text')
+        self._text_error = entry.get('text_error')
+        self.usage_metadata = SimpleNamespace(**entry.get('usage', {}))
+
+    @property
+    def text(self) -> str:
+        # Blocked or empty responses raise on .text, and callers handle that
+        if self._text is None:
+            raise ValueError(self._text_error or "Recorded response has no text")
+        return self._text
+
+
+class Cassette:
+    """Request/response pairs of Scryfall (requests) and Gemini calls in one JSON-lines file
+
+    In record mode every call goes out live and is appended, with its latency, as it finishes.
+    In replay mode nothing touches the network: a call is matched on its request (method, URL
+    and body; model, prompt and generation config) and identical requests get their recordings
+    in order. Replayed calls wait the recorded latency times `scale`, or a fixed `latency` in
+    seconds. With `strict=False` an unmatched call takes the next unused recording of its kind
+    (and model), so a benchmark survives a prompt change; otherwise it raises CassetteMiss.
+    """
+
+    def __init__(self, path: str = DEFAULT_CASSETTE, mode: str = 'replay', latency: Optional[float] = None,
+                 scale: float = 1.0, strict: bool = True):
+        if mode not in MODES:
+            raise ValueError(f"Cassette mode must be one of {', '.join(MODES)}, not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.scale = scale
+        self.strict = strict
+        self.stats = {'recorded': 0, 'replayed': 0, 'unmatched': 0}
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, deque] = {}
+        self._last: Dict[str, Dict] = {}
+        # Recordings per kind and model in file order, for loose matching
+        self._in_order: Dict[tuple, deque] = {}
+
+        if mode == 'record':
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'w', encoding='utf-8').close()
+            return
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No cassette at {path}; record one first")
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._by_key.setdefault(entry['key'], deque()).append(entry)
+                    self._in_order.setdefault((entry['kind'], entry.get('model')), deque()).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._in_order.values())
+
+    def _next_unused(self, group: tuple) -> Optional[Dict]:
+        in_order = self._in_order.get(group, deque())
+        while in_order and in_order[0].get('used'):
+            in_order.popleft()
+        return in_order[0] if in_order else None
+
+    def _append(self, entry: Dict):
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            self.stats['recorded'] += 1
+
+    def _take(self, group: tuple, key: str, description: str) -> Dict:
+        with self._lock:
+            queue = self._by_key.get(key)
+            if queue:
+                entry = queue.popleft()
+                self._last[key] = entry
+            elif key in self._last:
+                # More identical calls than were recorded: repeat the last answer
+                entry = self._last[key]
+            elif not self.strict and self._next_unused(group) is not None:
+                entry = self._next_unused(group)
+                self._by_key[entry['key']].remove(entry)
+                self.stats['unmatched'] += 1
+            else:
+                raise CassetteMiss(f"{description} is not in {self.path}; re-record the cassette")
+            entry['used'] = True
+            self.stats['replayed'] += 1
+
+        delay = self.latency if self.latency is not None else entry['seconds'] * self.scale
+        if delay > 0:
+            time.sleep(delay)
+        if 'error' in entry:
+            raise ReplayedError(entry['error'])
+        return entry
+
+    def http(self, send: Callable, bound: inspect.BoundArguments):
+        """Session.request through the cassette"""
+        import requests
+
+        args = bound.arguments
+        method = str(args['method']).upper()
+        url = requests.Request(method, args['url'], params=args.get('params')).prepare().url
+        key = _digest('http', method, url, args.get('data'), args.get('json'))
+
+        if self.mode == 'replay':
+            entry = self._take(('http', None), key, f"{method} {url}")
+            response = requests.Response()
+            response.status_code = entry['status']
+            response.reason = entry.get('reason')
+            response.headers = requests.structures.CaseInsensitiveDict(entry['headers'])
+            response.url = entry['url']
+            response.encoding = entry.get('encoding')
+            response.elapsed = timedelta(seconds=entry['seconds'])
+            response._content = (base64.b64decode(entry['body']) if entry.get('base64')
+                                 else entry['body'].encode('utf-8'))
+            return response
+
+        entry = {'kind': 'http', 'key': key, 'method': method, 'url': url}
+        start = time.perf_counter()
+        try:
+            response = send(*bound.args, **bound.kwargs)
+            content = response.content
+        except Exception as e:
+            self._append({**entry, 'seconds': time.perf_counter() - start, 'error': f"{type(e).__name__}: {e}"})
+            raise
+        entry.update(seconds=time.perf_counter() - start, status=response.status_code, reason=response.reason,
+                     headers=dict(response.headers), encoding=response.encoding, url=response.url)
+        try:
+            entry['body'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            entry.update(body=base64.b64encode(content).decode('ascii'), base64=True)
+        self._append(entry)
+        return response
+
+    def generate(self, send: Callable, bound: inspect.BoundArguments):
+        """GenerativeModel.generate_content through the cassette"""
+        args = bound.arguments
+        model_name = getattr(args['self'], 'model_name', '')
+        contents = args.get('contents')
+        options = {name: value for name, value in args.items()
+                   if name not in ('self', 'contents') and value is not None}
+        key = _digest('gemini', model_name, contents, options)
+        prompt_bytes = len(contents.encode('utf-8')) if isinstance(contents, str) else None
+
+        if self.mode == 'replay':
+            description = f"{model_name} prompt of {prompt_bytes} bytes"
+            return ReplayedGeminiResponse(self._take(('gemini', model_name), key, description))
+
+        entry = {'kind': 'gemini', 'key': key, 'model': model_name, 'prompt_bytes': prompt_bytes}
+        start = time.perf_counter()
+        try:
+            response = send(*bound.args, **bound.kwargs)
+        except Exception as e:
+            self._append({**entry, 'seconds': time.perf_counter() - start, 'error': f"{type(e).__name__}: {e}"})
+            raise
+        entry['seconds'] = time.perf_counter() - start
+        try:
+            entry['text'] = response.text
+        except ValueError as e:
+            entry.update(text=None, text_error=str(e))
+        usage = getattr(response, 'usage_metadata', None)
+        entry['usage'] = {
+            field: getattr(usage, field) for field in ('prompt_token_count', 'candidates_token_count', 'total_token_count')
+            if isinstance(getattr(usage, field, None), int)
+        }
+        self._append(entry)
+        return response
+
+
+_active: Optional[Cassette] = None
+_patch_lock = threading.Lock()
+_patched = False
+
+
+def _through_cassette(original: Callable, handler: str) -> Callable:
+    signature = inspect.signature(original)
+
+    def patched(*args, **kwargs):
+        cassette = _active
+        if cassette is None:
+            return original(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        return getattr(cassette, handler)(original, bound)
+    patched.__wrapped__ = original
+    return patched
+
+
+def _patch():
+    """Route requests and google.generativeai calls through the active cassette (once per process)"""
+    global _patched
+    with _patch_lock:
+        if _patched:
+            return
+        import requests
+        requests.Session.request = _through_cassette(requests.Session.request, 'http')
+        try:
+            import google.generativeai as genai
+        except ImportError:
+            pass
+        else:
+            genai.GenerativeModel.generate_content = _through_cassette(
+                genai.GenerativeModel.generate_content, 'generate')
+        _patched = True
+
+
+def activate(cassette: Optional[Cassette]) -> Optional[Cassette]:
+    """Make `cassette` serve every call in the process (None turns recording off); returns the previous one"""
+    global _active
+    if cassette is not None:
+        _patch()
+    previous, _active = _active, cassette
+    return previous
+
+
+def active() -> Optional[Cassette]:
+    return _active
+
+
+@contextmanager
+def use_cassette(path: str = DEFAULT_CASSETTE, mode: str = 'replay', **options) -> Iterator[Cassette]:
+    cassette = Cassette(path, mode, **options)
+    previous = activate(cassette)
+    try:
+        yield cassette
+    finally:
+        activate(previous)
+
+
+def install_from_env() -> Optional[Cassette]:
+    """Start the cassette named by $CASSETTE_MODE and $CASSETTE_PATH, once per process
+
+    CASSETTE_LATENCY replays with a fixed delay in seconds instead of the recorded one and
+    CASSETTE_SCALE multiplies recorded delays. Without CASSETTE_MODE this imports nothing.
+    """
+    mode = os.getenv("CASSETTE_MODE", "").strip().lower()
+    if not mode or _active is not None:
+        return _active
+    latency = os.getenv("CASSETTE_LATENCY")
+    cassette = Cassette(
+        os.getenv("CASSETTE_PATH", DEFAULT_CASSETTE), mode,
+        latency=float(latency) if latency else None,
+        scale=float(os.getenv("CASSETTE_SCALE", "1")),
+        strict=os.getenv("CASSETTE_STRICT", "1").lower() not in ('0', 'false', 'no'),
+    )
+    activate(cassette)
+    return cassette
+
+
+def add_cassette_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('mode', choices=MODES)
+    parser.add_argument('cassette', help="Cassette file (JSON lines)")
+    parser.add_argument('--latency', type=float, help="Replay every call after this many seconds instead of as recorded")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply recorded latencies on replay (0 = no waiting)")
+    parser.add_argument('--loose', action='store_true',
+                        help="On replay, answer unmatched calls with the next unused recording instead of failing")
+
+
+def cassette_from_args(args: argparse.Namespace) -> Cassette:
+    return Cassette(args.cassette, args.mode, latency=args.latency, scale=args.scale, strict=not args.loose)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a script with its Scryfall and Gemini calls recorded to, or replayed from, a cassette",
+        epilog="Example: python cassette.py record cassettes/enrich.jsonl data_clean/main.py")
+    add_cassette_arguments(parser)
+    parser.add_argument('script', help="Python script to run")
+    parser.add_argument('script_args', nargs=argparse.REMAINDER, help="Arguments for the script")
+    args = parser.parse_args()
+
+    cassette = cassette_from_args(args)
+    activate(cassette)
+    sys.argv = [args.script] + args.script_args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    try:
+        runpy.run_path(args.script, run_name='__main__')
+    finally:
+        activate(None)
+        print(f"\n📼 {args.cassette}: {cassette.stats['recorded']} recorded, {cassette.stats['replayed']} replayed"
+              + (f" ({cassette.stats['unmatched']} unmatched)" if cassette.stats['unmatched'] else ""),
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
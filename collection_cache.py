@@ -0,0 +1,150 @@
+import threading
+import weakref
+from collections import OrderedDict
+from functools import cached_property
+from io import StringIO
+from typing import List, Dict, Optional, Union
+
+import pandas as pd
+
+from card_features import content_hash, extract_features
+from card_index import CardIndex
+from card_similarity import SimilarityIndex
+from collection_search import CollectionSearchIndex
+from synergy_graph import SynergyGraph
+
+_CACHE_SIZE = 16
+_cache: "OrderedDict[str, ParsedCollection]" = OrderedDict()
+# Collections still referenced from some session stay reachable after they leave the LRU,
+# so a second session selecting the same content shares the object instead of re-parsing
+_live: "weakref.WeakValueDictionary[str, ParsedCollection]" = weakref.WeakValueDictionary()
+_cache_lock = threading.Lock()
+
+# Columns with at most this share of distinct values are dictionary-encoded
+_CATEGORY_RATIO = 0.5
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Dictionary-encode repetitive text columns (set, rarity, colors, condition...)
+
+    Each distinct value is stored once plus a small integer code per row; near-unique columns
+    such as names and oracle text stay plain strings, where encoding would only add codes.
+    """
+    compact = {}
+    for column in df.columns:
+        values = df[column]
+        if len(values) and values.nunique() <= len(values) * _CATEGORY_RATIO:
+            values = values.astype('category')
+        compact[column] = values
+    return pd.DataFrame(compact, index=df.index)
+
+
+class ParsedCollection:
+    """One collection parsed once; every view of it is derived lazily and kept
+
+    Preview, analytics, commander picker, local draft and build all share this object, so a
+    collection is parsed once per process no matter how many reruns or stages touch it.
+    Sessions keep a reference to it instead of the CSV text; the text is only rebuilt by
+    `to_csv` when something needs it (downloads, queued jobs).
+    Treat `df`, `records` and `features` as read-only: they are shared across sessions.
+    """
+
+    def __init__(self, df: pd.DataFrame, key: str):
+        self.key = key
+        self.df = compact_frame(df)
+        # The collection this one replaces in its session (an edited re-upload, a re-run of the
+        # cleaner); its synergy graph, if built, seeds ours. Weak, so old versions can be freed.
+        self._previous: Optional[weakref.ref] = None
+
+    @classmethod
+    def from_csv(cls, csv_content: str, key: Optional[str] = None) -> "ParsedCollection":
+        # Keep every column as text so values like "3.10" (power 3, toughness 10) survive
+        df = pd.read_csv(StringIO(csv_content), dtype=str, keep_default_na=False)
+        return cls(df, key or content_hash(csv_content))
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def to_csv(self) -> str:
+        """The collection as CSV text, built on demand"""
+        return self.df.to_csv(index=False)
+
+    def memory_bytes(self) -> int:
+        return int(self.df.memory_usage(deep=True).sum())
+
+    @cached_property
+    def records(self) -> List[Dict]:
+        """Rows as dicts, the shape the builders, drafter and validator work with"""
+        return self.df.to_dict('records')
+
+    @cached_property
+    def features(self) -> pd.DataFrame:
+        return extract_features(self.df)
+
+    @cached_property
+    def index(self) -> CardIndex:
+        return CardIndex(self.df)
+
+    @cached_property
+    def search_index(self) -> CollectionSearchIndex:
+        return CollectionSearchIndex(self.df)
+
+    @cached_property
+    def similarity(self) -> SimilarityIndex:
+        """Oracle-text similarity; its vectors are built on the first query or by build()"""
+        return SimilarityIndex(self.df)
+
+    @cached_property
+    def synergy(self) -> SynergyGraph:
+        """Synergy graph between the collection's cards
+
+        Synced from a copy of the previous collection's graph when that one was built, so an
+        edited re-upload only tags the cards that changed; built from scratch otherwise.
+        """
+        previous = self._previous() if self._previous is not None else None
+        self._previous = None
+        base = previous.__dict__.get('synergy') if previous is not None else None
+        if base is None:
+            return SynergyGraph.from_collection(self.df)
+        graph = base.copy()
+        graph.sync(self.df)
+        return graph
+
+
+def _remember(parsed: ParsedCollection) -> ParsedCollection:
+    with _cache_lock:
+        parsed = _live.setdefault(parsed.key, parsed)
+        _cache[parsed.key] = parsed
+        _cache.move_to_end(parsed.key)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return parsed
+
+
+def get_collection(key: str) -> Optional[ParsedCollection]:
+    """Parsed collection by content hash, if this process still holds it"""
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+        return _live.get(key)
+
+
+def parse_collection(csv_content: str, previous: Optional[ParsedCollection] = None) -> ParsedCollection:
+    """Parsed collection for this CSV content, shared with every other holder in the process
+
+    `previous` is the collection this content replaces for the caller (same session, same
+    source); a newly parsed collection derives its synergy graph from that one's.
+    """
+    parsed = get_collection(content_hash(csv_content))
+    if parsed is None:
+        parsed = ParsedCollection.from_csv(csv_content)
+        if previous is not None:
+            parsed._previous = weakref.ref(previous)
+        parsed = _remember(parsed)
+    return parsed
+
+
+def as_collection(source: Union[str, ParsedCollection]) -> ParsedCollection:
+    """Accept either CSV text or an already parsed collection"""
+    return source if isinstance(source, ParsedCollection) else parse_collection(source)
@@ -0,0 +1,321 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from io import StringIO
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from card_index import identity_mask
+from legality import FORMAT_BITS, legality_bits
+
+DEFAULT_DB = os.path.join("collection", "collection.sqlite3")
+
+# SQL column -> CSV column written by the Collection Manager / data_clean enrichment
+COLUMNS = {
+    'name': 'Name',
+    'set_code': 'Set code',
+    'set_name': 'Set name',
+    'collector_number': 'Collector number',
+    'rarity': 'Rarity',
+    'foil': 'Foil',
+    'colors': 'Card color(s)',
+    'color_identity': 'Color Identity',
+    'mana_cost': 'Mana Cost',
+    'type_line': 'Type Line',
+    'card_text': 'Card Text',
+    'power_toughness': 'Power/Toughness',
+    'legalities': 'Legalities',
+    'oracle_id': 'Oracle ID',
+    'scryfall_id': 'Scryfall ID',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    card_key TEXT PRIMARY KEY,
+    source TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL,
+    set_code TEXT NOT NULL DEFAULT '',
+    set_name TEXT NOT NULL DEFAULT '',
+    collector_number TEXT NOT NULL DEFAULT '',
+    rarity TEXT NOT NULL DEFAULT '',
+    foil TEXT NOT NULL DEFAULT '',
+    quantity INTEGER NOT NULL DEFAULT 1,
+    colors TEXT NOT NULL DEFAULT '',
+    color_identity TEXT NOT NULL DEFAULT '',
+    identity_bits INTEGER,
+    mana_cost TEXT NOT NULL DEFAULT '',
+    cmc REAL,
+    type_line TEXT NOT NULL DEFAULT '',
+    card_text TEXT NOT NULL DEFAULT '',
+    power_toughness TEXT NOT NULL DEFAULT '',
+    legalities TEXT NOT NULL DEFAULT '',
+    legality INTEGER NOT NULL DEFAULT 0,
+    oracle_id TEXT NOT NULL DEFAULT '',
+    scryfall_id TEXT NOT NULL DEFAULT '',
+    row_json TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cards_name ON cards (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS cards_set ON cards (set_code, collector_number);
+CREATE INDEX IF NOT EXISTS cards_identity ON cards (identity_bits);
+CREATE INDEX IF NOT EXISTS cards_cmc ON cards (cmc);
+CREATE INDEX IF NOT EXISTS cards_source ON cards (source);
+
+-- Full-text index over name, type line and oracle text; kept in sync by the triggers below
+CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+    name, type_line, card_text, content='cards', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS cards_ai AFTER INSERT ON cards BEGIN
+    INSERT INTO cards_fts (rowid, name, type_line, card_text) VALUES (new.rowid, new.name, new.type_line, new.card_text);
+END;
+CREATE TRIGGER IF NOT EXISTS cards_ad AFTER DELETE ON cards BEGIN
+    INSERT INTO cards_fts (cards_fts, rowid, name, type_line, card_text)
+    VALUES ('delete', old.rowid, old.name, old.type_line, old.card_text);
+END;
+CREATE TRIGGER IF NOT EXISTS cards_au AFTER UPDATE OF name, type_line, card_text ON cards BEGIN
+    INSERT INTO cards_fts (cards_fts, rowid, name, type_line, card_text)
+    VALUES ('delete', old.rowid, old.name, old.type_line, old.card_text);
+    INSERT INTO cards_fts (rowid, name, type_line, card_text) VALUES (new.rowid, new.name, new.type_line, new.card_text);
+END;
+"""
+
+# Words that carry no meaning in a plain-English search ("cards that create Ally tokens")
+STOPWORDS = {'a', 'an', 'the', 'that', 'which', 'with', 'card', 'cards', 'of', 'and', 'for', 'my', 'me', 'show', 'find'}
+_FTS_SYNTAX = re.compile(r'["*():^]|\b(?:AND|OR|NOT|NEAR)\b')
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query where every remaining word must match
+
+    Text that already uses FTS5 syntax (quotes, prefix *, AND/OR/NOT, column filters) is passed
+    through. The porter tokenizer makes "create ... tokens" match "creates ... token".
+    """
+    text = text.strip()
+    if _FTS_SYNTAX.search(text):
+        return text
+    terms = [term for term in re.findall(r"[\w']+", text.lower()) if term not in STOPWORDS]
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def card_key(row: Dict) -> str:
+    """Upsert key: the ManaBox ID, or set + collector number + foil + name for CSVs without one
+
+    ManaBox exports foil and non-foil copies of a printing as separate rows with the same ID,
+    so a finish other than "normal" is appended.
+    """
+    manabox_id = (row.get('ManaBox ID') or '').strip()
+    if manabox_id:
+        foil = (row.get('Foil') or '').strip().lower()
+        return manabox_id if foil in ('', 'normal') else f"{manabox_id}:{foil}"
+    name = (row.get('Name') or row.get('Card Name') or '').strip()
+    parts = [row.get('Set code') or '', row.get('Collector number') or '', row.get('Foil') or '', name]
+    return ':'.join(part.strip().lower() for part in parts)
+
+
+def _number(value: str, kind=float):
+    try:
+        return kind(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _db_row(row: Dict, source: str, now: float) -> Dict:
+    row = {key: (value or '') for key, value in row.items() if key is not None}
+    values = {column: row.get(csv_column, '').strip() for column, csv_column in COLUMNS.items()}
+    values['name'] = values['name'] or row.get('Card Name', '').strip()
+    identity = values['color_identity'] or values['colors']
+    values.update(
+        card_key=card_key(row),
+        source=source,
+        quantity=_number(row.get('Quantity'), int) or 1,
+        # NULL (not colorless) when the row was never enriched, so color filters skip it
+        identity_bits=identity_mask(identity) if identity else None,
+        cmc=_number(row.get('CMC')),
+        legality=legality_bits(values['legalities']),
+        row_json=json.dumps(row, ensure_ascii=False),
+        updated_at=now,
+    )
+    return values
+
+
+class CollectionDB:
+    """Embedded card store with indexed filters and FTS5 search over card text
+
+    Rows are upserted by ManaBox ID, so re-importing an enriched CSV only rewrites the cards
+    it contains. Like JobQueue, every call opens its own connection and the object can be
+    shared between threads.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("COLLECTION_DB", DEFAULT_DB)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def upsert_rows(self, rows: Iterable[Dict], source: str = "") -> int:
+        """Insert or update CSV rows (dicts keyed by CSV column); returns how many were written"""
+        now = time.time()
+        values = [_db_row(row, source, now) for row in rows]
+        values = [row for row in values if row['name']]
+        if not values:
+            return 0
+
+        columns = list(values[0])
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns if column != 'card_key')
+        sql = (
+            f"INSERT INTO cards ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)}) "
+            f"ON CONFLICT(card_key) DO UPDATE SET {updates}"
+        )
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(sql, values)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(values)
+
+    def upsert_csv(self, csv_content: str, source: str = "") -> int:
+        return self.upsert_rows(csv.DictReader(StringIO(csv_content)), source)
+
+    def delete_source(self, source: str) -> int:
+        """Remove every card imported from one CSV"""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM cards WHERE source = ?", (source,)).rowcount
+
+    @staticmethod
+    def _filters(text: str = "", colors=None, format_type: Optional[str] = None,
+                 type_contains: Optional[str] = None, name: Optional[str] = None,
+                 set_code: Optional[str] = None, cmc_min: Optional[float] = None,
+                 cmc_max: Optional[float] = None, source: Optional[str] = None) -> Tuple[str, List]:
+        """FROM/WHERE clause and parameters shared by search and count"""
+        clauses, params = [], []
+        match = fts_query(text) if text else ''
+        if type_contains:
+            # Type words are in the full-text index too, so this stays an index lookup
+            type_terms = ' '.join(f'"{word}"' for word in re.findall(r"[\w']+", type_contains.lower()))
+            match = f"{match} type_line : ({type_terms})".strip() if type_terms else match
+        if match:
+            sql = "FROM cards_fts JOIN cards c ON c.rowid = cards_fts.rowid"
+            clauses.append("cards_fts MATCH ?")
+            params.append(match)
+        else:
+            sql = "FROM cards c"
+
+        if colors:
+            clauses.append("c.identity_bits IS NOT NULL AND (c.identity_bits & ?) = 0")
+            params.append(~identity_mask(colors) & 0x1F)
+        if format_type:
+            clauses.append("(c.legality & ?) != 0")
+            params.append(FORMAT_BITS.get(format_type.strip().lower(), 0))
+        if name:
+            clauses.append("c.name LIKE ?")
+            params.append(f"%{name}%")
+        if set_code:
+            clauses.append("c.set_code = ? COLLATE NOCASE")
+            params.append(set_code)
+        if cmc_min is not None:
+            clauses.append("c.cmc >= ?")
+            params.append(cmc_min)
+        if cmc_max is not None:
+            clauses.append("c.cmc <= ?")
+            params.append(cmc_max)
+        if source is not None:
+            clauses.append("c.source = ?")
+            params.append(source)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return sql, params
+
+    def search(self, text: str = "", limit: int = 50, offset: int = 0, **filters) -> List[Dict]:
+        """Cards matching the text (best matches first) and filters
+
+        Filters: colors (identity must fit inside them), format_type, type_contains, name,
+        set_code, cmc_min, cmc_max, source. Each result is the card's original CSV row.
+        """
+        sql, params = self._filters(text, **filters)
+        order = "bm25(cards_fts), c.name" if 'cards_fts' in sql else "c.name, c.set_code"
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT c.row_json {sql} ORDER BY {order} LIMIT ? OFFSET ?", (*params, limit, offset)
+            ).fetchall()
+        return [json.loads(row['row_json']) for row in rows]
+
+    def count(self, text: str = "", **filters) -> int:
+        sql, params = self._filters(text, **filters)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) {sql}", params).fetchone()[0]
+
+    def records(self, source: Optional[str] = None) -> List[Dict]:
+        """All stored rows in CSV shape, ready for the deck builders"""
+        return self.search(limit=-1, source=source)
+
+    def sources(self) -> Dict[str, int]:
+        """Card rows per imported CSV"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT source, COUNT(*) AS cards FROM cards GROUP BY source ORDER BY source").fetchall()
+        return {row['source']: row['cards'] for row in rows}
+
+
+def enrichment_db() -> Optional[CollectionDB]:
+    """Database the enrichers save cards to, or None unless SAVE_COLLECTION_DB is set
+
+    Nothing in the app queries the database yet (only `collection_db.py search` does), so
+    writing every enriched collection to it is opt-in.
+    """
+    if os.getenv("SAVE_COLLECTION_DB", "").strip().lower() in ('1', 'true', 'yes'):
+        return CollectionDB()
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import enriched collection CSVs into the card database and search it")
+    parser.add_argument('--db', help=f"Database file (default: $COLLECTION_DB or {DEFAULT_DB})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    importer = commands.add_parser('import', help="Upsert one or more CSVs (keyed by ManaBox ID)")
+    importer.add_argument('csv_files', nargs='+')
+
+    searcher = commands.add_parser('search', help="Full-text search over card text with optional filters")
+    searcher.add_argument('text', nargs='?', default='', help='e.g. "create Ally tokens"')
+    searcher.add_argument('--colors', help="Color identity to fit inside, e.g. 'U, B'")
+    searcher.add_argument('--format', dest='format_type', help="Only cards legal in this format")
+    searcher.add_argument('--type', dest='type_contains', help="Type line words, e.g. 'legendary creature'")
+    searcher.add_argument('--limit', type=int, default=25)
+    args = parser.parse_args()
+
+    db = CollectionDB(args.db)
+    if args.command == 'import':
+        for path in args.csv_files:
+            with open(path, 'r', encoding='utf-8') as f:
+                count = db.upsert_csv(f.read(), source=os.path.basename(path))
+            print(f"📥 {path}: {count} card(s) upserted")
+        return
+
+    start = time.perf_counter()
+    filters = {key: getattr(args, key) for key in ('colors', 'format_type', 'type_contains') if getattr(args, key)}
+    total = db.count(args.text, **filters)
+    cards = db.search(args.text, limit=args.limit, **filters)
+    print(f"🔍 {total} match(es) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for card in cards:
+        print(f"  {card.get('Name', '')} [{card.get('Set code', '')}] {card.get('Mana Cost', '')} - {card.get('Type Line', '')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from card_index import identity_mask
+
+TOKEN = re.compile(r"[a-z0-9']+")
+# Searches ask for at least this many characters before a word is prefix-expanded
+MIN_PREFIX = 2
+
+
+def _words(text: str) -> List[str]:
+    """Lowercased words with a plural "s" folded away ("tokens" and "token" index alike)"""
+    return [
+        word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+        for word in TOKEN.findall(text.lower())
+    ]
+
+
+def _column(df: pd.DataFrame, *names: str) -> pd.Series:
+    for name in names:
+        if name in df.columns:
+            return df[name].fillna('').astype(str)
+    return pd.Series([''] * len(df), index=df.index, dtype=object)
+
+
+class _TokenIndex:
+    """Inverted index from word to the distinct texts containing it
+
+    Texts are factorized first, so each distinct name or oracle text is tokenized once
+    and postings point at distinct texts; `codes` maps those back to rows.
+    """
+
+    def __init__(self, values: pd.Series):
+        self.codes, uniques = pd.factorize(values.str.lower())
+        self.size = len(uniques)
+        postings: Dict[str, List[int]] = {}
+        for text_id, text in enumerate(uniques):
+            for token in set(_words(text)):
+                postings.setdefault(token, []).append(text_id)
+        self.postings = {token: np.array(ids, dtype=np.int32) for token, ids in postings.items()}
+        self.vocabulary = sorted(self.postings)
+
+    def _expand(self, word: str, prefix: bool) -> List[str]:
+        if not prefix or len(word) < MIN_PREFIX:
+            return [word] if word in self.postings else []
+        start = bisect_left(self.vocabulary, word)
+        end = bisect_left(self.vocabulary, word + '\uffff', start)
+        return self.vocabulary[start:end]
+
+    def match(self, query: str) -> Optional[np.ndarray]:
+        """Row mask where every word matches (the last one as a prefix); None for an empty query"""
+        words = _words(query)
+        if not words:
+            return None
+        hits = np.ones(self.size, dtype=bool)
+        for i, word in enumerate(words):
+            word_hits = np.zeros(self.size, dtype=bool)
+            for token in self._expand(word, prefix=i == len(words) - 1):
+                word_hits[self.postings[token]] = True
+            hits &= word_hits
+        return hits[self.codes]
+
+
+class CollectionSearchIndex:
+    """Prebuilt search structures for one collection: name and text postings plus typed columns
+
+    Built once per collection (see collection_cache.ParsedCollection.search_index); each query
+    is a handful of vectorized masks, so nothing is re-parsed or re-scanned per keystroke.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        names = _column(df, 'Name', 'Card Name')
+        self.names = _TokenIndex(names)
+        self.text = _TokenIndex(_column(df, 'Card Text') + ' ' + _column(df, 'Type Line'))
+
+        # Color identity bits, falling back to the card's colors for collections never enriched
+        identity = _column(df, 'Color Identity').where(lambda s: s.str.strip() != '', _column(df, 'Card color(s)'))
+        codes, unique_identities = pd.factorize(identity)
+        unique_bits = np.array([identity_mask(value) for value in unique_identities], dtype=np.uint8)
+        self.identity = unique_bits[codes] if len(unique_bits) else np.zeros(len(df), dtype=np.uint8)
+
+        self.cmc = pd.to_numeric(_column(df, 'CMC'), errors='coerce').to_numpy()
+        self.rarity_codes, self.rarities = pd.factorize(_column(df, 'Rarity').str.lower())
+        self.set_codes, self.sets = pd.factorize(_column(df, 'Set code').str.upper())
+        # Results are listed by name; the order is computed once
+        self.order = np.argsort(names.str.lower().to_numpy(), kind='stable')
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def rarity_options(self) -> List[str]:
+        return sorted(value for value in self.rarities if value)
+
+    def set_options(self) -> List[str]:
+        return sorted(value for value in self.sets if value)
+
+    def cmc_bounds(self) -> Tuple[int, int]:
+        known = self.cmc[~np.isnan(self.cmc)]
+        return (0, int(known.max())) if len(known) else (0, 0)
+
+    @staticmethod
+    def _in(codes: np.ndarray, uniques: Sequence[str], selected: Sequence[str]) -> np.ndarray:
+        wanted = np.isin(np.asarray(uniques, dtype=object), list(selected))
+        return wanted[codes] if len(wanted) else np.zeros(len(codes), dtype=bool)
+
+    def mask(self, name: str = "", text: str = "", colors: Optional[Sequence[str]] = None,
+             cmc_range: Optional[Tuple[float, float]] = None, rarities: Optional[Sequence[str]] = None,
+             sets: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Rows matching every given filter; colors keep cards whose identity fits inside them"""
+        mask = np.ones(len(self.df), dtype=bool)
+        for index, query in ((self.names, name), (self.text, text)):
+            hits = index.match(query)
+            if hits is not None:
+                mask &= hits
+        if colors:
+            mask &= (self.identity & np.uint8(~identity_mask(colors) & 0x1F)) == 0
+        if cmc_range is not None:
+            low, high = cmc_range
+            mask &= (self.cmc >= low) & (self.cmc <= high)
+        if rarities:
+            mask &= self._in(self.rarity_codes, self.rarities, [r.lower() for r in rarities])
+        if sets:
+            mask &= self._in(self.set_codes, self.sets, [s.upper() for s in sets])
+        return mask
+
+    def search(self, page: int = 1, page_size: int = 50, **filters) -> Tuple[int, pd.DataFrame]:
+        """(total matches, rows of the requested 1-based page in name order)"""
+        mask = self.mask(**filters)
+        hits = self.order[mask[self.order]]
+        start = max(page - 1, 0) * page_size
+        return len(hits), self.df.iloc[hits[start:start + page_size]]
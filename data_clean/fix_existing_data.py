@@ -1,5 +1,4 @@
 import csv
-import requests
 import time
 from typing import Dict, Optional
 
@@ -10,6 +9,8 @@ class CSVDataFixer:
     
     def search_scryfall(self, card_name: str) -> Optional[Dict]:
         """Search Scryfall API for card information"""
+        import requests  # deferred: the CSV-only fixes never touch the network
+
         try:
             params = {'fuzzy': card_name}
             response = requests.get(self.scryfall_api, params=params)
@@ -1,9 +1,7 @@
 import csv
-import requests
 import time
 import os
 from typing import Dict, Optional
-import google.generativeai as genai
 from dotenv import load_dotenv
 
 class MagicCardUpdater:
@@ -13,6 +11,7 @@ class MagicCardUpdater:
         
         # Initialize Gemini if API key provided
         if gemini_api_key:
+            import google.generativeai as genai  # slow to import; only needed with a key
             genai.configure(api_key=gemini_api_key)
             self.gemini_model = genai.GenerativeModel('gemini-2.5-flash')
         else:
@@ -20,6 +19,8 @@ class MagicCardUpdater:
     
     def search_scryfall(self, card_name: str) -> Optional[Dict]:
         """Search Scryfall API for card information"""
+        import requests
+
         try:
             params = {'fuzzy': card_name}
             response = requests.get(self.scryfall_api, params=params)
@@ -33,6 +34,14 @@ class MagicCardUpdater:
             print(f"  ❌ Error fetching from Scryfall: {e}")
             return None
     
+    @staticmethod
+    def _face_value(card_data: Dict, key: str) -> str:
+        """Top-level Scryfall field, falling back to the front face of double-faced cards"""
+        value = card_data.get(key)
+        if value is None and card_data.get('card_faces'):
+            value = card_data['card_faces'][0].get(key)
+        return str(value) if value is not None else ''
+    
     def extract_card_data(self, card_data: Dict) -> Dict:
         """Extract relevant information from Scryfall response"""
         # Get card text and preserve formatting, replace newlines with space + newline for CSV compatibility
@@ -44,7 +53,17 @@ class MagicCardUpdater:
             'colors': ', '.join(card_data.get('colors', [])) or 'Colorless',
             'mana_cost': card_data.get('mana_cost', ''),
             'card_text': card_text,
-            'power_toughness': ''
+            'power_toughness': '',
+            # Typed fields for instant lookups (commander candidates, lands, format legality)
+            'type_line': self._face_value(card_data, 'type_line'),
+            'cmc': f"{card_data.get('cmc', 0):g}",
+            'color_identity': ', '.join(card_data.get('color_identity', [])) or 'Colorless',
+            'legalities': ', '.join(
+                fmt for fmt, status in card_data.get('legalities', {}).items() if status in ('legal', 'restricted')
+            ) or 'None',
+            'oracle_id': self._face_value(card_data, 'oracle_id'),
+            'power': self._face_value(card_data, 'power'),
+            'toughness': self._face_value(card_data, 'toughness')
         }
         
         # Handle power/toughness for creatures - use decimal format to avoid Excel date conversion
@@ -107,11 +126,17 @@ Respond with 'VERIFIED' if the data looks consistent and properly formatted, or
             rows = list(reader)
         
         # Ensure required columns exist
-        required_cols = ['Card color(s)', 'Card Text', 'Mana Cost', 'Power/Toughness']
+        required_cols = ['Card color(s)', 'Card Text', 'Mana Cost', 'Power/Toughness',
+                         'Type Line', 'CMC', 'Color Identity', 'Legalities', 'Oracle ID']
         for col in required_cols:
             if col not in fieldnames:
                 fieldnames.append(col)
         
+        # Only creatures have these, so they don't trigger an update on their own
+        for col in ['Power', 'Toughness']:
+            if col not in fieldnames:
+                fieldnames.append(col)
+        
         print(f"\n🃏 Starting Magic Card List Update")
         print(f"📄 File: {self.csv_file}")
         print(f"📊 Total cards: {len(rows)}\n")
@@ -151,7 +176,14 @@ Respond with 'VERIFIED' if the data looks consistent and properly formatted, or
                 ('Card color(s)', 'colors'),
                 ('Card Text', 'card_text'),
                 ('Mana Cost', 'mana_cost'),
-                ('Power/Toughness', 'power_toughness')
+                ('Power/Toughness', 'power_toughness'),
+                ('Type Line', 'type_line'),
+                ('CMC', 'cmc'),
+                ('Color Identity', 'color_identity'),
+                ('Legalities', 'legalities'),
+                ('Oracle ID', 'oracle_id'),
+                ('Power', 'power'),
+                ('Toughness', 'toughness')
             ]:
                 if not row.get(csv_col, '').strip():
                     row[csv_col] = extracted[data_key]
@@ -0,0 +1,216 @@
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import List, Dict, Optional
+
+
+COLOR_ALIASES = {
+    'w': 'White', 'white': 'White', 'u': 'Blue', 'blue': 'Blue', 'b': 'Black', 'black': 'Black',
+    'r': 'Red', 'red': 'Red', 'g': 'Green', 'green': 'Green',
+}
+FORMATS = {'commander': 'Commander', 'standard': 'Standard'}
+MODES = ('ai', 'seeded', 'local')
+DEFAULT_COLLECTION = "collection/ATLA.csv"
+
+EXAMPLE_JOB_FILE = """# Example job file (YAML or the same structure as JSON)
+defaults:
+  collection: collection/ATLA.csv
+  format: Commander
+jobs:
+  - name: kuruk-simic
+    colors: [Blue, Green]
+    commander: The Legend of Kuruk
+  - name: standard-boros
+    format: Standard
+    colors: W R
+    notes: Aggressive, low curve
+    mode: seeded        # ai (default), seeded or local
+    structured: true    # also write the JSON deck
+    regenerate: false   # bypass the deck cache
+"""
+
+
+def parse_colors(value) -> List[str]:
+    """Colors from a list or a string like "U G" / "Blue, Green"; unknown entries raise ValueError"""
+    if not value:
+        return []
+    items = value if isinstance(value, list) else re.split(r"[\s,/]+", str(value))
+    colors = []
+    for item in items:
+        item = str(item).strip()
+        if not item:
+            continue
+        color = COLOR_ALIASES.get(item.lower())
+        if color is None:
+            raise ValueError(f"Unknown color '{item}'")
+        if color not in colors:
+            colors.append(color)
+    return colors
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "deck"
+
+
+def normalize_job(job: Dict, defaults: Dict, position: int) -> Dict:
+    """Merge a job with the file's defaults and validate it (ValueError on a bad entry)"""
+    merged = {**defaults, **job}
+    format_type = FORMATS.get(str(merged.get('format', 'Commander')).strip().lower())
+    if format_type is None:
+        raise ValueError(f"Job {position}: unknown format '{merged.get('format')}'")
+    mode = str(merged.get('mode', 'ai')).strip().lower()
+    if mode not in MODES:
+        raise ValueError(f"Job {position}: mode must be one of {', '.join(MODES)}")
+    try:
+        colors = parse_colors(merged.get('colors'))
+    except ValueError as e:
+        raise ValueError(f"Job {position}: {e}")
+
+    commander = (merged.get('commander') or '').strip() or None
+    name = merged.get('name') or ' '.join([format_type] + colors + ([commander] if commander else []))
+    return {
+        'name': slugify(str(name)),
+        'collection': merged.get('collection') or DEFAULT_COLLECTION,
+        'format_type': format_type,
+        'colors': colors,
+        'commander': commander if format_type == 'Commander' else None,
+        'additional_notes': (merged.get('notes') or '').strip(),
+        'mode': mode,
+        'structured': bool(merged.get('structured')),
+        'regenerate': bool(merged.get('regenerate')),
+    }
+
+
+def load_jobs(path: str) -> List[Dict]:
+    """Read a YAML or JSON job file: a list of jobs or {"defaults": {...}, "jobs": [...]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    if path.lower().endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML job files need PyYAML (pip install pyyaml); use JSON otherwise")
+        data = yaml.safe_load(text)
+    else:
+        data = json.loads(text)
+
+    if isinstance(data, list):
+        data = {'jobs': data}
+    if not isinstance(data, dict) or not isinstance(data.get('jobs'), list):
+        raise ValueError("Job file must be a list of jobs or contain a 'jobs' list")
+
+    defaults = data.get('defaults') or {}
+    jobs = [normalize_job(job or {}, defaults, i) for i, job in enumerate(data['jobs'], 1)]
+
+    # Every job writes into its own directory, so names must be unique
+    seen = {}
+    for job in jobs:
+        count = seen.get(job['name'], 0)
+        seen[job['name']] = count + 1
+        if count:
+            job['name'] = f"{job['name']}-{count + 1}"
+    return jobs
+
+
+def run_job(builder_class, job: Dict, out_dir: str, api_key: Optional[str]) -> Dict:
+    """Build one deck into out_dir/<job name>/ and return its summary row"""
+    from deck_validator import parse_decklist
+
+    start = time.perf_counter()
+    summary = {'name': job['name'], 'format': job['format_type'], 'colors': job['colors'],
+               'commander': job['commander'], 'mode': job['mode'], 'status': 'ok',
+               'file': None, 'json_file': None, 'cards': 0, 'repairs': 0, 'error': None}
+
+    if not os.path.exists(job['collection']):
+        summary.update(status='error', error=f"Collection not found: {job['collection']}", seconds=0.0)
+        return summary
+    if job['mode'] != 'local' and not api_key:
+        summary.update(status='error', error="GEMINI_API_KEY is not set", seconds=0.0)
+        return summary
+
+    # One builder per job: builders keep per-build state (last deck, validation, output file)
+    builder = builder_class(api_key if job['mode'] != 'local' else None,
+                           output_dir=os.path.join(out_dir, job['name']), session_id=job['name'])
+    try:
+        if job['mode'] == 'local':
+            collection = builder.load_collection(job['collection'])
+            deck = builder.draft_locally(collection.records, job['format_type'], job['colors'], job['commander'],
+                                         collection.features, collection.synergy)
+            builder.save_deck(deck, job['format_type'], job['colors'])
+        else:
+            deck = builder.build_deck(
+                builder.load_collection(job['collection']), job['format_type'], job['colors'], job['commander'],
+                job['additional_notes'], regenerate=job['regenerate'], seed_with_draft=job['mode'] == 'seeded',
+                output_mode='json' if job['structured'] else 'markdown',
+            )
+    except Exception as e:
+        deck = f"❌ Error generating deck: {e}"
+
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    if deck.startswith("❌"):
+        summary.update(status='error', error=deck.lstrip("❌ ").strip())
+        return summary
+
+    out_file = builder.last_output_file
+    summary['file'] = os.path.relpath(out_file, out_dir) if out_file else None
+    if out_file and builder.last_deck is not None:
+        summary['json_file'] = os.path.relpath(out_file[:-3] + ".json", out_dir)
+    summary['cards'] = sum(entry['count'] for entry in parse_decklist(deck))
+    if builder.last_validation:
+        summary['repairs'] = len(builder.last_validation['changes']) + len(builder.last_validation['removed'])
+    return summary
+
+
+def write_index(out_dir: str, results: List[Dict], started: datetime, seconds: float) -> str:
+    """Write index.json and a readable index.md summarizing every job; returns the Markdown path"""
+    ok = sum(result['status'] == 'ok' for result in results)
+    with open(os.path.join(out_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({'started': started.isoformat(timespec='seconds'), 'seconds': round(seconds, 2),
+                   'succeeded': ok, 'failed': len(results) - ok, 'jobs': results}, f, indent=2)
+
+    lines = [f"# Deck Batch {started.strftime('%Y-%m-%d %H:%M')}", "",
+             f"{ok}/{len(results)} decks built in {seconds:.1f}s", "",
+             "| Job | Format | Colors | Commander | Mode | Status | Cards | Repairs | Seconds |",
+             "|-----|--------|--------|-----------|------|--------|-------|---------|---------|"]
+    for result in results:
+        job = f"[{result['name']}]({result['file']})" if result['file'] else result['name']
+        status = result['status'] if not result['error'] else f"{result['status']}: {result['error']}"
+        lines.append(f"| {job} | {result['format']} | {', '.join(result['colors']) or 'Any'} | "
+                     f"{result['commander'] or ''} | {result['mode']} | {status} | {result['cards']} | "
+                     f"{result['repairs']} | {result['seconds']:.2f} |")
+
+    path = os.path.join(out_dir, 'index.md')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return path
+
+
+def run_batch(builder_class, jobs: List[Dict], out_dir: str, api_key: Optional[str] = None,
+              max_workers: int = 2) -> List[Dict]:
+    """Run jobs with bounded concurrency, writing decks and the summary index into out_dir
+
+    `builder_class` is deck_builder.MagicDeckBuilder (it takes an output_dir and loads CSV paths).
+    Results are returned in job-file order regardless of finishing order.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    started = datetime.now()
+    start = time.perf_counter()
+    results = [None] * len(jobs)
+
+    workers = max(1, min(max_workers, len(jobs)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, builder_class, job, out_dir, api_key): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            icon = "✅" if results[i]['status'] == 'ok' else "❌"
+            print(f"{icon} [{sum(r is not None for r in results)}/{len(jobs)}] {jobs[i]['name']} "
+                  f"({results[i]['seconds']:.1f}s)")
+
+    index = write_index(out_dir, results, started, time.perf_counter() - start)
+    print(f"📑 Summary written to {index}")
+    return results
@@ -1,15 +1,58 @@
-import csv
+import argparse
 import os
-from typing import List, Dict, Optional
-import google.generativeai as genai
+import sys
+from typing import TYPE_CHECKING, List, Dict, Optional, Union
 from datetime import datetime
 from dotenv import load_dotenv
+from deck_cache import DeckCache
+from deck_schema import Deck, GENERATION_CONFIG, JSON_OUTPUT_INSTRUCTIONS
+from gemini_pool import PooledModel, pooled_model
+from instrumentation import Tracer, default_sink
+from run_metrics import record_run
+from deck_batch import EXAMPLE_JOB_FILE, load_jobs, run_batch
+
+# The collection, drafting and validation modules pull in pandas and numpy; they are imported
+# where a build needs them so `--help` and the interactive prompts start instantly
+if TYPE_CHECKING:
+    from card_similarity import SimilarityIndex
+    from collection_cache import ParsedCollection
+    from synergy_graph import SynergyGraph
 
 class MagicDeckBuilder:
-    def __init__(self, api_key: str):
-        """Initialize the deck builder with Gemini API"""
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-pro')
+    def __init__(self, api_key: Optional[str] = None, output_dir: Optional[str] = None, session_id: str = "cli",
+                 entry: str = "cli"):
+        """Initialize the deck builder with Gemini API
+
+        Used by the CLI, batch jobs, the Deck Builder page and queue workers alike. With an
+        `output_dir` every built deck is also saved there; `entry` tags the build's trace.
+        """
+        self.model_name = 'gemini-2.5-pro'
+        self.session_id = session_id
+        self.entry = entry
+        
+        # Local drafting works without an API key; the model is shared by every session and
+        # batch job, and calls wait their turn in the process-wide limiter
+        if api_key:
+            self.model = pooled_model(api_key, self.model_name, session_id)
+        else:
+            self.model = None
+        
+        # Cache of previously generated decks keyed by the normalized request
+        self.deck_cache = DeckCache()
+        
+        # Large collections are trimmed to a bounded candidate pool before prompting
+        self.max_prompt_cards = int(os.getenv("MAX_PROMPT_CARDS", "300"))
+        self.last_preselection = None
+        self.last_validation = None
+        self.last_deck = None
+        # Timed stages of the last build_deck call (also written to $BUILD_TRACE_LOG)
+        self.last_spans = []
+        # Token estimate and degradation steps of the last prompt (see prompt_budget)
+        self.last_budget = None
+        
+        # Saved decks go here; last_output_file is the most recent one
+        self.output_dir = output_dir
+        self.last_output_file = None
         
         # Knowledge base directories
         self.knowledge_base = {
@@ -18,27 +61,28 @@ class MagicDeckBuilder:
             'general': 'knowledge/general'
         }
     
-    def load_collection(self, csv_file: str) -> List[Dict]:
-        """Load the user's card collection from CSV"""
-        print(f"📚 Loading collection from {csv_file}...")
-        
+    def load_collection(self, csv_file: str) -> "ParsedCollection":
+        """Load the user's card collection from a CSV file"""
+        from collection_cache import parse_collection
+
         with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            cards = list(reader)
-        
-        print(f"✅ Loaded {len(cards)} cards from collection\n")
-        return cards
+            return parse_collection(f.read())
     
-    def load_knowledge_base(self, format_type: str) -> str:
+    def load_collection_from_string(self, csv_content: Union[str, "ParsedCollection"]) -> List[Dict]:
+        """Load the user's card collection from CSV string or an already parsed collection"""
+        from collection_cache import as_collection
+
+        return list(as_collection(csv_content).records)
+    
+    def load_knowledge_base(self, format_type: str, progress_callback=None) -> str:
         """Load relevant knowledge base documents from directories"""
-        print(f"📖 Loading knowledge base for {format_type}...")
-        
+        log = progress_callback or print
         knowledge_content = ""
         files_loaded = 0
         
         # Load general knowledge from directory
         if os.path.exists(self.knowledge_base['general']) and os.path.isdir(self.knowledge_base['general']):
-            general_files = [f for f in os.listdir(self.knowledge_base['general']) 
+            general_files = [f for f in sorted(os.listdir(self.knowledge_base['general'])) 
                            if f.endswith(('.txt', '.md'))]
             for filename in general_files:
                 filepath = os.path.join(self.knowledge_base['general'], filename)
@@ -50,7 +94,7 @@ class MagicDeckBuilder:
         format_key = format_type.lower()
         if format_key in self.knowledge_base and os.path.exists(self.knowledge_base[format_key]):
             if os.path.isdir(self.knowledge_base[format_key]):
-                format_files = [f for f in os.listdir(self.knowledge_base[format_key]) 
+                format_files = [f for f in sorted(os.listdir(self.knowledge_base[format_key])) 
                               if f.endswith(('.txt', '.md'))]
                 for filename in format_files:
                     filepath = os.path.join(self.knowledge_base[format_key], filename)
@@ -59,10 +103,10 @@ class MagicDeckBuilder:
                         files_loaded += 1
         
         if not knowledge_content:
-            print("⚠️  No knowledge base files found. Creating basic guidelines...")
+            log("⚠️ No knowledge base files found. Using basic guidelines...")
             knowledge_content = self.create_default_knowledge(format_type)
         else:
-            print(f"✅ Loaded {files_loaded} knowledge base file(s)\n")
+            log(f"✅ Loaded {files_loaded} knowledge base file(s)")
         
         return knowledge_content
     
@@ -96,7 +140,7 @@ class MagicDeckBuilder:
         
         filtered = []
         for card in cards:
-            card_colors = card.get('Card Color(s)', '').upper()
+            card_colors = card.get('Card color(s)', card.get('Card Color(s)', '')).upper()
             
             # Check if card is colorless or matches color preferences
             if 'COLORLESS' in card_colors or not card_colors:
@@ -115,22 +159,33 @@ class MagicDeckBuilder:
                 if all(cc in user_color_codes for cc in card_color_codes):
                     filtered.append(card)
         
-        print(f"🎨 Filtered to {len(filtered)} cards matching color preference\n")
         return filtered
     
+    def filter_by_format(self, cards: List[Dict], format_type: str, progress_callback=None) -> List[Dict]:
+        """Drop cards not legal in the format (only when the collection has legality data)"""
+        from legality import filter_legal
+
+        legal_cards, removed = filter_legal(cards, format_type)
+        if removed:
+            (progress_callback or print)(f"⚖️ Removed {removed} card(s) not legal in {format_type}")
+        return legal_cards
+    
     def format_collection_for_prompt(self, cards: List[Dict]) -> str:
         """Format card collection for the AI prompt"""
         collection_text = "# USER'S CARD COLLECTION\n\n"
         
         for card in cards:
-            card_name = card.get('Card Name', 'Unknown')
-            colors = card.get('Card Color(s)', 'Unknown')
+            card_name = card.get('Card Name', card.get('Name', 'Unknown'))
+            colors = card.get('Card color(s)', card.get('Card Color(s)', 'Unknown'))
             mana_cost = card.get('Mana Cost', 'Unknown')
             card_text = card.get('Card Text', 'No text')
             pt = card.get('Power/Toughness', '')
             is_fancy = card.get('Is Fancy', 'No')
+            type_line = card.get('Type Line', '')
             
             collection_text += f"**{card_name}**\n"
+            if type_line:
+                collection_text += f"- Type: {type_line}\n"
             collection_text += f"- Colors: {colors}\n"
             collection_text += f"- Mana Cost: {mana_cost}\n"
             if pt:
@@ -140,6 +195,77 @@ class MagicDeckBuilder:
         
         return collection_text
     
+    def preselect_for_prompt(self, cards: List[Dict], commander: Optional[str] = None,
+                             additional_notes: str = "", progress_callback=None,
+                             synergy: Optional["SynergyGraph"] = None) -> List[Dict]:
+        """Keep only the top candidates per role when the collection is too large to prompt with"""
+        from candidate_pool import preselect_candidates
+
+        if len(cards) <= self.max_prompt_cards:
+            self.last_preselection = None
+            return cards
+        
+        kept, report = preselect_candidates(cards, commander=commander, additional_notes=additional_notes,
+                                            synergy=synergy, max_cards=self.max_prompt_cards)
+        self.last_preselection = report
+        (progress_callback or print)(f"✂️ Preselected {report['kept']} of {report['unique']} unique cards "
+                                     f"({len(report['pruned'])} pruned)")
+        return kept
+    
+    def validate_and_repair(self, deck: Union[str, Deck], cards: List[Dict], format_type: str, colors: List[str],
+                            commander: Optional[str] = None, progress_callback=None,
+                            similarity: Optional["SimilarityIndex"] = None) -> Union[str, Deck]:
+        """Check the decklist (Markdown or structured) against the collection and re-prompt only for the offending slots"""
+        from deck_validator import DeckValidator
+
+        validator = DeckValidator(cards, format_type, colors, commander, self.create_default_knowledge(format_type),
+                                  similarity)
+        generate = lambda prompt: self.model.generate_content(prompt).text
+        if isinstance(deck, Deck):
+            deck, report = validator.repair_deck(deck, generate)
+        else:
+            deck, report = validator.repair(deck, generate)
+        self.last_validation = report
+        
+        log = progress_callback or print
+        if report['changes'] or report['removed']:
+            log(f"🛠️ Repaired {len(report['changes'])} slot(s), removed {len(report['removed'])} card(s)")
+        else:
+            log("✅ Decklist matches your collection")
+        return deck
+    
+    def draft_locally(self, cards: List[Dict], format_type: str, colors: List[str],
+                      commander: Optional[str] = None, features=None,
+                      synergy: Optional["SynergyGraph"] = None) -> str:
+        """Draft a legal deck with local heuristics (no AI call) and return it as Markdown"""
+        from deck_drafter import DeckDrafter
+        from synergy_graph import SynergyGraph
+
+        if synergy is None:
+            synergy = SynergyGraph.from_cards(cards)
+        drafter = DeckDrafter(self.create_default_knowledge(format_type))
+        draft = drafter.draft(cards, format_type, colors, commander, features, synergy)
+        return drafter.to_markdown(draft)
+    
+    def format_commander_candidates(self, cards: List[Dict], colors: List[str]) -> str:
+        """Legendary creatures from the collection that can lead the deck (empty if not enriched)"""
+        from card_index import build_card_index
+
+        candidates = build_card_index(cards).commander_candidates(colors)
+        if not candidates:
+            return ""
+        return "\n\n# COMMANDER CANDIDATES\nChoose the commander from these legendary creatures:\n" + \
+            "\n".join(f"- {name}" for name in candidates)
+    
+    def format_seed_for_prompt(self, draft_markdown: str) -> str:
+        """Wrap a local draft so the model refines it instead of starting from scratch"""
+        return f"""# STARTING DRAFT
+A legal draft was assembled locally from the collection. Use it as your starting point:
+keep the structure, swap weak or off-plan slots for better cards from the collection,
+and keep the deck legal (size, copy limits, color identity).
+
+{draft_markdown}"""
+    
     def build_system_prompt(self, format_type: str, colors: List[str], 
                            commander: Optional[str], additional_notes: str,
                            knowledge: str) -> str:
@@ -249,86 +375,240 @@ You are a skilled assistant with extensive expertise in building Magic: The Gath
         
         return prompt
     
-    def build_deck(self, csv_file: str, format_type: str, colors: List[str],
-                   commander: Optional[str] = None, additional_notes: str = "") -> str:
-        """Main method to build a deck"""
-        
-        print("=" * 60)
-        print("🃏 MAGIC DECK BUILDER")
-        print("=" * 60)
-        print(f"Format: {format_type}")
-        print(f"Colors: {', '.join(colors) if colors else 'Any'}")
-        if commander:
-            print(f"Commander: {commander}")
-        print("=" * 60)
-        print()
-        
-        # Load collection
-        cards = self.load_collection(csv_file)
-        
-        # Filter by colors
-        filtered_cards = self.filter_by_colors(cards, colors)
-        
-        if not filtered_cards:
-            return "❌ Error: No cards found matching the color preference!"
-        
-        # Load knowledge base
-        knowledge = self.load_knowledge_base(format_type)
-        
-        # Format collection for prompt
-        print("📝 Formatting collection for AI...")
-        collection_text = self.format_collection_for_prompt(filtered_cards)
-        
-        # Build system prompt
-        print("🔧 Building prompt...")
-        system_prompt = self.build_system_prompt(
-            format_type, colors, commander, additional_notes, knowledge
-        )
-        
-        # Combine everything
-        full_prompt = f"{system_prompt}\n\n{collection_text}"
-        
-        # Call Gemini
-        print("🤖 Generating deck with Gemini AI...\n")
-        print("⏳ This may take a moment...\n")
-        
-        try:
-            response = self.model.generate_content(full_prompt)
-            result = response.text
+    @property
+    def last_outcome(self) -> Optional[str]:
+        """How the last build_deck call ended: 'ok', 'cached', 'no_cards', 'over_budget' or 'error'"""
+        root = next((span for span in self.last_spans if span['parent'] is None), None)
+        return root.get('outcome') if root else None
+    
+    def build_deck(self, csv_content: Union[str, "ParsedCollection"], format_type: str, colors: List[str],
+                   commander: Optional[str] = None, additional_notes: str = "",
+                   progress_callback=None, regenerate: bool = False,
+                   seed_with_draft: bool = False, output_mode: str = "markdown") -> str:
+        """Main method to build a deck
+
+        `csv_content` is the collection as CSV text or already parsed (see `load_collection`).
+        Progress messages go to `progress_callback`, or are printed without one. With
+        output_mode="json" the model returns a schema-constrained deck, kept in self.last_deck;
+        the returned Markdown is rendered from it. Each stage is recorded as a span (wall time,
+        card counts, prompt size, tokens) in self.last_spans and the trace sink.
+        """
+        from collection_cache import as_collection
+        from prompt_budget import PromptTooLarge, compact_collection_text, fit_prompt, top_k_pruner
+
+        log = progress_callback or print
+        collection = as_collection(csv_content)
+        
+        # One trace per build: each stage is a timed span written to the trace sink, and the
+        # finished trace becomes a row of run metrics
+        tracer = Tracer(default_sink(), on_finish=record_run, entry=self.entry, session=self.session_id)
+        with tracer.activate(), tracer.span('build_deck', format=format_type, colors=list(colors or []),
+                                            commander=commander, output_mode=output_mode,
+                                            seed_with_draft=seed_with_draft) as build:
+            self.last_spans = tracer.spans
+            # Load collection
+            log("📚 Loading collection...")
+            with tracer.span('load_collection') as stage:
+                cards = self.load_collection_from_string(collection)
+                stage['cards'] = len(cards)
+            log(f"✅ Loaded {len(cards)} cards from collection")
+        
+            # Return a previously generated deck for an identical request
+            with tracer.span('cache_lookup') as stage:
+                cache_key = self.deck_cache.make_key(
+                    cards, format_type, colors, commander, additional_notes, self.model_name,
+                    seed_with_draft=seed_with_draft, output_mode=output_mode
+                )
+                self.last_deck = None
+                cached_entry = None if regenerate else self.deck_cache.get_entry(cache_key)
+                stage.update(hit=bool(cached_entry and cached_entry.get('deck')), skipped=regenerate)
+            if cached_entry and cached_entry.get('deck'):
+                if 'deck' in cached_entry.get('metadata', {}):
+                    self.last_deck = Deck.from_dict(cached_entry['metadata']['deck'], format_type, colors)
+                log("♻️ Found a cached deck for this exact request")
+                self.save_if_configured(cached_entry['deck'], format_type, colors, log)
+                log("✅ Deck generation complete! (from cache)")
+                build['outcome'] = 'cached'
+                return cached_entry['deck']
+        
+            # Filter by colors
+            log("🎨 Filtering cards by color preference...")
+            with tracer.span('filter_cards', cards_before=len(cards)) as stage:
+                filtered_cards = self.filter_by_colors(cards, colors)
+                stage['cards_after_colors'] = len(filtered_cards)
+        
+                # Keep only format-legal cards so the model never sees rotated ones
+                filtered_cards = self.filter_by_format(filtered_cards, format_type, log)
+                stage['cards_after'] = len(filtered_cards)
+        
+            if not filtered_cards:
+                build['outcome'] = 'no_cards'
+                return "❌ Error: No cards found matching the color preference!"
+            log(f"✅ Filtered to {len(filtered_cards)} cards")
+        
+            # Load knowledge base
+            log(f"📖 Loading knowledge base for {format_type}...")
+            with tracer.span('load_knowledge') as stage:
+                knowledge = self.load_knowledge_base(format_type, log)
+                stage['knowledge_bytes'] = len(knowledge.encode('utf-8'))
+        
+            # Trim very large collections to a bounded pool of candidates
+            synergy = collection.synergy if commander else None
+            with tracer.span('preselect', cards_before=len(filtered_cards)) as stage:
+                prompt_cards = self.preselect_for_prompt(filtered_cards, commander, additional_notes, log, synergy)
+                stage['cards_after'] = len(prompt_cards)
+        
+            # Optionally hand the model a local draft to refine
+            if seed_with_draft:
+                log("⚡ Drafting a local starting deck...")
+                with tracer.span('seed_draft'):
+                    draft_markdown = self.draft_locally(cards, format_type, colors, commander,
+                                                        collection.features, collection.synergy)
+                seed_text = f"\n\n{self.format_seed_for_prompt(draft_markdown)}"
+            else:
+                seed_text = ""
+        
+            # Format collection for prompt
+            log("📝 Formatting collection for AI...")
+            with tracer.span('format_prompt') as stage:
+                # Build system prompt
+                log("🔧 Building prompt...")
+        
+                # Enriched collections list the legal commanders so the model doesn't have to guess
+                extras = ""
+                if format_type.lower() == 'commander' and not commander:
+                    extras += self.format_commander_candidates(filtered_cards, colors)
+                extras += seed_text
+        
+                # Structured mode: constrain the response to the deck JSON schema
+                generation_config = None
+                if output_mode == "json":
+                    extras += f"\n{JSON_OUTPUT_INSTRUCTIONS}"
+                    generation_config = GENERATION_CONFIG
+        
+                def render(prompt_cards: List[Dict], knowledge: str, compact: bool) -> str:
+                    collection_text = (compact_collection_text(prompt_cards) if compact
+                                       else self.format_collection_for_prompt(prompt_cards))
+                    system_prompt = self.build_system_prompt(format_type, colors, commander, additional_notes, knowledge)
+                    return f"{system_prompt}\n\n{collection_text}{extras}"
+        
+                # Estimate tokens before the call; compact, trim or prune until the prompt fits the budget
+                try:
+                    full_prompt, self.last_budget = fit_prompt(
+                        render, prompt_cards, knowledge, top_k_pruner(commander, additional_notes, synergy),
+                        log=log)
+                except PromptTooLarge as e:
+                    build['outcome'] = 'over_budget'
+                    self.last_budget = None
+                    error_msg = f"❌ {e}"
+                    log(error_msg)
+                    return error_msg
+                stage.update(cards=self.last_budget['cards'], estimated_tokens=self.last_budget['final_tokens'],
+                             budget=self.last_budget['budget'], degraded=len(self.last_budget['steps']))
+        
+            # Call Gemini
+            log("🤖 Generating deck with Gemini AI... (this may take a moment)")
+        
+            if progress_callback and isinstance(self.model, PooledModel):
+                self.model.on_wait = lambda ahead: progress_callback(
+                    f"⏳ Gemini is busy with other builds; waiting for a free slot ({ahead} request(s) ahead)")
+        
+            try:
+                with tracer.span('generate', prompt_bytes=len(full_prompt.encode('utf-8'))):
+                    response = self.model.generate_content(full_prompt, generation_config=generation_config)
+                    result = response.text
+                    if output_mode == "json":
+                        result = Deck.from_json(result, format_type, colors)
             
-            # Save the deck
-            output_file = self.save_deck(result, format_type, colors)
+                # Fix only the slots that break the rules instead of regenerating the whole deck
+                log("🔍 Validating decklist against the collection...")
+                with tracer.span('validate') as stage:
+                    result = self.validate_and_repair(result, cards, format_type, colors, commander, log,
+                                                      collection.similarity)
+                    stage.update(repaired=len(self.last_validation['changes']),
+                                 removed=len(self.last_validation['removed']))
             
-            print("\n" + "=" * 60)
-            print(f"✅ DECK BUILDING COMPLETE!")
-            print(f"💾 Saved to: {output_file}")
-            print("=" * 60)
+                metadata = {'format': format_type, 'colors': colors, 'commander': commander}
+                if isinstance(result, Deck):
+                    self.last_deck = result
+                    metadata['deck'] = result.to_dict()
+                    result = result.to_markdown()
             
-            return result
+                # Cache the deck for identical future requests
+                self.deck_cache.put(cache_key, result, metadata)
+                self.save_if_configured(result, format_type, colors, log)
+                log("✅ Deck generation complete!")
             
-        except Exception as e:
-            error_msg = f"❌ Error generating deck: {e}"
-            print(error_msg)
-            return error_msg
+                build['outcome'] = 'ok'
+                return result
+            
+            except Exception as e:
+                build.update(outcome='error', error=f"{type(e).__name__}: {e}")
+                error_msg = f"❌ Error generating deck: {e}"
+                log(error_msg)
+                return error_msg
+    
+    def save_if_configured(self, deck_content: str, format_type: str, colors: List[str], log=print):
+        """Save the deck when the builder has an output_dir (the CLI and batch jobs)"""
+        if self.output_dir is not None:
+            output_file = self.save_deck(deck_content, format_type, colors, self.last_deck)
+            log(f"💾 Saved to: {output_file}")
     
-    def save_deck(self, deck_content: str, format_type: str, colors: List[str]) -> str:
-        """Save the generated deck to a file"""
+    def save_deck(self, deck_content: str, format_type: str, colors: List[str],
+                  deck: Optional[Deck] = None) -> str:
+        """Save the generated deck to a file (plus a .json next to it for structured decks)"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         color_str = "_".join(colors) if colors else "any"
-        filename = f"deck_{format_type}_{color_str}_{timestamp}.md"
+        os.makedirs(self.output_dir, exist_ok=True)
+        filename = os.path.join(self.output_dir, f"deck_{format_type}_{color_str}_{timestamp}.md")
         
         with open(filename, 'w', encoding='utf-8') as f:
             f.write(deck_content)
         
+        if deck is not None:
+            with open(filename[:-3] + ".json", 'w', encoding='utf-8') as f:
+                f.write(deck.to_json())
+        
+        self.last_output_file = filename
         return filename
 
 
+def run_batch_mode(args) -> int:
+    """Build every deck in a job file unattended; returns the process exit code"""
+    try:
+        jobs = load_jobs(args.jobs)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: could not read job file: {e}")
+        return 2
+    
+    out_dir = args.out or os.path.join("batch_output", datetime.now().strftime("%Y%m%d_%H%M%S"))
+    print(f"🗂️  Running {len(jobs)} job(s) from {args.jobs} with {args.workers} worker(s) into {out_dir}\n")
+    results = run_batch(MagicDeckBuilder, jobs, out_dir, os.getenv("GEMINI_API_KEY"), args.workers)
+    
+    failed = [result for result in results if result['status'] != 'ok']
+    print(f"\n{'✅' if not failed else '⚠️ '} {len(results) - len(failed)}/{len(results)} deck(s) built")
+    for result in failed:
+        print(f"  ❌ {result['name']}: {result['error']}")
+    return 1 if failed else 0
+
+
 def main():
-    """Main interactive function"""
+    """Main interactive function (or batch mode with --jobs)"""
     
     # Load environment variables from .env file
     load_dotenv()
     
+    parser = argparse.ArgumentParser(
+        description="Build Magic decks from your collection. Without --jobs the builder asks for each option.",
+        epilog=EXAMPLE_JOB_FILE, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', help="YAML or JSON job file; builds every job without prompting")
+    parser.add_argument('--out', help="Output directory for batch results (default: batch_output/<timestamp>)")
+    parser.add_argument('--workers', type=int, default=2, help="Jobs built concurrently in batch mode (default: 2)")
+    args = parser.parse_args()
+    
+    if args.jobs:
+        sys.exit(run_batch_mode(args))
+    
     # Get API key
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
@@ -337,7 +617,7 @@ def main():
         return
     
     # Initialize builder
-    builder = MagicDeckBuilder(api_key)
+    builder = MagicDeckBuilder(api_key, output_dir=".")
     
     # Get user inputs
     print("\n" + "=" * 60)
@@ -393,9 +673,38 @@ def main():
     print("\n📝 Any additional notes or preferences?")
     additional_notes = input("(Press Enter to skip): ").strip()
     
-    # Build the deck
-    print("\n")
-    deck = builder.build_deck(csv_file, format_type, colors, commander, additional_notes)
+    # Build mode
+    print("\n⚙️  Select build mode:")
+    print("1. AI deck (Gemini)")
+    print("2. AI deck seeded with a local draft")
+    print("3. Instant local draft (no AI)")
+    mode_choice = input("Enter choice (1, 2 or 3): ").strip()
+    
+    if mode_choice == "3":
+        collection = builder.load_collection(csv_file)
+        deck = builder.draft_locally(collection.records, format_type, colors, commander, collection.features,
+                                     collection.synergy)
+        output_file = builder.save_deck(deck, format_type, colors)
+        print(f"💾 Saved to: {output_file}")
+    else:
+        # Cache bypass
+        regenerate = input("\n🔄 Regenerate even if a cached deck exists? (y/n): ").strip().lower() == 'y'
+        
+        # Structured output
+        structured = input("🧾 Request a structured JSON deck (also saved as .json)? (y/n): ").strip().lower() == 'y'
+        
+        # Build the deck
+        print("\n" + "=" * 60)
+        print("🃏 MAGIC DECK BUILDER")
+        print("=" * 60)
+        print(f"Format: {format_type}")
+        print(f"Colors: {', '.join(colors) if colors else 'Any'}")
+        if commander:
+            print(f"Commander: {commander}")
+        print("=" * 60 + "\n")
+        deck = builder.build_deck(builder.load_collection(csv_file), format_type, colors, commander, additional_notes,
+                                  regenerate=regenerate, seed_with_draft=mode_choice == "2",
+                                  output_mode="json" if structured else "markdown")
     
     # Display result
     print("\n" + "=" * 60)
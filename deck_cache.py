@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import time
+from typing import List, Dict, Optional
+
+
+class DeckCache:
+    """Persistent on-disk cache of generated decks keyed by the normalized build request"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 200,
+                 max_bytes: int = 50 * 1024 * 1024, max_age_days: float = 30):
+        self.cache_dir = cache_dir or os.getenv("DECK_CACHE_DIR", ".deck_cache")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+
+    @staticmethod
+    def normalize_collection(cards: List[Dict]) -> List[List]:
+        """Reduce a collection to a stable form: trimmed values, sorted columns and rows"""
+        rows = []
+        for card in cards:
+            items = sorted(
+                (str(key).strip(), str(value).strip())
+                for key, value in card.items()
+                if key is not None and value is not None
+            )
+            rows.append([list(item) for item in items])
+        rows.sort(key=lambda row: json.dumps(row, ensure_ascii=False))
+        return rows
+
+    def make_key(self, cards: List[Dict], format_type: str, colors: List[str],
+                 commander: Optional[str], additional_notes: str,
+                 model_name: str = "", **extra) -> str:
+        """Hash the collection contents together with every build parameter"""
+        color_codes = sorted({c.strip()[0].upper() for c in colors or [] if c.strip() and c != 'Any'})
+        request = {
+            'collection': self.normalize_collection(cards),
+            'format': (format_type or '').strip().lower(),
+            'colors': color_codes,
+            'commander': ' '.join((commander or '').split()).casefold(),
+            'notes': ' '.join((additional_notes or '').split()),
+            'model': model_name,
+            'extra': {k: extra[k] for k in sorted(extra)},
+        }
+        payload = json.dumps(request, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached deck for a key, or None if missing or expired"""
+        entry = self.get_entry(key)
+        return entry.get('deck') if entry else None
+
+    def get_entry(self, key: str) -> Optional[Dict]:
+        """Return the whole cache entry (deck and metadata) for a key"""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age_seconds:
+                self._remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        return entry if isinstance(entry, dict) else None
+
+    def put(self, key: str, deck: str, metadata: Optional[Dict] = None):
+        """Store a deck and evict old entries"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {'key': key, 'created_at': time.time(), 'metadata': metadata or {}, 'deck': deck}
+
+        # Write to a temp file first so concurrent readers never see a partial entry
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the oldest ones until under the size limits"""
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        now = time.time()
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                self._remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total_bytes -= size
+
+    def clear(self):
+        """Remove every cached deck"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.json'):
+                self._remove(os.path.join(self.cache_dir, filename))
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,409 @@
+import re
+from typing import List, Dict, Optional, Set, Tuple
+
+import pandas as pd
+
+from card_features import card_roles, extract_features
+from mana import MANA_SYMBOL, pip_counts
+from card_index import front_type_line, has_type_line, is_legendary_creature
+from legality import FORMAT_BITS, legal_mask
+from synergy_graph import SynergyGraph
+
+COLOR_CODES = {'WHITE': 'W', 'BLUE': 'U', 'BLACK': 'B', 'RED': 'R', 'GREEN': 'G'}
+BASIC_LANDS = {'W': 'Plains', 'U': 'Island', 'B': 'Swamp', 'R': 'Mountain', 'G': 'Forest', 'C': 'Wastes'}
+BASIC_LAND_NAMES = set(BASIC_LANDS.values()) | {f"Snow-Covered {name}" for name in BASIC_LANDS.values()}
+
+ROLE_ORDER = ['ramp', 'removal', 'draw', 'wincon']
+
+LAND_MANA = re.compile(r"\{t\}[^|]*: add ")
+QUOTA_LINE = re.compile(r"^-\s*(?P<label>[^:\d]+?)\s*:\s*(?P<low>\d+)(?:\s*-\s*(?P<high>\d+))?", re.MULTILINE)
+DECK_SIZE = re.compile(r"(\d+) cards (?:total|minimum)")
+MAX_COPIES = re.compile(r"up to (\d+) copies", re.IGNORECASE)
+
+
+def parse_guidelines(knowledge: str) -> Dict:
+    """Turn the bullet list from create_default_knowledge into numeric quotas"""
+    text = knowledge.lower()
+    guidelines = {
+        'deck_size': 60,
+        'max_copies': 4,
+        'lands': 24,
+        'quotas': {},
+    }
+
+    size_match = DECK_SIZE.search(text)
+    if size_match:
+        guidelines['deck_size'] = int(size_match.group(1))
+
+    copies_match = MAX_COPIES.search(text)
+    if 'singleton' in text:
+        guidelines['max_copies'] = 1
+    elif copies_match:
+        guidelines['max_copies'] = int(copies_match.group(1))
+
+    for match in QUOTA_LINE.finditer(text):
+        label = match.group('label')
+        low = int(match.group('low'))
+        high = int(match.group('high') or low)
+        target = (low + high) // 2
+        if 'land' in label:
+            guidelines['lands'] = target
+        elif 'ramp' in label:
+            guidelines['quotas']['ramp'] = target
+        elif 'draw' in label:
+            guidelines['quotas']['draw'] = target
+        elif 'removal' in label:
+            guidelines['quotas']['removal'] = target
+        elif 'win' in label:
+            guidelines['quotas']['wincon'] = target
+
+    return guidelines
+
+
+def color_codes(colors: List[str]) -> Set[str]:
+    """Map color names like 'Blue' (or codes like 'U') to WUBRG codes"""
+    codes = set()
+    for color in colors or []:
+        color = color.strip().upper()
+        if color in COLOR_CODES:
+            codes.add(COLOR_CODES[color])
+        elif color in ('W', 'U', 'B', 'R', 'G'):
+            codes.add(color)
+    return codes
+
+
+def card_name(card: Dict) -> str:
+    return (card.get('Card Name') or card.get('Name') or '').strip()
+
+
+def color_identity(card: Dict) -> Set[str]:
+    """Color identity from the color column plus mana symbols in cost and rules text"""
+    # Enriched collections carry Scryfall's color identity directly
+    if (card.get('Color Identity') or '').strip():
+        return {code.strip() for code in card['Color Identity'].split(',') if code.strip() in COLOR_CODES.values()}
+
+    identity = set()
+    colors = card.get('Card color(s)', card.get('Card Color(s)', '')) or ''
+    for color in colors.upper().split(','):
+        color = color.strip()
+        code = COLOR_CODES.get(color, color)
+        if code in ('W', 'U', 'B', 'R', 'G'):
+            identity.add(code)
+
+    symbols = MANA_SYMBOL.findall(f"{card.get('Mana Cost', '')} {card.get('Card Text', '')}")
+    for symbol in symbols:
+        identity.update(ch for ch in symbol.upper() if ch in 'WUBRG')
+    return identity
+
+
+def is_land(card: Dict) -> bool:
+    if card_name(card) in BASIC_LAND_NAMES:
+        return True
+    if has_type_line(card):
+        return 'Land' in front_type_line(card)
+    text = (card.get('Card Text') or '').lower()
+    return not (card.get('Mana Cost') or '').strip() and not card.get('Power/Toughness') and bool(LAND_MANA.search(text))
+
+
+def card_type(card: Dict) -> str:
+    """Best-effort card type for grouping the decklist"""
+    if has_type_line(card):
+        type_line = front_type_line(card)
+        for type_name in ('Creature', 'Land', 'Enchantment', 'Artifact'):
+            if type_name in type_line:
+                return type_name
+        return 'Other'
+    if is_land(card):
+        return 'Land'
+    if card.get('Power/Toughness'):
+        return 'Creature'
+    text = (card.get('Card Text') or '').lower()
+    if text.startswith('enchant ') or 'this enchantment' in text:
+        return 'Enchantment'
+    if 'equip ' in text or 'this artifact' in text or 'this vehicle' in text:
+        return 'Artifact'
+    return 'Other'
+
+
+def is_fancy(card: Dict) -> bool:
+    if card.get('Is Fancy'):
+        return card['Is Fancy'].strip().lower() in ('yes', 'true', '1')
+    return (card.get('Foil') or 'normal').strip().lower() not in ('', 'normal')
+
+
+def card_power(card: Dict) -> float:
+    # Power/Toughness is stored as "power.toughness" to dodge spreadsheet date conversion
+    pt = card.get('Power/Toughness') or ''
+    power = pt.replace('/', '.').split('.')[0]
+    return float(power) if power.isdigit() else 0.0
+
+
+class DeckDrafter:
+    """Drafts a format-legal deck from the collection using local heuristics, no AI involved"""
+
+    def __init__(self, knowledge: str):
+        self.guidelines = parse_guidelines(knowledge)
+
+    def prepare(self, cards: List[Dict], features: Optional[pd.DataFrame] = None) -> List[Dict]:
+        """Merge duplicate rows and annotate each card with identity, cmc, type and roles"""
+        if features is None:
+            features = extract_features(pd.DataFrame(cards))
+        roles = card_roles(features, ROLE_ORDER).tolist()
+        cmcs = features['cmc'].tolist()
+        
+        merged = {}
+        for card, card_role_list, cmc in zip(cards, roles, cmcs):
+            name = card_name(card)
+            if not name:
+                continue
+            land = is_land(card)
+            # Tokens and faces without a mana cost can't be cast from a deck
+            if not land and not (card.get('Mana Cost') or '').strip():
+                continue
+            try:
+                quantity = int(card.get('Quantity') or 1)
+            except ValueError:
+                quantity = 1
+
+            key = name.lower()
+            if key in merged:
+                merged[key]['quantity'] += quantity
+                merged[key]['is_fancy'] = merged[key]['is_fancy'] or is_fancy(card)
+                continue
+
+            merged[key] = {
+                'name': name,
+                'identity': color_identity(card),
+                'cmc': cmc,
+                'mana_cost': card.get('Mana Cost', ''),
+                'type': card_type(card),
+                'roles': [] if land else card_role_list,
+                'power': card_power(card),
+                'quantity': quantity,
+                'is_fancy': is_fancy(card),
+                'is_land': land,
+                'is_basic': name in BASIC_LAND_NAMES,
+                'is_legendary': is_legendary_creature(card),
+                'has_type_line': has_type_line(card),
+                'text': card.get('Card Text', ''),
+            }
+        return list(merged.values())
+
+    def choose_commander(self, pool: List[Dict], allowed: Set[str],
+                         commander: Optional[str]) -> Tuple[Optional[Dict], List[str]]:
+        warnings = []
+        creatures = [c for c in pool if c['type'] == 'Creature']
+        if commander:
+            wanted = commander.strip().lower()
+            matches = [c for c in creatures if c['name'].lower() == wanted] or \
+                      [c for c in creatures if c['name'].lower().startswith(wanted)]
+            if matches:
+                return matches[0], warnings
+            warnings.append(f"Commander '{commander}' was not found in the collection; picked one instead")
+
+        # Enriched collections know which creatures are legendary; older ones can only guess
+        verified = any(c['has_type_line'] for c in creatures)
+        candidates = [c for c in creatures if c['identity'] and c['identity'] <= allowed
+                      and (c['is_legendary'] or not verified)]
+        if not candidates:
+            warnings.append("No creature in the collection fits the color preference to lead the deck")
+            return None, warnings
+        best = max(candidates, key=lambda c: (len(c['identity']), c['power'], c['cmc'], c['name']))
+        if not verified:
+            warnings.append(f"Suggested commander '{best['name']}' (legendary status not verified)")
+        return best, warnings
+
+    @staticmethod
+    def spell_score(card: Dict) -> Tuple:
+        # Prefer multi-role cards, creatures and a curve centred on 2-4 mana
+        return (len(card['roles']), card['type'] == 'Creature', -abs(card['cmc'] - 3), card['is_fancy'], card['name'])
+
+    def draft(self, cards: List[Dict], format_type: str, colors: List[str],
+              commander: Optional[str] = None, features: Optional[pd.DataFrame] = None,
+              synergy: Optional[SynergyGraph] = None) -> Dict:
+        """Draft a deck and return its cards, chosen commander and any warnings
+
+        Format violations the draft could not avoid (see `check`) are listed with the warnings.
+        Pass precomputed `features` (row-aligned with `cards`) to skip text analysis. With the
+        collection's `synergy` graph, the slots left after the role quotas go to the strongest
+        synergy cluster around the commander first.
+        """
+        is_commander = format_type.lower() == 'commander'
+        deck_size = 100 if is_commander else self.guidelines['deck_size']
+        max_copies = 1 if is_commander else self.guidelines['max_copies']
+        allowed = color_codes(colors) or set('WUBRG')
+        warnings = []
+
+        # Enriched collections carry legalities; drop anything not legal in the format
+        legal = legal_mask(cards, format_type)
+        if legal is None and format_type.strip().lower() in FORMAT_BITS:
+            warnings.append(f"Legality unknown: the collection has no legality data, so cards not legal in "
+                            f"{format_type} may be included (enrich the collection first)")
+        elif legal is not None and not legal.all():
+            warnings.append(f"Skipped {int((~legal).sum())} card(s) not legal in {format_type}")
+            cards = [card for card, keep in zip(cards, legal) if keep]
+            if features is not None:
+                features = features[legal].reset_index(drop=True)
+
+        pool = self.prepare(cards, features)
+        chosen = []
+
+        leader = None
+        if is_commander:
+            leader, notes = self.choose_commander(pool, allowed, commander)
+            warnings.extend(notes)
+            if leader:
+                if not leader['identity'] <= allowed:
+                    warnings.append(f"Commander identity {''.join(sorted(leader['identity']))} is outside the selected colors")
+                allowed = set(leader['identity']) or allowed
+                chosen.append({**leader, 'count': 1, 'role': 'Commander'})
+
+        def fits(card: Dict) -> bool:
+            return card['identity'] <= allowed and (leader is None or card['name'] != leader['name'])
+
+        spells = [c for c in pool if not c['is_land'] and fits(c)]
+        lands = [c for c in pool if c['is_land'] and not c['is_basic'] and fits(c)]
+
+        spell_slots = deck_size - self.guidelines['lands'] - len(chosen)
+        used = set()
+        taken = [0]
+
+        def take(card: Dict, role: str) -> int:
+            count = min(card['quantity'], max_copies, spell_slots - taken[0])
+            if count <= 0:
+                return 0
+            used.add(card['name'])
+            taken[0] += count
+            chosen.append({**card, 'count': count, 'role': role})
+            return count
+
+        # Fill role quotas first, cheapest answers first
+        for role in ROLE_ORDER:
+            quota = self.guidelines['quotas'].get(role, 0)
+            candidates = [c for c in spells if role in c['roles'] and c['name'] not in used]
+            if role == 'wincon':
+                candidates.sort(key=lambda c: (-c['power'], -c['cmc'], c['name']))
+            else:
+                candidates.sort(key=lambda c: (c['cmc'], -len(c['roles']), c['name']))
+            filled = 0
+            for card in candidates:
+                if filled >= quota:
+                    break
+                filled += take(card, role.title())
+            if filled < quota:
+                warnings.append(f"Only {filled}/{quota} {role} cards available")
+
+        # Fill the remaining nonland slots with the best remaining spells, synergy cluster first
+        remaining = sorted((c for c in spells if c['name'] not in used), key=self.spell_score, reverse=True)
+        cluster = {}
+        if synergy is not None and leader is not None:
+            open_names = {c['name'].lower() for c in remaining}
+            picked = synergy.cluster(leader['name'], size=spell_slots - taken[0] + 1,
+                                     accept=lambda name: name.lower() in open_names)
+            cluster = {name.lower(): rank for rank, (name, _) in enumerate(picked[1:])}
+            remaining.sort(key=lambda c: cluster.get(c['name'].lower(), len(cluster)))
+        for card in remaining:
+            if card['name'].lower() in cluster:
+                role = 'Synergy'
+            else:
+                role = card['roles'][0].title() if card['roles'] else 'Filler'
+            if take(card, role) == 0:
+                break
+
+        if taken[0] < spell_slots:
+            warnings.append(f"Only {taken[0]} nonland cards fit; padded the deck with basic lands")
+        lands_needed = deck_size - sum(c['count'] for c in chosen)
+
+        # Nonbasic lands from the collection, then basics split by color pips
+        for card in sorted(lands, key=lambda c: (-len(c['identity']), c['name'])):
+            if lands_needed <= 0:
+                break
+            count = min(card['quantity'], max_copies, lands_needed)
+            chosen.append({**card, 'count': count, 'role': 'Mana'})
+            lands_needed -= count
+
+        if lands_needed > 0:
+            chosen.extend(self.basic_lands(chosen, allowed, lands_needed))
+
+        draft = {
+            'format': format_type,
+            'commander': leader['name'] if leader else None,
+            'colors': sorted(allowed),
+            'cards': chosen,
+            'total': sum(c['count'] for c in chosen),
+            'warnings': warnings,
+        }
+        warnings.extend(self.check(draft))
+        return draft
+
+    @staticmethod
+    def basic_lands(chosen: List[Dict], allowed: Set[str], count: int) -> List[Dict]:
+        """Split basic lands across colors in proportion to the deck's colored pips"""
+        pips = {color: 0 for color in sorted(allowed)}
+        for card in chosen:
+            for color, n in pip_counts(card.get('mana_cost', '')).items():
+                if color in pips:
+                    pips[color] += n * card['count']
+        if not pips:
+            pips = {'C': 1}
+        if not any(pips.values()):
+            pips = {color: 1 for color in pips}
+
+        total_pips = sum(pips.values())
+        split = {color: int(count * n // total_pips) for color, n in pips.items()}
+        # Hand out the rounding remainder to the most demanding colors
+        for color in sorted(pips, key=lambda c: -pips[c])[:count - sum(split.values())]:
+            split[color] += 1
+
+        return [
+            {
+                'name': BASIC_LANDS[color], 'identity': set(), 'cmc': 0, 'mana_cost': '',
+                'type': 'Land', 'roles': [], 'power': 0.0, 'quantity': n, 'is_fancy': False,
+                'is_land': True, 'is_basic': True, 'text': '', 'count': n, 'role': 'Basic land',
+            }
+            for color, n in split.items() if n
+        ]
+
+    def check(self, draft: Dict) -> List[str]:
+        """Format violations in a draft: size, copy limits and color identity"""
+        is_commander = draft['format'].lower() == 'commander'
+        deck_size = 100 if is_commander else self.guidelines['deck_size']
+        max_copies = 1 if is_commander else self.guidelines['max_copies']
+        allowed = set(draft['colors'])
+
+        problems = []
+        if is_commander and draft['total'] != deck_size:
+            problems.append(f"Deck has {draft['total']} cards, expected {deck_size}")
+        elif not is_commander and draft['total'] < deck_size:
+            problems.append(f"Deck has {draft['total']} cards, expected at least {deck_size}")
+        for card in draft['cards']:
+            if not card['is_basic'] and card['count'] > max_copies:
+                problems.append(f"{card['name']}: {card['count']} copies (max {max_copies})")
+            if not card['identity'] <= allowed:
+                problems.append(f"{card['name']}: outside color identity {''.join(draft['colors'])}")
+        return problems
+
+    @staticmethod
+    def to_markdown(draft: Dict) -> str:
+        """Render a draft as the same grouped Markdown table the AI produces"""
+        type_order = ['Creature', 'Artifact', 'Enchantment', 'Other', 'Land']
+        lines = [f"# ⚡ Local Draft: {draft['format']} ({''.join(draft['colors'])})", ""]
+        if draft['commander']:
+            lines += [f"**Commander**: {draft['commander']}", ""]
+
+        lines += ["| Card Name | Card Type | Is Fancy | Notes |", "|-----------|-----------|----------|-------|"]
+        for type_name in type_order:
+            for card in sorted((c for c in draft['cards'] if c['type'] == type_name), key=lambda c: c['name']):
+                name = card['name'] if card['count'] == 1 else f"{card['count']}x {card['name']}"
+                lines.append(f"| {name} | {card['type']} | {'Yes' if card['is_fancy'] else 'No'} | {card['role']} |")
+
+        lines += ["", "### Card Type Summary"]
+        for type_name in type_order:
+            count = sum(c['count'] for c in draft['cards'] if c['type'] == type_name)
+            if count:
+                lines.append(f"- {type_name}s: {count}" if type_name != 'Other' else f"- Others: {count}")
+        lines.append(f"- **Total**: {draft['total']}")
+
+        if draft['warnings']:
+            lines += ["", "### Notes"] + [f"- {w}" for w in draft['warnings']]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,185 @@
+import json
+import re
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Optional
+
+CARD_TYPES = ['Land', 'Creature', 'Instant', 'Sorcery', 'Artifact', 'Enchantment', 'Planeswalker', 'Other']
+TYPE_PLURALS = {'Sorcery': 'Sorceries', 'Other': 'Others'}
+CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+# Schema handed to Gemini so the response is always a parseable deck
+DECK_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'commander': {'type': 'string'},
+        'strategy': {'type': 'string'},
+        'cards': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'name': {'type': 'string'},
+                    'card_type': {'type': 'string', 'enum': CARD_TYPES},
+                    'count': {'type': 'integer'},
+                    'is_fancy': {'type': 'boolean'},
+                    'role': {'type': 'string'},
+                    'notes': {'type': 'string'},
+                },
+                'required': ['name', 'card_type', 'count'],
+            },
+        },
+        'upgrades': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'name': {'type': 'string'},
+                    'reason': {'type': 'string'},
+                },
+                'required': ['name', 'reason'],
+            },
+        },
+    },
+    'required': ['cards', 'upgrades'],
+}
+
+GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': DECK_SCHEMA,
+}
+
+JSON_OUTPUT_INSTRUCTIONS = """
+# Output Format Override (JSON)
+Ignore the Markdown output format above. Respond with ONLY a JSON object matching the response schema:
+- "commander": the commander's name (empty for non-Commander formats)
+- "strategy": 2-3 sentences on the game plan, including the review perspectives
+- "cards": one entry per distinct card with "count" copies; "card_type" is the card's main type, "role" a short tag such as Ramp, Removal, Draw or Win condition
+- "upgrades": cards NOT in the collection that would improve the deck, with a one-sentence "reason"
+Every entry in "cards" MUST come from the user's collection.
+"""
+
+
+@dataclass
+class DeckCard:
+    name: str
+    card_type: str = 'Other'
+    count: int = 1
+    is_fancy: bool = False
+    role: str = ''
+    notes: str = ''
+
+
+@dataclass
+class Upgrade:
+    name: str
+    reason: str = ''
+
+
+@dataclass
+class Deck:
+    format_type: str
+    colors: List[str] = field(default_factory=list)
+    commander: Optional[str] = None
+    strategy: str = ''
+    cards: List[DeckCard] = field(default_factory=list)
+    upgrades: List[Upgrade] = field(default_factory=list)
+    notes: List[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        """Card count including a commander that isn't listed among the cards"""
+        total = sum(card.count for card in self.cards)
+        if self.commander and not any(card.name.casefold() == self.commander.casefold() for card in self.cards):
+            total += 1
+        return total
+
+    def type_counts(self) -> Dict[str, int]:
+        counts = {}
+        for card in self.cards:
+            counts[card.card_type] = counts.get(card.card_type, 0) + card.count
+        return counts
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    @classmethod
+    def from_dict(cls, data: Dict, format_type: Optional[str] = None,
+                  colors: Optional[List[str]] = None) -> 'Deck':
+        """Build a deck from the model's JSON, tolerating missing or oddly typed fields"""
+        cards = []
+        for item in data.get('cards') or []:
+            name = str(item.get('name') or '').strip()
+            if not name:
+                continue
+            card_type = str(item.get('card_type') or 'Other').strip().title()
+            try:
+                count = max(1, int(item.get('count') or 1))
+            except (TypeError, ValueError):
+                count = 1
+            cards.append(DeckCard(
+                name=name,
+                card_type=card_type if card_type in CARD_TYPES else 'Other',
+                count=count,
+                is_fancy=bool(item.get('is_fancy')),
+                role=str(item.get('role') or '').strip(),
+                notes=str(item.get('notes') or '').strip(),
+            ))
+
+        upgrades = [
+            Upgrade(str(item.get('name') or '').strip(), str(item.get('reason') or '').strip())
+            for item in data.get('upgrades') or [] if item.get('name')
+        ]
+        return cls(
+            format_type=format_type or data.get('format_type') or '',
+            colors=list(colors if colors is not None else data.get('colors') or []),
+            commander=(data.get('commander') or '').strip() or None,
+            strategy=str(data.get('strategy') or '').strip(),
+            cards=cards,
+            upgrades=upgrades,
+            notes=list(data.get('notes') or []),
+        )
+
+    @classmethod
+    def from_json(cls, text: str, format_type: Optional[str] = None,
+                  colors: Optional[List[str]] = None) -> 'Deck':
+        """Parse a JSON response (a stray ```json fence is tolerated); raises ValueError if malformed"""
+        data = json.loads(CODE_FENCE.sub('', (text or '').strip()))
+        if not isinstance(data, dict):
+            raise ValueError("Deck JSON must be an object")
+        return cls.from_dict(data, format_type, colors)
+
+    def to_markdown(self) -> str:
+        """Render the same grouped Markdown decklist the prompt asks for"""
+        color_str = ', '.join(self.colors) if self.colors else 'Any colors'
+        lines = [f"# {self.format_type} Deck ({color_str})", ""]
+        if self.commander:
+            lines += [f"**Commander**: {self.commander}", ""]
+        if self.strategy:
+            lines += ["## Strategy", self.strategy, ""]
+
+        lines += ["## Decklist", "", "| Card Name | Card Type | Is Fancy | Notes |",
+                  "|-----------|-----------|----------|-------|"]
+        for card_type in CARD_TYPES:
+            for card in sorted((c for c in self.cards if c.card_type == card_type), key=lambda c: c.name):
+                name = card.name if card.count == 1 else f"{card.count}x {card.name}"
+                notes = ' - '.join(part for part in (card.role, card.notes) if part)
+                lines.append(f"| {name} | {card.card_type} | {'Yes' if card.is_fancy else 'No'} | {notes} |")
+
+        counts = self.type_counts()
+        lines += ["", "### Card Type Summary"]
+        lines += [
+            f"- {TYPE_PLURALS.get(card_type, card_type + 's')}: {counts[card_type]}"
+            for card_type in CARD_TYPES if counts.get(card_type)
+        ]
+        lines.append(f"- **Total**: {self.total}")
+
+        if self.notes:
+            lines += ["", "### Validation Notes"] + [f"- {note}" for note in self.notes]
+
+        if self.upgrades:
+            lines += ["", "## Suggested Upgrades"]
+            lines += [f"- **{upgrade.name}**: {upgrade.reason}" for upgrade in self.upgrades]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,489 @@
+import re
+import unicodedata
+from typing import List, Dict, Optional, Set, Callable, Tuple
+
+import pandas as pd
+
+from candidate_pool import score_candidates
+from card_features import extract_features
+from card_similarity import SimilarityIndex
+from deck_schema import Deck, DeckCard
+from legality import FORMAT_BITS, legality_bits
+from deck_drafter import (
+    BASIC_LAND_NAMES, card_name, card_type, color_codes, color_identity, is_fancy, parse_guidelines
+)
+
+TABLE_ROW = re.compile(r"^\s*\|(.*)\|\s*$")
+SEPARATOR_CELL = re.compile(r"^:?-{2,}:?$")
+COUNT_PREFIX = re.compile(r"^(\d+)\s*x?\s+(.+)$", re.IGNORECASE)
+COUNT_SUFFIX = re.compile(r"^(.+?)\s*\(?\s*x\s*(\d+)\s*\)?$", re.IGNORECASE)
+UPGRADES_HEADING = re.compile(r"^#+\s*suggested upgrades", re.IGNORECASE | re.MULTILINE)
+REPLACEMENT_LINE = re.compile(r"^[\s*\-\d.)`]*(?P<old>[^`]+?)\s*(?:->|→|=>)\s*(?P<new>[^`]+?)[\s`]*$")
+ADDITION_LINE = re.compile(r"^\s*\+\s*(?P<new>.+?)\s*$")
+
+
+def normalize_name(name: str) -> str:
+    """Canonical form of a card name for lookups: no accents, markup, case or extra spaces"""
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch))
+    name = name.replace('’', "'").replace('*', '').replace('`', '').replace('_', ' ')
+    return ' '.join(name.split()).casefold()
+
+
+BASIC_KEYS = {normalize_name(name) for name in BASIC_LAND_NAMES}
+
+
+def split_count(cell: str) -> Tuple[int, str]:
+    """Split '2x Card', '2 Card' or 'Card (x2)' into (2, 'Card')"""
+    cell = cell.replace('*', '').strip()
+    match = COUNT_PREFIX.match(cell)
+    if match:
+        return int(match.group(1)), match.group(2).strip()
+    match = COUNT_SUFFIX.match(cell)
+    if match:
+        return int(match.group(2)), match.group(1).strip()
+    return 1, cell
+
+
+def split_row(line: str) -> Optional[List[str]]:
+    match = TABLE_ROW.match(line)
+    if not match:
+        return None
+    return [cell.strip() for cell in match.group(1).split('|')]
+
+
+def parse_decklist(markdown: str) -> List[Dict]:
+    """Every card row of the decklist tables (anything after "Suggested Upgrades" is ignored)"""
+    upgrades = UPGRADES_HEADING.search(markdown)
+    lines = markdown[:upgrades.start()].split('\n') if upgrades else markdown.split('\n')
+
+    entries = []
+    in_table = False
+    for line_no, line in enumerate(lines):
+        cells = split_row(line)
+        if cells is None:
+            in_table = False
+            continue
+        if normalize_name(cells[0]) in ('card name', 'card', 'name'):
+            in_table = True
+            continue
+        if not in_table or all(SEPARATOR_CELL.match(cell) for cell in cells if cell):
+            continue
+        if not cells[0] or cells[0] in ('...', '…'):
+            continue
+
+        count, name = split_count(cells[0])
+        entries.append({
+            'line': line_no,
+            'name': name,
+            'key': normalize_name(name),
+            'count': count,
+            'type': cells[1] if len(cells) > 1 else '',
+            'cells': cells,
+        })
+    return entries
+
+
+def deck_entries(deck: Deck) -> List[Dict]:
+    """The same entries parse_decklist produces, read straight from a structured deck"""
+    return [
+        {'index': i, 'name': card.name, 'key': normalize_name(card.name), 'count': card.count, 'type': card.card_type}
+        for i, card in enumerate(deck.cards)
+    ]
+
+
+class CollectionIndex:
+    """Hash index of the collection by normalized card name (double-faced cards by either face)"""
+
+    def __init__(self, cards: List[Dict]):
+        self.cards = {}
+        for card in cards:
+            name = card_name(card)
+            key = normalize_name(name)
+            if not key:
+                continue
+            quantity = (card.get('Quantity') or '1').strip()
+            entry = self.cards.get(key)
+            if entry is None:
+                entry = self.cards[key] = {
+                    'name': name,
+                    'identity': color_identity(card),
+                    'quantity': 0,
+                    'legality': legality_bits(card.get('Legalities')),
+                    'card': card,
+                }
+            entry['quantity'] += int(quantity) if quantity.isdigit() else 1
+
+        # Allow lookups by the front face of "Front // Back" names
+        self.faces = {}
+        for key, entry in self.cards.items():
+            if '//' in key:
+                self.faces.setdefault(key.split('//')[0].strip(), entry)
+
+    def lookup(self, name: str) -> Optional[Dict]:
+        key = normalize_name(name)
+        return self.cards.get(key) or self.faces.get(key)
+
+    def __contains__(self, name: str) -> bool:
+        return self.lookup(name) is not None
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+
+class DeckValidator:
+    """Checks a generated decklist against the collection and repairs only the offending slots"""
+
+    def __init__(self, cards: List[Dict], format_type: str, colors: List[str],
+                 commander: Optional[str] = None, knowledge: str = "",
+                 similarity: Optional[SimilarityIndex] = None):
+        self.cards = cards
+        self.index = CollectionIndex(cards)
+        # Oracle-text similarity for offline substitutes; built from `cards` only if needed
+        self._similarity = similarity
+        self.format_type = format_type
+        self.commander = commander
+        self.is_commander = format_type.lower() == 'commander'
+
+        guidelines = parse_guidelines(knowledge)
+        self.deck_size = 100 if self.is_commander else guidelines['deck_size']
+        self.max_copies = 1 if self.is_commander else guidelines['max_copies']
+
+        # Commander decks follow the commander's identity; otherwise the requested colors
+        leader = self.index.lookup(commander) if commander else None
+        if leader:
+            self.allowed = leader['identity']
+        else:
+            self.allowed = color_codes(colors) or None
+
+        # Legality is only checked when the collection was enriched with it
+        self.legal_bit = FORMAT_BITS.get(format_type.strip().lower(), 0)
+        if not any((entry['card'].get('Legalities') or '').strip() for entry in self.index.cards.values()):
+            self.legal_bit = 0
+
+    @property
+    def similarity(self) -> SimilarityIndex:
+        if self._similarity is None:
+            self._similarity = SimilarityIndex.from_cards(self.cards)
+        return self._similarity
+
+    def _in_identity(self, identity: Set[str]) -> bool:
+        return self.allowed is None or identity <= self.allowed
+
+    def _is_legal(self, card: Dict) -> bool:
+        return not self.legal_bit or bool(card['legality'] & self.legal_bit)
+
+    def validate(self, markdown: str) -> Dict:
+        """Find every slot of a Markdown decklist that breaks a rule"""
+        return self.check(parse_decklist(markdown))
+
+    def check(self, entries: List[Dict]) -> Dict:
+        """Find every entry that breaks a rule, plus deck-level size problems"""
+        issues = []
+        copies = {}
+
+        for i, entry in enumerate(entries):
+            if entry['key'] in BASIC_KEYS:
+                continue
+            card = self.index.lookup(entry['name'])
+            if card is None:
+                issues.append({'entry': i, 'name': entry['name'], 'reason': 'not in collection'})
+                continue
+            if not self._in_identity(card['identity']):
+                identity = ''.join(sorted(card['identity'] - (self.allowed or set())))
+                issues.append({'entry': i, 'name': entry['name'], 'reason': f'outside color identity ({identity})'})
+                continue
+            if not self._is_legal(card):
+                issues.append({'entry': i, 'name': entry['name'], 'reason': f'not legal in {self.format_type}'})
+                continue
+
+            limit = self.max_copies if self.is_commander else min(self.max_copies, card['quantity'])
+            already = copies.get(card['name'], 0)
+            copies[card['name']] = already + entry['count']
+            if already >= limit:
+                issues.append({'entry': i, 'name': entry['name'], 'reason': 'duplicate entry'})
+            elif already + entry['count'] > limit:
+                issues.append({
+                    'entry': i, 'name': entry['name'], 'reason': f'{already + entry["count"]} copies (max {limit})',
+                    'keep': limit - already,
+                })
+
+        total = sum(entry['count'] for entry in entries)
+        if self.is_commander and self.commander and not any(
+                entry['key'] == normalize_name(self.commander) for entry in entries):
+            total += 1
+        return {
+            'entries': entries,
+            'issues': issues,
+            'total': total,
+            'expected': self.deck_size,
+            'missing': max(0, self.deck_size - total) if entries else 0,
+        }
+
+    def candidates(self, report: Dict, limit: int = 60) -> List[Dict]:
+        """Best-scoring collection cards that could fill the open slots"""
+        in_deck = {entry['key'] for entry in report['entries']}
+        pool = [
+            entry['card'] for key, entry in self.index.cards.items()
+            if key not in in_deck and key not in BASIC_KEYS and self._in_identity(entry['identity'])
+            and self._is_legal(entry)
+        ]
+        if not pool:
+            return []
+        score = score_candidates(pool, extract_features(pd.DataFrame(pool)), self.commander)
+        order = sorted(range(len(pool)), key=lambda i: -score[i])
+        return [pool[i] for i in order[:limit]]
+
+    def repair_prompt(self, report: Dict, candidates: List[Dict]) -> str:
+        """A small prompt that asks only for replacements of the offending slots"""
+        colors = ''.join(sorted(self.allowed)) if self.allowed else 'any colors'
+        lines = [
+            "# Decklist Repair",
+            f"A {self.format_type} deck ({colors}"
+            + (f", commander {self.commander}" if self.commander else "")
+            + ") has slots that break the rules. Choose replacements ONLY from the candidate list.",
+            "",
+        ]
+        if report['issues']:
+            lines.append("## Slots to replace")
+            lines += [f"- {issue['name']} ({issue['reason']})" for issue in report['issues'] if 'keep' not in issue]
+            lines.append("")
+        if report['missing']:
+            lines += ["## Missing cards", f"The deck is {report['missing']} card(s) short. Add that many.", ""]
+
+        lines.append("## Candidates (from the user's collection)")
+        for card in candidates:
+            text = (card.get('Card Text') or '').replace('\n', ' ')
+            lines.append(f"- {card_name(card)} | {card.get('Mana Cost') or '-'} | {text[:120]}")
+
+        lines += [
+            "",
+            "## Response format",
+            "One line per slot and nothing else:",
+            "`Old Card -> New Card` for each slot to replace",
+            "`+ New Card` for each missing card",
+        ]
+        return '\n'.join(lines)
+
+    @staticmethod
+    def parse_replacements(response: str) -> Tuple[Dict[str, str], List[str]]:
+        """Read `Old -> New` and `+ New` lines from the repair response"""
+        replacements, additions = {}, []
+        for line in (response or '').split('\n'):
+            match = REPLACEMENT_LINE.match(line)
+            if match:
+                replacements[normalize_name(match.group('old'))] = match.group('new').strip().strip('*')
+                continue
+            match = ADDITION_LINE.match(line)
+            if match:
+                additions.append(match.group('new').strip().strip('*'))
+        return replacements, additions
+
+    def _usable(self, used: Set[str]) -> Callable[[str], Optional[Dict]]:
+        """Lookup for suggested cards that are owned, on-color, legal and not already in the deck"""
+        def usable(name: str) -> Optional[Dict]:
+            card = self.index.lookup(name)
+            if card is None or normalize_name(card['name']) in used or not self._in_identity(card['identity']):
+                return None
+            if not self._is_legal(card):
+                return None
+            return card
+        return usable
+
+    def local_replacements(self, report: Dict) -> Dict[str, str]:
+        """Closest usable collection card by oracle text for each offending slot (no model call)
+
+        Only slots whose card is in the collection have text to compare; cards the model
+        invented are left for the drop step.
+        """
+        used = {entry['key'] for entry in report['entries']}
+        usable = self._usable(used)
+        replacements = {}
+        for issue in report['issues']:
+            if 'keep' in issue:
+                continue
+            entry = report['entries'][issue['entry']]
+            card = self.index.lookup(entry['name'])
+            if card is None:
+                continue
+            match = self.similarity.similar(card['name'], 1, accept=lambda name: usable(name) is not None)
+            if match:
+                replacements[entry['key']] = match[0][0]
+                used.add(normalize_name(match[0][0]))
+        return replacements
+
+    def _row(self, card: Dict, cells: List[str], note: str) -> str:
+        width = len(cells)
+        row = [card_name(card), card_type(card), 'Yes' if is_fancy(card) else 'No', note]
+        row += [''] * (width - len(row))
+        return f"| {' | '.join(row[:width])} |"
+
+    def apply(self, markdown: str, report: Dict, replacements: Dict[str, str],
+              additions: List[str]) -> Tuple[str, List[str]]:
+        """Substitute valid replacements into the offending rows; returns the deck and a change log"""
+        upgrades = UPGRADES_HEADING.search(markdown)
+        head, tail = (markdown[:upgrades.start()], markdown[upgrades.start():]) if upgrades else (markdown, '')
+        lines = head.split('\n')
+        entries = report['entries']
+        used = {entry['key'] for entry in entries}
+        changes = []
+
+        usable = self._usable(used)
+
+        for issue in report['issues']:
+            entry = entries[issue['entry']]
+            if 'keep' in issue:
+                # Too many copies in one row: cap the count in place
+                entry['cells'][0] = entry['name'] if issue['keep'] == 1 else f"{issue['keep']}x {entry['name']}"
+                lines[entry['line']] = f"| {' | '.join(entry['cells'])} |"
+                changes.append(f"Reduced {entry['name']} to {issue['keep']} ({issue['reason']})")
+                continue
+            card = usable(replacements.get(entry['key'], ''))
+            if card is None:
+                continue
+            used.add(normalize_name(card['name']))
+            lines[entry['line']] = self._row(card['card'], entry['cells'], f"Replaces {entry['name']}")
+            changes.append(f"Replaced {entry['name']} with {card['name']} ({issue['reason']})")
+
+        # Added cards go right after the last decklist row
+        if entries and additions:
+            insert_at = entries[-1]['line'] + 1
+            for name in additions[:report['missing']]:
+                card = usable(name)
+                if card is None:
+                    continue
+                used.add(normalize_name(card['name']))
+                lines.insert(insert_at, self._row(card['card'], entries[-1]['cells'], 'Added to reach deck size'))
+                insert_at += 1
+                changes.append(f"Added {card['name']} (deck was short)")
+
+        return '\n'.join(lines) + tail, changes
+
+    def drop_unresolved(self, markdown: str, report: Dict) -> Tuple[str, List[str]]:
+        """Remove rows that still break the rules after repair"""
+        upgrades = UPGRADES_HEADING.search(markdown)
+        head, tail = (markdown[:upgrades.start()], markdown[upgrades.start():]) if upgrades else (markdown, '')
+        lines = head.split('\n')
+        drop = {report['entries'][issue['entry']]['line']: issue for issue in report['issues'] if 'keep' not in issue}
+        removed = [f"{issue['name']} ({issue['reason']})" for issue in drop.values()]
+        kept = [line for i, line in enumerate(lines) if i not in drop]
+        return '\n'.join(kept) + tail, removed
+
+    @staticmethod
+    def add_notes(markdown: str, notes: List[str]) -> str:
+        """Insert a validation section before the suggested upgrades (or at the end)"""
+        section = "### Validation Notes\n" + '\n'.join(f"- {note}" for note in notes) + "\n\n"
+        upgrades = UPGRADES_HEADING.search(markdown)
+        if upgrades:
+            return markdown[:upgrades.start()] + section + markdown[upgrades.start():]
+        return markdown.rstrip('\n') + "\n\n" + section
+
+    def apply_to_deck(self, deck: Deck, report: Dict, replacements: Dict[str, str],
+                      additions: List[str]) -> Tuple[Deck, List[str]]:
+        """Structured counterpart of apply: edits the deck's card list instead of table rows"""
+        entries = report['entries']
+        used = {entry['key'] for entry in entries}
+        usable = self._usable(used)
+        changes = []
+
+        for issue in report['issues']:
+            entry = entries[issue['entry']]
+            slot = deck.cards[entry['index']]
+            if 'keep' in issue:
+                slot.count = issue['keep']
+                changes.append(f"Reduced {entry['name']} to {issue['keep']} ({issue['reason']})")
+                continue
+            card = usable(replacements.get(entry['key'], ''))
+            if card is None:
+                continue
+            used.add(normalize_name(card['name']))
+            deck.cards[entry['index']] = DeckCard(
+                card['name'], card_type(card['card']), 1, is_fancy(card['card']), slot.role,
+                f"Replaces {entry['name']}"
+            )
+            changes.append(f"Replaced {entry['name']} with {card['name']} ({issue['reason']})")
+
+        for name in additions[:report['missing']]:
+            card = usable(name)
+            if card is None:
+                continue
+            used.add(normalize_name(card['name']))
+            deck.cards.append(DeckCard(
+                card['name'], card_type(card['card']), 1, is_fancy(card['card']), '', 'Added to reach deck size'
+            ))
+            changes.append(f"Added {card['name']} (deck was short)")
+        return deck, changes
+
+    @staticmethod
+    def drop_from_deck(deck: Deck, report: Dict) -> Tuple[Deck, List[str]]:
+        """Remove cards that still break the rules after repair"""
+        drop = {report['entries'][issue['entry']]['index']: issue for issue in report['issues'] if 'keep' not in issue}
+        deck.cards = [card for i, card in enumerate(deck.cards) if i not in drop]
+        return deck, [f"{issue['name']} ({issue['reason']})" for issue in drop.values()]
+
+    @staticmethod
+    def add_deck_notes(deck: Deck, notes: List[str]) -> Deck:
+        deck.notes.extend(notes)
+        return deck
+
+    def repair(self, markdown: str, generate: Optional[Callable[[str], str]] = None,
+               max_rounds: int = 2) -> Tuple[str, Dict]:
+        """Validate, then re-prompt only for offending slots until the deck is clean
+
+        `generate` takes a prompt and returns the model's text. Without it (or once the rounds
+        run out) offending rows get the collection card with the most similar oracle text,
+        and those still left are removed; all changes are listed in a "Validation Notes" section.
+        """
+        return self._repair(markdown, parse_decklist, self.apply, self.drop_unresolved, self.add_notes,
+                            generate, max_rounds)
+
+    def repair_deck(self, deck: Deck, generate: Optional[Callable[[str], str]] = None,
+                    max_rounds: int = 2) -> Tuple[Deck, Dict]:
+        """Same as repair, for a structured deck (no table parsing involved)"""
+        return self._repair(deck, deck_entries, self.apply_to_deck, self.drop_from_deck, self.add_deck_notes,
+                            generate, max_rounds)
+
+    def _repair(self, deck, entries_of, apply, drop, annotate, generate, max_rounds):
+        report = self.check(entries_of(deck))
+        if not report['entries']:
+            report.update({'changes': [], 'removed': [], 'rounds': 0, 'notes': []})
+            return deck, report
+
+        changes, rounds, failures = [], 0, []
+        while generate and rounds < max_rounds and (report['issues'] or report['missing']):
+            rounds += 1
+            prompt = self.repair_prompt(report, self.candidates(report))
+            try:
+                response = generate(prompt)
+            except Exception as e:
+                # A failed or timed-out repair call must not cost the deck already generated:
+                # fall through to the local replacements below
+                failures.append(f"Repair request failed ({type(e).__name__}: {e}); offending cards were fixed locally")
+                break
+            replacements, additions = self.parse_replacements(response)
+            deck, applied = apply(deck, report, replacements, additions)
+            changes += applied
+            report = self.check(entries_of(deck))
+            if not applied:
+                break
+
+        # Whatever the model couldn't fix gets the most similar card from the collection
+        if report['issues']:
+            deck, applied = apply(deck, report, self.local_replacements(report), [])
+            changes += applied
+            if applied:
+                report = self.check(entries_of(deck))
+
+        removed = []
+        if report['issues']:
+            deck, removed = drop(deck, report)
+            report = self.check(entries_of(deck))
+
+        notes = failures + changes + [f"Removed {name}" for name in removed]
+        if report['total'] != report['expected'] and (self.is_commander or report['total'] < report['expected']):
+            notes.append(f"Deck has {report['total']} cards, expected {report['expected']}")
+        if notes:
+            deck = annotate(deck, notes)
+
+        report.update({'changes': changes, 'removed': removed, 'rounds': rounds, 'notes': notes})
+        return deck, report
@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import combinations
+from typing import Callable, List, Dict, Optional, Iterator, Tuple
+
+COLOR_NAMES = ['White', 'Blue', 'Black', 'Red', 'Green']
+
+
+def color_combination_variants(format_type: str, size: int = 2,
+                               colors: Optional[List[str]] = None,
+                               commander: Optional[str] = None,
+                               additional_notes: str = "") -> List[Dict]:
+    """Create one variant per color combination of the given size"""
+    pool = [c for c in COLOR_NAMES if not colors or c in colors]
+    return [
+        {
+            'format_type': format_type,
+            'colors': list(combo),
+            'commander': commander,
+            'additional_notes': additional_notes,
+        }
+        for combo in combinations(pool, size)
+    ]
+
+
+def commander_variants(commanders: List[str], colors: Optional[List[str]] = None,
+                       additional_notes: str = "") -> List[Dict]:
+    """Create one Commander variant per candidate commander"""
+    return [
+        {
+            'format_type': 'Commander',
+            'colors': list(colors or []),
+            'commander': name.strip(),
+            'additional_notes': additional_notes,
+        }
+        for name in commanders if name.strip()
+    ]
+
+
+def variant_label(variant: Dict) -> str:
+    """Short human readable name for a variant"""
+    label = f"{variant['format_type']} - {', '.join(variant['colors']) if variant['colors'] else 'Any colors'}"
+    if variant.get('commander'):
+        label += f" - {variant['commander']}"
+    return label
+
+
+def build_variants(make_builder: Callable[[], object], collection, variants: List[Dict], max_workers: int = 4,
+                   **build_kwargs) -> Iterator[Tuple[Dict, str, float]]:
+    """Build every variant concurrently, yielding (variant, deck, seconds) as each one finishes
+
+    Each variant gets its own builder from `make_builder`: build_deck writes the builder's
+    `last_*` attributes, so a builder shared between threads would mix up their results.
+    `collection` (CSV text or a parsed collection) is passed straight through to `build_deck`.
+    """
+    if not variants:
+        return
+
+    def run(variant: Dict) -> Tuple[str, float]:
+        start = time.perf_counter()
+        deck = make_builder().build_deck(
+            collection,
+            variant['format_type'],
+            variant['colors'],
+            variant.get('commander'),
+            variant.get('additional_notes', ''),
+            **build_kwargs
+        )
+        return deck, time.perf_counter() - start
+
+    workers = max(1, min(max_workers, len(variants)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run, variant): variant for variant in variants}
+        for future in as_completed(futures):
+            variant = futures[future]
+            try:
+                deck, elapsed = future.result()
+            except Exception as e:
+                deck, elapsed = f"❌ Error generating deck: {e}", 0.0
+            yield variant, deck, elapsed
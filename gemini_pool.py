@@ -0,0 +1,195 @@
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+from cassette import install_from_env
+from instrumentation import span, usage_counts
+
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_QUEUE_TIMEOUT = 600
+
+
+class FairLimiter:
+    """Caps concurrent model calls and hands free slots to sessions in round-robin order
+
+    Each session has its own FIFO of waiting calls; a session with ten queued calls gets one
+    slot, then every other waiting session gets one, before its second call runs.
+    """
+
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight = 0
+        self._condition = threading.Condition()
+        self._queues: Dict[str, deque] = {}
+        self._rotation = deque()
+
+    def _next_ticket(self) -> Optional[object]:
+        if not self._rotation:
+            return None
+        return self._queues[self._rotation[0]][0]
+
+    def _remove(self, session: str, ticket: object):
+        queue = self._queues[session]
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[session]
+            self._rotation.remove(session)
+
+    def waiting(self) -> int:
+        """Calls queued across all sessions"""
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def _ahead_of(self, session: str, ticket: object) -> int:
+        """Queued calls that round-robin will serve before this ticket"""
+        index = self._queues[session].index(ticket)
+        ahead = 0
+        for other in self._rotation:
+            if other == session:
+                ahead += index
+                continue
+            # Sessions earlier in the rotation get index + 1 turns first, later ones index
+            before = self._rotation.index(other) < self._rotation.index(session)
+            ahead += min(len(self._queues[other]), index + before)
+        return ahead
+
+    def acquire(self, session: str = "default", timeout: Optional[float] = None,
+                on_wait: Optional[Callable[[int], None]] = None):
+        """Block until this session's turn; raises TimeoutError after `timeout` seconds"""
+        ticket = object()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            if session not in self._queues:
+                self._queues[session] = deque()
+                self._rotation.append(session)
+            self._queues[session].append(ticket)
+            try:
+                notified = False
+                while not (self.in_flight < self.max_in_flight and self._next_ticket() is ticket):
+                    if on_wait and not notified:
+                        # The callback updates the UI; run it without holding up the other waiters
+                        ahead = self._ahead_of(session, ticket)
+                        notified = True
+                        self._condition.release()
+                        try:
+                            on_wait(ahead)
+                        finally:
+                            self._condition.acquire()
+                        continue
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"No free Gemini slot after {timeout:g}s")
+                    self._condition.wait(remaining)
+            except BaseException:
+                self._remove(session, ticket)
+                self._condition.notify_all()
+                raise
+
+            # Served: this session goes to the back of the rotation
+            self._remove(session, ticket)
+            if session in self._queues:
+                self._rotation.remove(session)
+                self._rotation.append(session)
+            self.in_flight += 1
+            self._condition.notify_all()
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, session: str = "default", timeout: Optional[float] = None,
+             on_wait: Optional[Callable[[int], None]] = None):
+        self.acquire(session, timeout, on_wait)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class PooledModel:
+    """Per-session handle on a shared GenerativeModel; every call waits for a limiter slot
+
+    Drop-in for the builders: `generate_content` has the same signature as the model's.
+    Set `on_wait` to be told how many calls are ahead when a call has to queue. Inside a traced
+    build each call is a "model_call" span with queue wait, prompt size and token counts.
+    """
+
+    def __init__(self, model, limiter: FairLimiter, session_id: str = "default",
+                 timeout: Optional[float] = None):
+        self.model = model
+        self.model_name = getattr(model, 'model_name', '')
+        self.limiter = limiter
+        self.session_id = session_id
+        self.timeout = timeout
+        self.on_wait: Optional[Callable[[int], None]] = None
+
+    def generate_content(self, *args, **kwargs):
+        prompt = args[0] if args else kwargs.get('contents')
+        attributes = {'model': self.model_name}
+        if isinstance(prompt, str):
+            attributes['prompt_bytes'] = len(prompt.encode('utf-8'))
+        with span('model_call', **attributes) as record:
+            start = time.perf_counter()
+            with self.limiter.slot(self.session_id, self.timeout, self.on_wait):
+                record['queue_seconds'] = round(time.perf_counter() - start, 6)
+                response = self.model.generate_content(*args, **kwargs)
+            record.update(usage_counts(response))
+            return response
+
+
+_registry_lock = threading.Lock()
+_models: Dict[Tuple[str, str], object] = {}
+_configured_key: Optional[str] = None
+_limiter: Optional[FairLimiter] = None
+
+
+def get_limiter() -> FairLimiter:
+    """The process-wide limiter (GEMINI_MAX_IN_FLIGHT concurrent calls, default 4)"""
+    global _limiter
+    with _registry_lock:
+        if _limiter is None:
+            _limiter = FairLimiter(int(os.getenv("GEMINI_MAX_IN_FLIGHT", str(DEFAULT_MAX_IN_FLIGHT))))
+        return _limiter
+
+
+def get_model(api_key: str, model_name: str):
+    """Shared GenerativeModel for this key and model, created once per process"""
+    global _configured_key
+    # Imported on first use: the SDK takes about a second to import and most entry points
+    # (landing page, local drafts, CSV tools) never call the model
+    import google.generativeai as genai
+
+    # CASSETTE_MODE=record|replay captures or serves model calls for offline benchmarks
+    install_from_env()
+    key_id = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+    with _registry_lock:
+        # genai.configure is process-global, so only reconfigure when the key changes
+        if _configured_key != key_id:
+            genai.configure(api_key=api_key)
+            _configured_key = key_id
+            _models.clear()
+        if (key_id, model_name) not in _models:
+            _models[(key_id, model_name)] = genai.GenerativeModel(model_name)
+        return _models[(key_id, model_name)]
+
+
+def pooled_model(api_key: str, model_name: str, session_id: str = "default") -> PooledModel:
+    """Shared model wrapped with the process-wide fair limiter for one session"""
+    timeout = float(os.getenv("GEMINI_QUEUE_TIMEOUT", str(DEFAULT_QUEUE_TIMEOUT)))
+    return PooledModel(get_model(api_key, model_name), get_limiter(), session_id, timeout)
+
+
+def streamlit_session_id() -> str:
+    """Id of the current Streamlit browser session ("default" outside Streamlit)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except ImportError:
+        ctx = None
+    return ctx.session_id if ctx else "default"
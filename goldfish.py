@@ -0,0 +1,148 @@
+from typing import List, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from deck_drafter import is_land
+from deck_schema import Deck
+from deck_validator import BASIC_KEYS, CollectionIndex, deck_entries, normalize_name, parse_decklist
+from mana import card_cmc
+
+OPENING_HAND = 7
+
+
+def build_library(deck: Union[str, Deck], cards: List[Dict], commander: Optional[str] = None) -> Dict:
+    """Turn a decklist into parallel arrays (one row per distinct card) for the simulator
+
+    Mana costs come from the collection; cards it doesn't know fall back to the decklist's
+    type column, so an invented card still counts as a land or a spell. The commander sits in
+    the command zone and is left out of the library.
+    """
+    entries = deck_entries(deck) if isinstance(deck, Deck) else parse_decklist(deck)
+    index = CollectionIndex(cards)
+    commander_key = normalize_name(commander) if commander else None
+
+    merged = {}
+    for entry in entries:
+        if entry['key'] == commander_key:
+            continue
+        card = index.lookup(entry['name'])
+        if entry['key'] in BASIC_KEYS:
+            land, cmc = True, 0
+        elif card is not None:
+            land, cmc = is_land(card['card']), card_cmc(card['card'].get('Mana Cost'))
+        else:
+            land, cmc = 'land' in (entry.get('type') or '').lower(), 0
+        name = card['name'] if card is not None else entry['name']
+        if name in merged:
+            merged[name]['count'] += entry['count']
+        else:
+            merged[name] = {'count': entry['count'], 'is_land': land, 'cmc': cmc}
+
+    names = list(merged)
+    return {
+        'names': names,
+        'counts': np.array([merged[n]['count'] for n in names], dtype=np.int64),
+        'is_land': np.array([merged[n]['is_land'] for n in names], dtype=bool),
+        'cmc': np.array([merged[n]['cmc'] for n in names], dtype=np.int64),
+    }
+
+
+def simulate(library: Dict, games: int = 100_000, turns: int = 10, on_the_play: bool = True,
+             keep_lands: tuple = (2, 5), seed: Optional[int] = None, batch_size: int = 25_000) -> Dict:
+    """Goldfish the library: shuffle it `games` times and track lands and castable turns
+
+    Each batch shuffles every game at once by ranking random keys; only the cards that can be
+    seen by the last turn are partially sorted. A hand is a mulligan when its land count is
+    outside `keep_lands`. All mana is treated as generic and untapped, one land per turn.
+    """
+    names, counts = library['names'], library['counts']
+    card_ids = np.repeat(np.arange(len(names)), counts)
+    size = len(card_ids)
+    if size < OPENING_HAND:
+        raise ValueError(f"Deck has only {size} cards in the library")
+
+    draw_offset = 0 if on_the_play else 1
+    # Cards seen by turn t: the opening hand plus one draw per turn (none on turn 1 on the play)
+    seen_by_turn = np.minimum(OPENING_HAND + np.arange(turns) + draw_offset, size)
+    depth = int(seen_by_turn[-1])
+    turn_numbers = np.arange(1, turns + 1)
+
+    is_land = library['is_land']
+    cmc = library['cmc']
+    spell_ids = np.flatnonzero(~is_land)
+    cmc_values = np.unique(np.maximum(cmc[spell_ids], 1)) if len(spell_ids) else np.array([], dtype=np.int64)
+
+    opening_counts = np.zeros(OPENING_HAND + 1, dtype=np.int64)
+    mulligans = 0
+    on_curve = np.zeros(turns, dtype=np.int64)
+    castable_sum = np.zeros(len(names), dtype=np.float64)
+    castable_hits = np.zeros(len(names), dtype=np.int64)
+    castable_on_curve = np.zeros(len(names), dtype=np.int64)
+
+    rng = np.random.default_rng(seed)
+    for start in range(0, games, batch_size):
+        batch = min(batch_size, games - start)
+        rows = np.arange(batch)[:, None]
+
+        # Shuffle by random keys; only the top `depth` positions need an order
+        keys = rng.random((batch, size), dtype=np.float32)
+        if depth < size:
+            top = np.argpartition(keys, depth - 1, axis=1)[:, :depth]
+            top = np.take_along_axis(top, np.argsort(keys[rows, top], axis=1), axis=1)
+        else:
+            top = np.argsort(keys, axis=1)
+        drawn = card_ids[top]
+
+        land_seen = np.cumsum(is_land[drawn], axis=1, dtype=np.int16)
+        opening = land_seen[:, OPENING_HAND - 1]
+        opening_counts += np.bincount(opening, minlength=OPENING_HAND + 1)[:OPENING_HAND + 1]
+        mulligans += int(np.count_nonzero((opening < keep_lands[0]) | (opening > keep_lands[1])))
+
+        lands_by_turn = land_seen[:, seen_by_turn - 1]
+        on_curve += np.logical_and.accumulate(lands_by_turn >= turn_numbers, axis=1).sum(axis=0)
+        lands_in_play = np.minimum(lands_by_turn, turn_numbers)
+
+        # First turn each mana value can be paid for
+        mana_turn = {}
+        for value in cmc_values:
+            ready = lands_in_play >= value
+            mana_turn[int(value)] = np.where(ready.any(axis=1), ready.argmax(axis=1) + 1, turns + 1)
+
+        # First position each card is drawn at (depth if never seen); later copies are overwritten
+        first_pos = np.full((batch, len(names)), depth, dtype=np.int64)
+        for position in range(depth - 1, -1, -1):
+            first_pos[rows[:, 0], drawn[:, position]] = position
+        draw_turn = np.where(first_pos < depth,
+                             np.maximum(1, first_pos - OPENING_HAND + 2 - draw_offset), turns + 1)
+
+        for card in spell_ids:
+            value = max(int(cmc[card]), 1)
+            turn = np.minimum(np.maximum(draw_turn[:, card], mana_turn[value]), turns + 1)
+            castable_sum[card] += turn.sum()
+            castable_hits[card] += np.count_nonzero(turn <= turns)
+            castable_on_curve[card] += np.count_nonzero(turn <= value)
+
+    castable = pd.DataFrame({
+        'Card': [names[i] for i in spell_ids],
+        'Copies': counts[spell_ids],
+        'Mana Value': cmc[spell_ids],
+        'Avg Castable Turn': np.round(castable_sum[spell_ids] / games, 2),
+        'On Curve %': np.round(100 * castable_on_curve[spell_ids] / games, 1),
+        f'By Turn {turns} %': np.round(100 * castable_hits[spell_ids] / games, 1),
+    }).sort_values(['Mana Value', 'Card']).reset_index(drop=True)
+
+    return {
+        'games': games,
+        'library_size': size,
+        'lands': int(counts[is_land].sum()),
+        'opening_lands': opening_counts / games,
+        'mulligan_rate': mulligans / games,
+        'land_drops': on_curve / games,
+        'castable': castable,
+    }
+
+
+def goldfish(deck: Union[str, Deck], cards: List[Dict], commander: Optional[str] = None, **kwargs) -> Dict:
+    """Build the library from a decklist and simulate it"""
+    return simulate(build_library(deck, cards, commander), **kwargs)
@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+DEFAULT_LOG = os.path.join(".build_traces", "spans.jsonl")
+DISABLED = ('', '0', 'off', 'false', 'no')
+
+# A sink receives every finished span as a flat dict
+Sink = Callable[[Dict], None]
+
+
+class JsonLinesSink:
+    """Appends each span as one JSON object per line
+
+    Lines are written whole under a lock, so builder threads and job workers can share a file.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("BUILD_TRACE_LOG", DEFAULT_LOG)
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Dict):
+        line = json.dumps(span, default=str, ensure_ascii=False) + '\n'
+        directory = os.path.dirname(self.path)
+        with self._lock:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+_sinks: Dict[str, JsonLinesSink] = {}
+_sinks_lock = threading.Lock()
+# The tracer of the build running on this thread; builds of several variants run side by side
+_active = threading.local()
+
+
+def default_sink() -> Optional[Sink]:
+    """JSON lines at $BUILD_TRACE_LOG (default .build_traces/spans.jsonl); "off" disables tracing"""
+    path = os.getenv("BUILD_TRACE_LOG", DEFAULT_LOG)
+    if path.strip().lower() in DISABLED:
+        return None
+    with _sinks_lock:
+        if path not in _sinks:
+            _sinks[path] = JsonLinesSink(path)
+        return _sinks[path]
+
+
+def usage_counts(response) -> Dict[str, int]:
+    """Input and output token counts from a Gemini response's usage metadata (empty if absent)"""
+    usage = getattr(response, 'usage_metadata', None)
+    counts = {
+        'input_tokens': getattr(usage, 'prompt_token_count', None),
+        'output_tokens': getattr(usage, 'candidates_token_count', None),
+        'total_tokens': getattr(usage, 'total_token_count', None),
+    }
+    return {name: int(value) for name, value in counts.items() if isinstance(value, int)}
+
+
+class Tracer:
+    """Timed spans for one build, each handed to the sink when it ends
+
+    Every span carries the build's trace id, its parent span and the tracer's context (session,
+    entry point), so one line in the log is enough to group, filter and compare builds.
+    Finished spans are also kept in `spans` for the caller, and handed to `on_finish` when the
+    outermost span ends. While `activate`d, the module-level `span` records onto this tracer,
+    so code deep in a build (model calls) needs no plumbing.
+    """
+
+    def __init__(self, sink: Optional[Sink] = None, on_finish: Optional[Callable[[List[Dict]], None]] = None,
+                 **context):
+        self.sink = sink
+        self.on_finish = on_finish
+        self.context = context
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.spans: List[Dict] = []
+        self._stack: List[str] = []
+
+    @contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        previous = getattr(_active, 'tracer', None)
+        _active.tracer = self
+        try:
+            yield self
+        finally:
+            _active.tracer = previous
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Dict]:
+        """Time a stage; add attributes only known inside it (counts, sizes) to the yielded dict"""
+        record = dict(attributes)
+        parent = self._stack[-1] if self._stack else None
+        self._stack.append(name)
+        started, start = time.time(), time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._stack.pop()
+            span = {
+                'trace_id': self.trace_id, 'span': name, 'parent': parent,
+                'start': round(started, 3), 'seconds': round(time.perf_counter() - start, 6),
+                **self.context, **record,
+            }
+            self.spans.append(span)
+            if self.sink is not None:
+                try:
+                    self.sink(span)
+                except Exception as e:
+                    # A full disk or a broken sink must not fail the build it is measuring
+                    print(f"Could not record span {name}: {e}")
+            if not self._stack and self.on_finish is not None:
+                try:
+                    self.on_finish(self.spans)
+                except Exception as e:
+                    print(f"Could not record run {self.trace_id}: {e}")
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Dict]:
+    """Span on this thread's active tracer; a no-op outside a traced build"""
+    tracer = getattr(_active, 'tracer', None)
+    if tracer is None:
+        yield dict(attributes)
+        return
+    with tracer.span(name, **attributes) as record:
+        yield record
+
+
+def read_spans(path: str) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(spans: List[Dict]) -> List[Dict]:
+    """Per-stage count, median and p95 seconds, plus mean tokens and prompt size where recorded"""
+    by_name: Dict[str, List[Dict]] = {}
+    for span in spans:
+        by_name.setdefault(span['span'], []).append(span)
+
+    rows = []
+    for name, group in by_name.items():
+        seconds = sorted(span['seconds'] for span in group)
+        row = {
+            'span': name,
+            'count': len(group),
+            'median_s': round(statistics.median(seconds), 3),
+            'p95_s': round(seconds[min(len(seconds) - 1, int(0.95 * len(seconds)))], 3),
+            'total_s': round(sum(seconds), 3),
+        }
+        for field in ('input_tokens', 'output_tokens', 'prompt_bytes'):
+            values = [span[field] for span in group if isinstance(span.get(field), (int, float))]
+            if values:
+                row[f"mean_{field}"] = round(statistics.mean(values))
+        rows.append(row)
+    return sorted(rows, key=lambda row: -row['total_s'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize build spans per stage to find hot spots")
+    parser.add_argument('log', nargs='?', default=os.getenv("BUILD_TRACE_LOG", DEFAULT_LOG),
+                        help=f"Span log (default: $BUILD_TRACE_LOG or {DEFAULT_LOG})")
+    parser.add_argument('--last', type=int, default=0, help="Only the most recent N builds")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        parser.error(f"no span log at {args.log}")
+    spans = read_spans(args.log)
+    if args.last:
+        traces = set(list(dict.fromkeys(span['trace_id'] for span in spans))[-args.last:])
+        spans = [span for span in spans if span['trace_id'] in traces]
+
+    builds = len({span['trace_id'] for span in spans})
+    print(f"{len(spans)} spans from {builds} build(s) in {args.log}\n")
+    print(f"{'stage':<18}{'count':>6}{'median s':>10}{'p95 s':>9}{'total s':>10}  means")
+    for row in summarize(spans):
+        extra = ', '.join(f"{key[5:]} {row[key]:,}" for key in row if key.startswith('mean_'))
+        print(f"{row['span']:<18}{row['count']:>6}{row['median_s']:>10.3f}{row['p95_s']:>9.3f}{row['total_s']:>10.3f}  {extra}")
+
+
+if __name__ == "__main__":
+    main()
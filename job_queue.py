@@ -0,0 +1,346 @@
+import argparse
+import atexit
+import json
+import multiprocessing
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+DEFAULT_DB = os.path.join(".job_queue", "jobs.sqlite3")
+STATUSES = ('queued', 'running', 'done', 'failed')
+# A job whose worker died this many times is failed instead of re-queued (it likely crashes workers)
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    session_id TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'queued',
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    log TEXT NOT NULL DEFAULT '[]',
+    worker_pid INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+
+def queue_enabled() -> bool:
+    """Pages hand heavy work to the queue when JOB_QUEUE is set (otherwise they run it inline)"""
+    return os.getenv("JOB_QUEUE", "").strip().lower() in ('1', 'true', 'yes')
+
+
+class JobQueue:
+    """SQLite-backed FIFO of build_deck / update_csv jobs shared by the web tier and workers
+
+    Every call opens its own short-lived connection, so one JobQueue can be used from any
+    thread or process. Claiming runs in an IMMEDIATE transaction: two workers never get the
+    same job.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("JOB_QUEUE_DB", DEFAULT_DB)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Queues created before attempts were counted
+            if 'attempts' not in {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['log'] = json.loads(job['log'])
+        return job
+
+    def submit(self, kind: str, payload: Dict, session_id: str = "") -> str:
+        """Queue a job and return its id"""
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        job_id = uuid.uuid4().hex[:12]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, session_id, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, session_id, json.dumps(payload), time.time()),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def position(self, job_id: str) -> int:
+        """Queued jobs ahead of this one (0 once it is running)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < "
+                "(SELECT created_at FROM jobs WHERE id = ? AND status = 'queued')", (job_id,)
+            ).fetchone()
+        return row[0]
+
+    def claim(self, worker_pid: int) -> Optional[Dict]:
+        """Take the oldest queued job and mark it running"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', worker_pid = ?, started_at = ?, attempts = attempts + 1 "
+                        "WHERE id = ?",
+                        (worker_pid, time.time(), row['id']),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = self._to_dict(row)
+        job['status'] = 'running'
+        job['attempts'] += 1
+        return job
+
+    def append_log(self, job_id: str, message: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET log = json_insert(log, '$[#]', ?) WHERE id = ?", (message, job_id))
+
+    def finish(self, job_id: str, result: Dict):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, finished_at = ? WHERE id = ?",
+                (json.dumps(result), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id),
+            )
+
+    def requeue_orphans(self) -> int:
+        """Put running jobs whose worker process is gone back in the queue
+
+        After MAX_ATTEMPTS dead workers a job is failed instead, so one that crashes its worker
+        can't loop forever. Returns the number of jobs re-queued.
+        """
+        with self._connect() as conn:
+            running = conn.execute("SELECT id, worker_pid, attempts FROM jobs WHERE status = 'running'").fetchall()
+            orphans = [row for row in running if not _pid_alive(row['worker_pid'])]
+            requeued = 0
+            for row in orphans:
+                if row['attempts'] >= MAX_ATTEMPTS:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                        (f"Worker stopped during all {row['attempts']} attempts; giving up", time.time(), row['id']),
+                    )
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', worker_pid = NULL, started_at = NULL, "
+                    "log = json_insert(log, '$[#]', ?) WHERE id = ?",
+                    ("♻️ Worker stopped; job re-queued", row['id']),
+                )
+                requeued += 1
+        return requeued
+
+    def purge(self, older_than_days: float = 7) -> int:
+        """Delete finished jobs older than the given age"""
+        cutoff = time.time() - older_than_days * 86400
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (cutoff,)
+            ).rowcount
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def run_build_deck(payload: Dict, progress_callback: Callable[[str], None], api_key: Optional[str],
+                   session_id: str) -> Dict:
+    """build_deck job: payload holds the collection CSV and the Deck Builder page's options"""
+    from deck_builder import MagicDeckBuilder
+
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY is not available to the worker")
+    builder = MagicDeckBuilder(api_key, session_id=session_id or "worker", entry='worker')
+    deck = builder.build_deck(
+        payload['csv_content'],
+        payload['format_type'],
+        payload.get('colors') or [],
+        payload.get('commander'),
+        payload.get('additional_notes', ''),
+        progress_callback,
+        regenerate=payload.get('regenerate', False),
+        seed_with_draft=payload.get('seed_with_draft', False),
+        output_mode=payload.get('output_mode', 'markdown'),
+    )
+    # Builders report failures as an error message rather than raising; the outcome says which
+    if builder.last_outcome not in ('ok', 'cached'):
+        raise RuntimeError(deck)
+    return {
+        'deck': deck,
+        'deck_json': builder.last_deck.to_json() if builder.last_deck else None,
+        'preselection': builder.last_preselection,
+    }
+
+
+def run_update_csv(payload: Dict, progress_callback: Callable[[str], None], api_key: Optional[str],
+                   session_id: str) -> Dict:
+    """update_csv job: enrich a collection CSV from Scryfall (optionally verified with Gemini)"""
+    from card_updater import MagicCardUpdater
+    from collection_db import enrichment_db
+
+    if payload.get('use_gemini') and not api_key:
+        raise ValueError("GEMINI_API_KEY is not available to the worker")
+    updater = MagicCardUpdater(api_key if payload.get('use_gemini') else None, session_id or "worker", enrichment_db())
+    return {'csv': updater.update_csv(payload['csv_content'], progress_callback, payload.get('file_name', ''))}
+
+
+HANDLERS = {
+    'build_deck': run_build_deck,
+    'update_csv': run_update_csv,
+}
+
+
+def run_worker(db_path: Optional[str] = None, api_key: Optional[str] = None, poll_interval: float = 1.0,
+               stop: Optional[threading.Event] = None):
+    """Claim and execute jobs until `stop` is set (forever when run as a worker process)"""
+    load_dotenv()
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    queue = JobQueue(db_path)
+    queue.requeue_orphans()
+    pid = os.getpid()
+
+    while not (stop and stop.is_set()):
+        job = queue.claim(pid)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        log = lambda message, job_id=job['id']: queue.append_log(job_id, message)
+        try:
+            result = HANDLERS[job['kind']](job['payload'], log, api_key, job['session_id'])
+        except Exception as e:
+            queue.fail(job['id'], str(e))
+        else:
+            queue.finish(job['id'], result)
+
+
+_workers: List[subprocess.Popen] = []
+_workers_lock = threading.Lock()
+
+
+def stop_workers(timeout: float = 10):
+    """Terminate the workers ensure_workers started and reap them (runs at interpreter exit)"""
+    with _workers_lock:
+        for worker in _workers:
+            if worker.poll() is None:
+                worker.terminate()
+        for worker in _workers:
+            try:
+                worker.wait(timeout)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+                worker.wait()
+        _workers.clear()
+
+
+atexit.register(stop_workers)
+
+
+def ensure_workers(count: Optional[int] = None, api_key: Optional[str] = None,
+                   db_path: Optional[str] = None) -> int:
+    """Start local worker processes once per server process; returns how many are alive
+
+    JOB_QUEUE_WORKERS (default 2) sets the count; 0 means workers run elsewhere
+    (`python job_queue.py --workers N`). Workers are separate interpreters, so they don't
+    inherit the web server's threads. The API key is passed in their environment and is
+    never written to the queue.
+    """
+    count = int(os.getenv("JOB_QUEUE_WORKERS", "2")) if count is None else count
+    env = dict(os.environ, JOB_QUEUE_DB=os.path.abspath(JobQueue(db_path).path))
+    if api_key:
+        env['GEMINI_API_KEY'] = api_key
+    here = os.path.dirname(os.path.abspath(__file__))
+    with _workers_lock:
+        # poll() reaps workers that exited, so none linger as zombies
+        _workers[:] = [worker for worker in _workers if worker.poll() is None]
+        while len(_workers) < count:
+            _workers.append(subprocess.Popen(
+                [sys.executable, os.path.join(here, 'job_queue.py'), '--workers', '1'], cwd=os.getcwd(), env=env
+            ))
+        return len(_workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run deck-building and enrichment workers for the job queue")
+    parser.add_argument('--workers', type=int, default=2, help="Worker processes to run (default: 2)")
+    parser.add_argument('--db', help=f"Queue database (default: $JOB_QUEUE_DB or {DEFAULT_DB})")
+    parser.add_argument('--purge-days', type=float, help="Delete finished jobs older than this many days and exit")
+    args = parser.parse_args()
+
+    if args.purge_days is not None:
+        print(f"🧹 Deleted {JobQueue(args.db).purge(args.purge_days)} finished job(s)")
+        return
+
+    print(f"👷 Starting {args.workers} worker(s) on {JobQueue(args.db).path} (Ctrl+C to stop)")
+    if args.workers == 1:
+        try:
+            run_worker(args.db)
+        except KeyboardInterrupt:
+            pass
+        return
+    
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=run_worker, args=(args.db,)) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == "__main__":
+    main()
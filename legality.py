@@ -0,0 +1,194 @@
+import argparse
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from cassette import install_from_env
+
+# Scryfall's format keys, in the order its `legalities` object lists them; one bit each
+FORMATS = [
+    'standard', 'future', 'historic', 'timeless', 'gladiator', 'pioneer', 'explorer', 'modern',
+    'legacy', 'pauper', 'vintage', 'penny', 'commander', 'oathbreaker', 'standardbrawl', 'brawl',
+    'alchemy', 'paupercommander', 'duel', 'oldschool', 'premodern', 'predh',
+]
+FORMAT_BITS = {fmt: 1 << i for i, fmt in enumerate(FORMATS)}
+LEGAL_STATUSES = ('legal', 'restricted')
+
+BULK_DATA_URL = "https://api.scryfall.com/bulk-data/oracle-cards"
+DEFAULT_BULK_FILE = os.path.join("collection", "oracle-cards.json")
+
+
+def legality_bits(legalities: Union[str, Dict, None]) -> int:
+    """Bitset of legal formats from the enriched "commander, legacy" column or a Scryfall legalities dict"""
+    if isinstance(legalities, dict):
+        formats = [fmt for fmt, status in legalities.items() if status in LEGAL_STATUSES]
+    else:
+        formats = str(legalities or '').lower().split(',')
+    bits = 0
+    for fmt in formats:
+        bits |= FORMAT_BITS.get(fmt.strip(), 0)
+    return bits
+
+
+def legalities_string(bits: int) -> str:
+    """Inverse of legality_bits, in the same format the enrichment writes ('None' if nothing is legal)"""
+    return ', '.join(fmt for fmt in FORMATS if bits & FORMAT_BITS[fmt]) or 'None'
+
+
+def legality_column(values: pd.Series) -> np.ndarray:
+    """One uint32 bitset per row; each distinct Legalities string is parsed once"""
+    codes, unique_values = pd.factorize(values.fillna('').astype(str))
+    if len(unique_values) == 0:
+        return np.zeros(len(codes), dtype=np.uint32)
+    unique_bits = np.array([legality_bits(value) for value in unique_values], dtype=np.uint32)
+    return unique_bits[codes]
+
+
+def format_mask(bits: np.ndarray, format_type: str) -> np.ndarray:
+    """Rows legal in `format_type` (all False for a format Scryfall doesn't track)"""
+    bit = FORMAT_BITS.get(format_type.strip().lower(), 0)
+    return (bits & np.uint32(bit)) != 0
+
+
+def legal_mask(cards: List[Dict], format_type: str) -> Optional[np.ndarray]:
+    """Rows of `cards` legal in the format, or None when there is nothing to filter on
+
+    That is the case for collections enriched before the Legalities column existed and for
+    formats Scryfall doesn't track.
+    """
+    if format_type.strip().lower() not in FORMAT_BITS:
+        return None
+    values = pd.Series([card.get('Legalities') or '' for card in cards], dtype=object)
+    if not values.str.strip().ne('').any():
+        return None
+    return format_mask(legality_column(values), format_type)
+
+
+def filter_legal(cards: List[Dict], format_type: str) -> Tuple[List[Dict], Optional[int]]:
+    """Keep the cards legal in the format; returns (cards, number removed or None if unfiltered)"""
+    keep = legal_mask(cards, format_type)
+    if keep is None:
+        return cards, None
+    kept = [card for card, legal in zip(cards, keep) if legal]
+    return kept, len(cards) - len(kept)
+
+
+def load_bulk_legalities(path: str = DEFAULT_BULK_FILE) -> Dict[str, int]:
+    """Legality bitsets from a Scryfall oracle-cards bulk file, keyed by Oracle ID and normalized name
+
+    Double-faced cards are also keyed by their front face name.
+    """
+    from deck_validator import normalize_name  # deck_validator -> deck_drafter -> card_index -> legality
+
+    with open(path, 'r', encoding='utf-8') as f:
+        bulk = json.load(f)
+
+    bits_by_key = {}
+    for card in bulk:
+        bits = legality_bits(card.get('legalities') or {})
+        if card.get('oracle_id'):
+            bits_by_key[card['oracle_id']] = bits
+        name = card.get('name') or ''
+        bits_by_key.setdefault(normalize_name(name), bits)
+        if '//' in name:
+            bits_by_key.setdefault(normalize_name(name.split('//')[0]), bits)
+    return bits_by_key
+
+
+def download_bulk(path: str = DEFAULT_BULK_FILE, force: bool = False) -> bool:
+    """Fetch the oracle-cards bulk file if Scryfall has a newer one; returns True if downloaded"""
+    import requests  # only the download path needs it
+
+    install_from_env()
+    meta = requests.get(BULK_DATA_URL, timeout=30)
+    meta.raise_for_status()
+    meta = meta.json()
+
+    if not force and os.path.exists(path):
+        updated = datetime.fromisoformat(meta['updated_at'].replace('Z', '+00:00'))
+        local = datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc)
+        if local >= updated:
+            return False
+
+    response = requests.get(meta['download_uri'], timeout=300)
+    response.raise_for_status()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(response.content)
+    return True
+
+
+def refresh_legalities(csv_content: str, bits_by_key: Dict[str, int]) -> Tuple[str, List[str]]:
+    """Rewrite the Legalities column from bulk data; returns (csv, names whose legality changed)
+
+    Only rows whose bitset differs are touched, so a rotation update is a single pass of
+    integer compares. Rows the bulk file doesn't know keep their current value.
+    """
+    from deck_validator import normalize_name
+
+    reader = csv.DictReader(io.StringIO(csv_content))
+    fieldnames = list(reader.fieldnames or [])
+    rows = list(reader)
+    if 'Legalities' not in fieldnames:
+        fieldnames.append('Legalities')
+
+    df = pd.DataFrame(rows, columns=fieldnames).fillna('')
+    current = legality_column(df['Legalities'])
+    name_column = 'Name' if 'Name' in df.columns else 'Card Name'
+    oracle_ids = df['Oracle ID'] if 'Oracle ID' in df.columns else pd.Series([''] * len(df))
+
+    fresh = current.copy()
+    for i, (oracle_id, name) in enumerate(zip(oracle_ids, df[name_column])):
+        bits = bits_by_key.get(oracle_id) if oracle_id else None
+        if bits is None:
+            bits = bits_by_key.get(normalize_name(name))
+        if bits is not None:
+            fresh[i] = bits
+
+    changed = np.flatnonzero(fresh != current)
+    for i in changed:
+        rows[i]['Legalities'] = legalities_string(int(fresh[i]))
+
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue(), sorted({rows[i].get(name_column, '') for i in changed})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh format legalities in a collection CSV from Scryfall bulk data")
+    parser.add_argument('csv_file', help="Collection CSV to update in place")
+    parser.add_argument('--bulk', default=DEFAULT_BULK_FILE, help="Scryfall oracle-cards bulk JSON")
+    parser.add_argument('--download', action='store_true', help="Download the bulk file first if Scryfall has a newer one")
+    args = parser.parse_args()
+
+    if args.download or not os.path.exists(args.bulk):
+        print("⬇️  Checking Scryfall bulk data...")
+        print("✅ Downloaded new bulk file" if download_bulk(args.bulk) else "✅ Bulk file is up to date")
+
+    print(f"📖 Loading legalities from {args.bulk}...")
+    bits_by_key = load_bulk_legalities(args.bulk)
+
+    with open(args.csv_file, 'r', encoding='utf-8') as f:
+        csv_content = f.read()
+    updated, changed = refresh_legalities(csv_content, bits_by_key)
+
+    if not changed:
+        print("✅ All legalities are current")
+        return
+    with open(args.csv_file, 'w', encoding='utf-8', newline='') as f:
+        f.write(updated)
+    print(f"⚖️  Updated legality for {len(changed)} card(s):")
+    for name in changed:
+        print(f"  - {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import re
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+MANA_SYMBOL = re.compile(r"\{([^}]+)\}")
+COLORS = ['W', 'U', 'B', 'R', 'G']
+# One row per card: mana value, pips per color (hybrid/Phyrexian pips are split), then symbol counts
+MANA_COLUMNS = ['cmc'] + COLORS + ['C', 'generic', 'X', 'hybrid', 'phyrexian']
+COLUMN = {name: i for i, name in enumerate(MANA_COLUMNS)}
+COLOR_SLICE = slice(COLUMN['W'], COLUMN['G'] + 1)
+
+
+@lru_cache(maxsize=8192)
+def parse_mana_cost(mana_cost: str) -> Tuple[float, ...]:
+    """Parse a cost like {2}{W/B}{G/P} into a row matching MANA_COLUMNS
+
+    - {X}, {Y}, {Z} add nothing to the mana value, only to the X count
+    - hybrid {W/B} is one mana; each color gets an equal share of the pip
+    - {2/W} counts 2 toward mana value and half a W pip (it can be paid with generic)
+    - Phyrexian {G/P} counts 1 toward mana value and half a pip (it can be paid with life)
+    Only the front face of "A // B" costs is parsed.
+    """
+    row = [0.0] * len(MANA_COLUMNS)
+    front = (mana_cost or '').split('//')[0]
+    for symbol in MANA_SYMBOL.findall(front):
+        parts = symbol.upper().split('/')
+        if len(parts) == 1:
+            part = parts[0]
+            if part.isdigit():
+                row[COLUMN['cmc']] += int(part)
+                row[COLUMN['generic']] += int(part)
+            elif part in ('X', 'Y', 'Z'):
+                row[COLUMN['X']] += 1
+            elif part in COLORS or part == 'C':
+                row[COLUMN['cmc']] += 1
+                row[COLUMN[part]] += 1
+            else:
+                # Snow and other one-off symbols are paid like generic mana
+                row[COLUMN['cmc']] += 1
+                row[COLUMN['generic']] += 1
+            continue
+
+        colors = [part for part in parts if part in COLORS]
+        phyrexian = 'P' in parts
+        generic_alternative = next((int(part) for part in parts if part.isdigit()), 0)
+        row[COLUMN['cmc']] += max(generic_alternative, 1)
+        row[COLUMN['phyrexian' if phyrexian else 'hybrid']] += 1
+        weight = 0.5 if phyrexian or generic_alternative else 1.0
+        for color in colors:
+            row[COLUMN[color]] += weight / len(colors)
+    return tuple(row)
+
+
+def card_cmc(mana_cost: str) -> int:
+    """Mana value of a mana cost string like {2}{W}{W}"""
+    return int(parse_mana_cost(mana_cost or '')[COLUMN['cmc']])
+
+
+def mana_matrix(costs: Sequence[str]) -> np.ndarray:
+    """Matrix of parsed costs (rows aligned with `costs`, columns MANA_COLUMNS)
+
+    Each distinct cost string is parsed once; duplicates are broadcast back.
+    """
+    codes, unique_costs = pd.factorize(pd.Series(costs, dtype=object).fillna(''))
+    if len(unique_costs) == 0:
+        return np.zeros((len(codes), len(MANA_COLUMNS)), dtype=np.float32)
+    unique_rows = np.array([parse_mana_cost(str(cost)) for cost in unique_costs], dtype=np.float32)
+    return unique_rows[codes]
+
+
+def curve_histogram(cmc: np.ndarray, counts: Optional[Sequence[int]] = None,
+                    mask: Optional[np.ndarray] = None, top: int = 7) -> pd.Series:
+    """Number of cards per mana value (the matrix's cmc column), with `top` and above in the last bin"""
+    cmc = np.asarray(cmc)
+    weights = np.ones(len(cmc)) if counts is None else np.asarray(counts, dtype=np.float64)
+    if mask is not None:
+        cmc, weights = cmc[mask], weights[mask]
+    bins = np.bincount(np.minimum(cmc, top).astype(np.int64), weights=weights, minlength=top + 1)
+    labels = [str(i) for i in range(top)] + [f"{top}+"]
+    return pd.Series(bins[:top + 1].astype(int), index=labels, name="Cards")
+
+
+def color_requirements(pips: np.ndarray, counts: Optional[Sequence[int]] = None,
+                       mask: Optional[np.ndarray] = None, lands: Optional[int] = None) -> pd.DataFrame:
+    """Colored pips per color (the matrix's WUBRG columns), the heaviest single-card demand
+    and a suggested split of `lands` mana sources"""
+    pips = np.asarray(pips, dtype=np.float64)
+    weights = np.ones(len(pips)) if counts is None else np.asarray(counts, dtype=np.float64)
+    if mask is not None:
+        pips, weights = pips[mask], weights[mask]
+
+    totals = (pips * weights[:, None]).sum(axis=0)
+    heaviest = pips.max(axis=0) if len(pips) else np.zeros(len(COLORS))
+    share = totals / totals.sum() if totals.sum() else np.zeros(len(COLORS))
+    result = pd.DataFrame({
+        'Pips': np.round(totals, 1),
+        'Share %': np.round(100 * share, 1),
+        'Max Pips in One Card': np.round(heaviest, 1),
+    }, index=COLORS)
+    if lands:
+        result['Suggested Sources'] = np.round(share * lands).astype(int)
+    return result[result['Pips'] > 0]
+
+
+def cmc_mask(cmc: np.ndarray, low: float = 0, high: float = float('inf')) -> np.ndarray:
+    """Rows whose mana value falls within [low, high]"""
+    cmc = np.asarray(cmc)
+    return (cmc >= low) & (cmc <= high)
+
+
+def pip_counts(mana_cost: str) -> Dict[str, float]:
+    """Pips per color for a single cost, e.g. {'W': 2.0, 'U': 0.5}"""
+    row = parse_mana_cost(mana_cost or '')
+    return {color: row[COLUMN[color]] for color in COLORS if row[COLUMN[color]]}
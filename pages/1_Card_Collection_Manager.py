@@ -1,14 +1,12 @@
 import streamlit as st
 import pandas as pd
-import csv
-import requests
-import time
 import os
-from typing import Dict, Optional
-import google.generativeai as genai
 from dotenv import load_dotenv
-from io import StringIO
-import tempfile
+from gemini_pool import streamlit_session_id
+from card_updater import MagicCardUpdater
+from collection_cache import parse_collection
+from collection_db import enrichment_db
+from job_queue import JobQueue, ensure_workers, queue_enabled
 
 # Load environment variables
 load_dotenv()  # For local development
@@ -33,186 +31,41 @@ All you need is a CSV with card names!
 **🤖 AI Verification**: Optional Gemini AI verification for data accuracy and consistency.
 """)
 
-# Initialize session state
-if 'cleaned_csv' not in st.session_state:
-    st.session_state.cleaned_csv = None
+# Initialize session state. The cleaned collection is kept as a reference to the shared,
+# dictionary-encoded parse (see collection_cache); CSV text is only produced for downloads
+if 'cleaned_collection' not in st.session_state:
+    st.session_state.cleaned_collection = None
 if 'cleaned_csv_name' not in st.session_state:
     st.session_state.cleaned_csv_name = None
 
-class MagicCardUpdater:
-    def __init__(self, gemini_api_key: Optional[str] = None):
-        self.scryfall_api = "https://api.scryfall.com/cards/named"
-        
-        # Initialize Gemini if API key provided
-        if gemini_api_key:
-            genai.configure(api_key=gemini_api_key)
-            self.gemini_model = genai.GenerativeModel('gemini-2.5-flash')
-        else:
-            self.gemini_model = None
-    
-    def search_scryfall(self, card_name: str) -> Optional[Dict]:
-        """Search Scryfall API for card information"""
-        try:
-            params = {'fuzzy': card_name}
-            response = requests.get(self.scryfall_api, params=params)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return None
-        except Exception as e:
-            return None
+@st.fragment(run_every=2)
+def show_enrich_job(job_id: str):
+    """Progress of a queued enrichment; polls the queue until a worker finishes it"""
+    queue = JobQueue()
+    job = queue.get(job_id)
+    if job is None:
+        del st.query_params['enrich_job']
+        return
     
-    def extract_card_data(self, card_data: Dict) -> Dict:
-        """Extract relevant information from Scryfall response"""
-        card_text = card_data.get('oracle_text', '')
-        card_text = card_text.replace('\n', ' | ')
-        
-        extracted = {
-            'colors': ', '.join(card_data.get('colors', [])) or 'Colorless',
-            'mana_cost': card_data.get('mana_cost', ''),
-            'card_text': card_text,
-            'power_toughness': ''
-        }
-        
-        if 'power' in card_data and 'toughness' in card_data:
-            power = card_data['power']
-            toughness = card_data['toughness']
-            extracted['power_toughness'] = f"{power}.{toughness}"
-        
-        return extracted
+    if job['status'] == 'queued':
+        st.info(f"⏳ Queued with {queue.position(job_id)} job(s) ahead. You can reload or leave this page; processing keeps going.")
+    elif job['status'] == 'running':
+        st.info("⏳ Processing in the background. You can reload or leave this page.")
+    if job['log']:
+        with st.expander("📝 Processing Log", expanded=True):
+            st.text('\n'.join(job['log'][-20:]))
     
-    def verify_with_gemini(self, card_name: str, card_data: Dict, progress_callback=None) -> bool:
-        """Use Gemini to verify the card information accuracy"""
-        if not self.gemini_model:
-            return True
-        
-        try:
-            prompt = f"""You are verifying Magic: The Gathering card data for consistency and completeness.
-
-IMPORTANT CONTEXT:
-- This card may be from a Universe Beyond set (like Avatar: The Last Airbender, Warhammer 40K, Doctor Who, etc.)
-- Universe Beyond cards are official MTG cards but feature characters/themes from other franchises
-- Focus on verifying the DATA CONSISTENCY, not whether the card name sounds like a traditional MTG card
-
-Card Name: {card_name}
-Colors: {card_data['colors']}
-Mana Cost: {card_data['mana_cost']}
-Card Text: {card_data['card_text']}
-Power/Toughness: {card_data['power_toughness']}
-
-VERIFICATION CHECKLIST:
-1. Does the mana cost format look valid?
-2. Do the colors match what's in the mana cost?
-3. If there's a Power/Toughness, does it make sense?
-4. Does the card text contain valid MTG mechanics and formatting?
-5. Is there any obvious data corruption or formatting errors?
-
-Respond with 'VERIFIED' if the data looks consistent and properly formatted, or 'CONCERN: [specific issue]' only if there's a clear data quality problem."""
-
-            response = self.gemini_model.generate_content(prompt)
-            result = response.text.strip()
-            
-            if progress_callback:
-                if 'VERIFIED' in result:
-                    progress_callback("✓ Gemini verification passed")
-                else:
-                    progress_callback(f"⚠️ Gemini flagged issue: {result}")
-            
-            return 'VERIFIED' in result
-        except Exception as e:
-            if progress_callback:
-                progress_callback(f"⚠️ Gemini verification failed: {e}")
-            return True
-    
-    def update_csv(self, csv_content: str, progress_callback=None) -> str:
-        """Process CSV content and return updated CSV"""
-        # Read the CSV
-        csv_file = StringIO(csv_content)
-        reader = csv.DictReader(csv_file)
-        fieldnames = list(reader.fieldnames) if reader.fieldnames else []
-        rows = list(reader)
-        
-        # Ensure Name column exists (required)
-        if 'Name' not in fieldnames and 'Card Name' not in fieldnames:
-            raise ValueError("CSV must have either 'Name' or 'Card Name' column")
-        
-        # Ensure required columns exist (will be auto-populated)
-        required_cols = ['Card color(s)', 'Card Text', 'Mana Cost', 'Power/Toughness']
-        added_cols = []
-        for col in required_cols:
-            if col not in fieldnames:
-                fieldnames.append(col)
-                added_cols.append(col)
-        
-        if added_cols and progress_callback:
-            progress_callback(f"✨ Auto-added missing columns: {', '.join(added_cols)}")
-        
-        total_rows = len(rows)
-        updated_count = 0
-        
-        # Process each row
-        for idx, row in enumerate(rows, 1):
-            card_name = row.get('Name', '').strip()
-            
-            if not card_name:
-                if progress_callback:
-                    progress_callback(f"Row {idx}/{total_rows}: Empty card name, skipping...")
-                continue
-            
-            # Check if row needs updating
-            needs_update = any(not row.get(col, '').strip() for col in required_cols)
-            
-            if not needs_update:
-                if progress_callback:
-                    progress_callback(f"Row {idx}/{total_rows}: '{card_name}' - Already complete ✓")
-                continue
-            
-            if progress_callback:
-                progress_callback(f"Row {idx}/{total_rows}: Processing '{card_name}'...")
-            
-            # Search Scryfall
-            card_data = self.search_scryfall(card_name)
-            
-            if not card_data:
-                if progress_callback:
-                    progress_callback(f"  ❌ Could not find card data for '{card_name}'")
-                continue
-            
-            # Extract information
-            extracted = self.extract_card_data(card_data)
-            
-            # Update only empty fields
-            for csv_col, data_key in [
-                ('Card color(s)', 'colors'),
-                ('Card Text', 'card_text'),
-                ('Mana Cost', 'mana_cost'),
-                ('Power/Toughness', 'power_toughness')
-            ]:
-                if not row.get(csv_col, '').strip():
-                    row[csv_col] = extracted[data_key]
-            
-            # Verify with Gemini
-            self.verify_with_gemini(card_name, extracted, progress_callback)
-            
-            if progress_callback:
-                progress_callback(f"  ✅ Updated '{card_name}' successfully")
-            updated_count += 1
-            
-            # Rate limiting
-            time.sleep(0.1)
-        
-        # Write to string
-        output = StringIO()
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
-        
-        if progress_callback:
-            progress_callback(f"\n✅ Complete! Updated {updated_count} cards out of {total_rows} total cards")
-        
-        return output.getvalue()
-
+    if job['status'] == 'done':
+        st.session_state.cleaned_collection = parse_collection(job['result']['csv'],
+                                                               st.session_state.get('cleaned_collection'))
+        st.session_state.cleaned_csv_name = f"cleaned_{job['payload']['file_name']}"
+        del st.query_params['enrich_job']
+        st.rerun()
+    elif job['status'] == 'failed':
+        st.error(f"❌ Error processing cards: {job['error']}")
+        if st.button("Dismiss"):
+            del st.query_params['enrich_job']
+            st.rerun()
 
 # Main UI
 col1, col2 = st.columns([2, 1])
@@ -254,8 +107,20 @@ with col1:
                     st.error("❌ GEMINI_API_KEY not found! Please add it to Streamlit secrets or .env file!")
                     st.stop()
             
+            # With the job queue enabled a worker process does the enrichment; the job id in
+            # the URL lets the page pick the result up again after a reload
+            if queue_enabled():
+                ensure_workers(api_key=api_key)
+                uploaded_file.seek(0)
+                st.query_params['enrich_job'] = JobQueue().submit('update_csv', {
+                    'csv_content': uploaded_file.read().decode('utf-8'),
+                    'use_gemini': use_gemini,
+                    'file_name': uploaded_file.name,
+                }, streamlit_session_id())
+                st.rerun()
+            
             # Create updater
-            updater = MagicCardUpdater(api_key if use_gemini else None)
+            updater = MagicCardUpdater(api_key if use_gemini else None, streamlit_session_id(), enrichment_db())
             
             # Progress tracking
             progress_bar = st.progress(0)
@@ -275,10 +140,11 @@ with col1:
             # Process
             with st.spinner("Processing cards..."):
                 try:
-                    result_csv = updater.update_csv(csv_content, log_callback)
+                    result_csv = updater.update_csv(csv_content, log_callback, uploaded_file.name)
                     
                     # Store in session state
-                    st.session_state.cleaned_csv = result_csv
+                    st.session_state.cleaned_collection = parse_collection(
+                        result_csv, st.session_state.get('cleaned_collection'))
                     st.session_state.cleaned_csv_name = f"cleaned_{uploaded_file.name}"
                     
                     progress_bar.progress(100)
@@ -290,16 +156,20 @@ with col1:
                     st.error(f"❌ Error processing cards: {e}")
                     st.stop()
 
+    # Queued enrichment (survives page reloads through the URL)
+    if 'enrich_job' in st.query_params:
+        show_enrich_job(st.query_params['enrich_job'])
+
 with col2:
     st.header("📥 Download Results")
     
-    if st.session_state.cleaned_csv:
+    if st.session_state.cleaned_collection is not None:
         st.success("✅ Cleaned data ready!")
         
         # Download button
         st.download_button(
             label="💾 Download Cleaned CSV",
-            data=st.session_state.cleaned_csv,
+            data=st.session_state.cleaned_collection.to_csv(),
             file_name=st.session_state.cleaned_csv_name,
             mime="text/csv",
             use_container_width=True,
@@ -311,8 +181,7 @@ with col2:
         
         # Preview cleaned data
         with st.expander("👁️ Preview Cleaned Data"):
-            cleaned_df = pd.read_csv(StringIO(st.session_state.cleaned_csv))
-            st.dataframe(cleaned_df.head(10), use_container_width=True)
+            st.dataframe(st.session_state.cleaned_collection.df.head(10), use_container_width=True)
     else:
         st.info("Upload and process a CSV file to download the cleaned results.")
 
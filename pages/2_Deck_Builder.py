@@ -1,13 +1,19 @@
 ﻿import streamlit as st
 import pandas as pd
-import csv
 import os
-from typing import List, Dict, Optional
-import google.generativeai as genai
+from typing import Dict, Optional
 from datetime import datetime
 from dotenv import load_dotenv
-from io import StringIO
-import tempfile
+from gemini_pool import streamlit_session_id
+from deck_builder import MagicDeckBuilder
+from job_queue import JobQueue, ensure_workers, queue_enabled
+from goldfish import goldfish
+from card_features import PIP_COLUMNS, feature_summary
+from collection_cache import ParsedCollection, get_collection, parse_collection
+from mana import color_requirements, curve_histogram
+from deck_variants import (
+    COLOR_NAMES, color_combination_variants, commander_variants, variant_label, build_variants
+)
 
 # Load environment variables
 load_dotenv()  # For local development
@@ -22,6 +28,100 @@ def get_api_key():
         # Fall back to environment variable (for local development)
         return os.getenv("GEMINI_API_KEY")
 
+def show_collection_analytics(collection: ParsedCollection):
+    """Role, keyword and creature type breakdown from the cached card features"""
+    features = collection.features
+    summary = feature_summary(features)
+    
+    with st.expander("🔬 Collection Analytics"):
+        col_a, col_b = st.columns(2)
+        with col_a:
+            st.write("**Card roles**")
+            st.bar_chart(pd.Series(summary['roles'], name="Cards"))
+        with col_b:
+            st.write("**Keywords**")
+            if summary['keywords']:
+                st.bar_chart(pd.Series(summary['keywords'], name="Cards"))
+        
+        # Curve and color demand straight from the parsed mana cost columns
+        col_c, col_d = st.columns(2)
+        with col_c:
+            st.write("**Mana curve**")
+            st.bar_chart(curve_histogram(features['cmc'].to_numpy()))
+        with col_d:
+            st.write("**Colored pips**")
+            st.dataframe(color_requirements(features[PIP_COLUMNS].to_numpy()), use_container_width=True)
+        if summary['creature_types']:
+            st.write("**Creature types mentioned**: " + ", ".join(
+                f"{name} ({count})" for name, count in summary['creature_types'].items()
+            ))
+
+@st.cache_data(show_spinner=False)
+def run_goldfish(deck_markdown: str, collection_key: str, _collection: ParsedCollection,
+                 commander: Optional[str], on_the_play: bool) -> Dict:
+    """Simulate 100k games of the deck; cached per deck and collection hash so reruns don't repeat it"""
+    cards = _collection.records
+    return goldfish(deck_markdown, cards, commander, games=100_000, on_the_play=on_the_play, seed=0)
+
+def show_goldfish(deck_markdown: str, collection: ParsedCollection, commander: Optional[str]):
+    """Opening hands, land drops and castable turns for the generated deck"""
+    st.subheader("🎲 Goldfish Simulation")
+    on_the_play = st.toggle("On the play", value=True, help="Off simulates being on the draw (one extra card)")
+    try:
+        result = run_goldfish(deck_markdown, collection.key, collection, commander, on_the_play)
+    except ValueError as e:
+        st.info(f"Simulation unavailable: {e}")
+        return
+    
+    st.caption(f"{result['games']:,} shuffled games of a {result['library_size']}-card library with {result['lands']} lands")
+    metric_a, metric_b = st.columns(2)
+    metric_a.metric("Mulligan rate", f"{result['mulligan_rate']:.1%}", help="Opening hands with fewer than 2 or more than 5 lands")
+    metric_b.metric("Avg lands in opening 7", f"{(result['opening_lands'] * range(len(result['opening_lands']))).sum():.2f}")
+    
+    st.write("**Lands in opening hand**")
+    st.bar_chart(pd.Series(result['opening_lands'], name="Share of hands"))
+    st.write("**Hit every land drop through turn N**")
+    land_drops = pd.Series(result['land_drops'], index=range(1, len(result['land_drops']) + 1), name="Probability")
+    st.line_chart(land_drops)
+    st.write("**When each card becomes castable**")
+    st.dataframe(result['castable'], use_container_width=True, hide_index=True)
+
+@st.fragment(run_every=2)
+def show_deck_job(job_id: str):
+    """Progress of a queued build; polls the queue until a worker finishes it"""
+    queue = JobQueue()
+    job = queue.get(job_id)
+    if job is None:
+        del st.query_params['deck_job']
+        return
+    
+    st.markdown("---")
+    st.header("⏳ Deck Build in Progress")
+    if job['status'] == 'queued':
+        st.info(f"Queued with {queue.position(job_id)} job(s) ahead. You can reload or leave this page; the build keeps going.")
+    elif job['status'] == 'running':
+        st.info("Building your deck in the background. You can reload or leave this page.")
+    if job['log']:
+        st.text('\n'.join(job['log'][-20:]))
+    
+    if job['status'] == 'done':
+        payload, result = job['payload'], job['result']
+        st.session_state.generated_deck = result['deck']
+        st.session_state.preselection = result['preselection']
+        st.session_state.deck_json = result['deck_json']
+        collection = get_collection(payload.get('collection_key', '')) or parse_collection(payload['csv_content'])
+        st.session_state.deck_context = {'collection': collection, 'commander': payload.get('commander')}
+        timestamp = datetime.fromtimestamp(job['finished_at']).strftime("%Y%m%d_%H%M%S")
+        color_str = "_".join(payload['colors']) if payload['colors'] else "any"
+        st.session_state.deck_filename = f"deck_{payload['format_type']}_{color_str}_{timestamp}.md"
+        del st.query_params['deck_job']
+        st.rerun()
+    elif job['status'] == 'failed':
+        st.error(f"❌ Error building deck: {job['error']}")
+        if st.button("Dismiss"):
+            del st.query_params['deck_job']
+            st.rerun()
+
 st.title("ðŸƒ Magic: The Gathering Deck Builder")
 st.markdown("""
 Build optimized Commander and Standard decks from your card collection using AI-powered strategy analysis.
@@ -32,305 +132,14 @@ if 'generated_deck' not in st.session_state:
     st.session_state.generated_deck = None
 if 'deck_filename' not in st.session_state:
     st.session_state.deck_filename = None
-
-
-class MagicDeckBuilder:
-    def __init__(self, api_key: str):
-        """Initialize the deck builder with Gemini API"""
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-pro')
-        
-        # Knowledge base directories
-        self.knowledge_base = {
-            'commander': 'knowledge/commander',
-            'standard': 'knowledge/standard',
-            'general': 'knowledge/general'
-        }
-    
-    def load_collection_from_string(self, csv_content: str) -> List[Dict]:
-        """Load the user's card collection from CSV string"""
-        csv_file = StringIO(csv_content)
-        reader = csv.DictReader(csv_file)
-        cards = list(reader)
-        return cards
-    
-    def load_knowledge_base(self, format_type: str) -> str:
-        """Load relevant knowledge base documents from directories"""
-        knowledge_content = ""
-        files_loaded = 0
-        
-        # Load general knowledge from directory
-        if os.path.exists(self.knowledge_base['general']) and os.path.isdir(self.knowledge_base['general']):
-            general_files = [f for f in os.listdir(self.knowledge_base['general']) 
-                           if f.endswith(('.txt', '.md'))]
-            for filename in general_files:
-                filepath = os.path.join(self.knowledge_base['general'], filename)
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    knowledge_content += f"# General: {filename}\n{f.read()}\n\n"
-                    files_loaded += 1
-        
-        # Load format-specific knowledge from directory
-        format_key = format_type.lower()
-        if format_key in self.knowledge_base and os.path.exists(self.knowledge_base[format_key]):
-            if os.path.isdir(self.knowledge_base[format_key]):
-                format_files = [f for f in os.listdir(self.knowledge_base[format_key]) 
-                              if f.endswith(('.txt', '.md'))]
-                for filename in format_files:
-                    filepath = os.path.join(self.knowledge_base[format_key], filename)
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        knowledge_content += f"# {format_type.title()}: {filename}\n{f.read()}\n\n"
-                        files_loaded += 1
-        
-        if not knowledge_content:
-            knowledge_content = self.create_default_knowledge(format_type)
-        
-        return knowledge_content, files_loaded
-    
-    def create_default_knowledge(self, format_type: str) -> str:
-        """Create basic knowledge if files don't exist"""
-        if format_type.lower() == 'commander':
-            return """# Commander Deck Building Basics
-- 100 cards total including commander
-- Singleton format (only 1 copy of each card except basic lands)
-- Typical land count: 36-38
-- Ramp cards: 8-12
-- Card draw: 8-12
-- Removal: 8-12
-- Win conditions: 3-5
-- Synergy with commander is crucial
-"""
-        else:
-            return """# Standard Deck Building Basics
-- 60 cards minimum
-- Up to 4 copies of each card (except basic lands)
-- Typical land count: 24-26 for 60-card deck
-- Mana curve is critical (peak at 2-3 CMC)
-- Include removal and interaction
-- Clear win condition
-"""
-    
-    def filter_by_colors(self, cards: List[Dict], colors: List[str]) -> List[Dict]:
-        """Filter cards by color preference"""
-        if not colors or 'Any' in colors:
-            return cards
-        
-        filtered = []
-        for card in cards:
-            card_colors = card.get('Card color(s)', '').upper()
-            
-            if 'COLORLESS' in card_colors or not card_colors:
-                filtered.append(card)
-            else:
-                card_color_list = [c.strip() for c in card_colors.split(',')]
-                color_map = {
-                    'GREEN': 'G', 'RED': 'R', 'BLACK': 'B', 
-                    'WHITE': 'W', 'BLUE': 'U'
-                }
-                
-                card_color_codes = [color_map.get(c, c) for c in card_color_list]
-                user_color_codes = [c[0].upper() for c in colors]
-                
-                if all(cc in user_color_codes for cc in card_color_codes):
-                    filtered.append(card)
-        
-        return filtered
-    
-    def format_collection_for_prompt(self, cards: List[Dict]) -> str:
-        """Format card collection for the AI prompt"""
-        collection_text = "# USER'S CARD COLLECTION\n\n"
-        
-        for card in cards:
-            card_name = card.get('Card Name', card.get('Name', 'Unknown'))
-            colors = card.get('Card color(s)', card.get('Card Color(s)', 'Unknown'))
-            mana_cost = card.get('Mana Cost', 'Unknown')
-            card_text = card.get('Card Text', 'No text')
-            pt = card.get('Power/Toughness', '')
-            is_fancy = card.get('Is Fancy', 'No')
-            
-            collection_text += f"**{card_name}**\n"
-            collection_text += f"- Colors: {colors}\n"
-            collection_text += f"- Mana Cost: {mana_cost}\n"
-            if pt:
-                collection_text += f"- Power/Toughness: {pt}\n"
-            collection_text += f"- Text: {card_text}\n"
-            collection_text += f"- Is Fancy: {is_fancy}\n\n"
-        
-        return collection_text
-    
-    def build_system_prompt(self, format_type: str, colors: List[str], 
-                           commander: Optional[str], additional_notes: str,
-                           knowledge: str) -> str:
-        """Build the comprehensive system prompt"""
-        
-        color_str = ', '.join(colors) if colors else 'Any colors'
-        
-        prompt = f"""# Role and Objective
-You are a skilled assistant with extensive expertise in building Magic: The Gathering {format_type} decks using exclusively the user's personal card collection. You specialize in all deck styles and color combinations.
-
-# Current Deck Parameters
-- **Format**: {format_type}
-- **Color Preference**: {color_str}
-"""
-        
-        if format_type.lower() == 'commander':
-            if commander:
-                prompt += f"- **Commander**: {commander} (pre-selected)\n"
-            else:
-                prompt += f"- **Commander**: Select the best commander from the collection for {color_str}\n"
-        
-        if additional_notes:
-            prompt += f"\n# Additional User Notes\n{additional_notes}\n"
-        
-        prompt += f"""
-# Knowledge Base
-{knowledge}
-
-# Instructions
-
-1. **Knowledge Analysis**: 
-   - Analyze the provided knowledge documents for best practices in {format_type} deck building
-   - Extract key insights relevant to {color_str} strategies
-
-2. **Deck Planning**:
-   - Develop a clear plan for card selection, including recommended counts for each card type
-   - Provide initial strategic notes relevant to the chosen colors and format
-"""
-        
-        if format_type.lower() == 'commander' and not commander:
-            prompt += """   - **FIRST**: Select the best commander from the collection that fits the color preference
-   - Explain why this commander was chosen
-"""
-        
-        prompt += """
-3. **Deck Construction**:
-   - Build a COMPLETE deck strictly from the user's collection
-   - You MUST build a full deck using ONLY cards from the provided collection
-   - Do NOT include any cards marked as "MISSING FROM COLLECTION"
-   - Follow the established plan and selection guidelines
-   - Ensure color identity matches requirements
-   - If certain optimal cards aren't available, select the best alternatives from the collection
-
-4. **Dual Perspective Review**:
-   - Critically review the constructed deck from two distinct perspectives (e.g., competitive play, casual play, synergy focus)
-   - Offer detailed feedback from each perspective (limit to 3-4 concise sentences per perspective)
-
-5. **Synthesis and Adjustment**:
-   - Integrate feedback and make any necessary deck adjustments
-   - Ensure the deck is still using ONLY cards from the collection
-
-6. **Final Presentation**:
-   - Present the final card list in the specified format
-   - Prioritize inclusion of the user's "fancier" cards where it adds strategic or aesthetic value
-   - After the complete decklist, provide a separate "Suggested Upgrades" section listing cards not in the collection that would improve the deck
-
-# Output Format
-
-- **Decklist**: Present a Markdown table with columns: Card Name, Card Type, Is Fancy (Yes/No), and Notes
-- **Grouping**: Group cards by typeâ€”Lands, Creatures, Instants, Sorceries, Artifacts, Enchantments, Planeswalkers, Othersâ€”and sort alphabetically within each group
-- **Is Fancy**: Indicate 'Yes' if a card is marked as fancy in the collection, otherwise 'No'
-- **ALL CARDS MUST BE FROM COLLECTION**: Do not include any cards not in the user's collection in the main decklist
-- **Summary**: Show total counts for each card type after the decklist
-- **Suggested Upgrades Section**: AFTER the complete decklist and summary, create a separate section titled "## Suggested Upgrades" that lists cards NOT in the collection that would improve the deck, with brief explanations of why they would be beneficial
-
-### Example Markdown Table
-
-| Card Name | Card Type | Is Fancy | Notes |
-|-----------|-----------|----------|-------|
-| Forest | Land | No | Basic mana |
-| Sol Ring | Artifact | Yes | Ramp |
-| ... | ... | ... | ... |
-
-### Card Type Summary
-- Lands: X
-- Creatures: X
-- Artifacts: X
-- Enchantments: X
-- Instants: X
-- Sorceries: X
-- Planeswalkers: X
-
-# Reasoning Steps
-- Think through each phase step by step: analyze knowledge, plan deck structure, select cards from collection, review from multiple perspectives, and adjust accordingly
-
-# Output Verbosity
-- Respond with no more than 2 short paragraphs for narrative sections
-- For feedback in the Dual Perspective Review, limit to 3-4 concise sentences per perspective
-- Decklist and summaries should remain clear and complete
-
-# Stop Conditions
-- Task is complete when you have delivered:
-  1. A finished, grouped, and annotated Markdown decklist using ONLY cards from the user's collection
-  2. A card type summary
-  3. A "Suggested Upgrades" section listing cards not in the collection that would improve the deck
-"""
-        
-        return prompt
-    
-    def build_deck(self, csv_content: str, format_type: str, colors: List[str],
-                   commander: Optional[str] = None, additional_notes: str = "",
-                   progress_callback=None) -> str:
-        """Main method to build a deck"""
-        
-        # Load collection
-        if progress_callback:
-            progress_callback("ðŸ“š Loading collection...")
-        cards = self.load_collection_from_string(csv_content)
-        
-        if progress_callback:
-            progress_callback(f"âœ… Loaded {len(cards)} cards from collection")
-        
-        # Filter by colors
-        if progress_callback:
-            progress_callback("ðŸŽ¨ Filtering cards by color preference...")
-        filtered_cards = self.filter_by_colors(cards, colors)
-        
-        if not filtered_cards:
-            return "âŒ Error: No cards found matching the color preference!"
-        
-        if progress_callback:
-            progress_callback(f"âœ… Filtered to {len(filtered_cards)} cards")
-        
-        # Load knowledge base
-        if progress_callback:
-            progress_callback(f"ðŸ“– Loading knowledge base for {format_type}...")
-        knowledge, files_loaded = self.load_knowledge_base(format_type)
-        
-        if progress_callback:
-            progress_callback(f"âœ… Loaded {files_loaded} knowledge base file(s)")
-        
-        # Format collection for prompt
-        if progress_callback:
-            progress_callback("ðŸ“ Formatting collection for AI...")
-        collection_text = self.format_collection_for_prompt(filtered_cards)
-        
-        # Build system prompt
-        if progress_callback:
-            progress_callback("ðŸ”§ Building prompt...")
-        system_prompt = self.build_system_prompt(
-            format_type, colors, commander, additional_notes, knowledge
-        )
-        
-        # Combine everything
-        full_prompt = f"{system_prompt}\n\n{collection_text}"
-        
-        # Call Gemini
-        if progress_callback:
-            progress_callback("ðŸ¤– Generating deck with Gemini AI... (this may take a moment)")
-        
-        try:
-            response = self.model.generate_content(full_prompt)
-            result = response.text
-            
-            if progress_callback:
-                progress_callback("âœ… Deck generation complete!")
-            
-            return result
-            
-        except Exception as e:
-            error_msg = f"âŒ Error generating deck: {e}"
-            if progress_callback:
-                progress_callback(error_msg)
-            return error_msg
+if 'variant_decks' not in st.session_state:
+    st.session_state.variant_decks = []
+if 'preselection' not in st.session_state:
+    st.session_state.preselection = None
+if 'deck_json' not in st.session_state:
+    st.session_state.deck_json = None
+if 'deck_context' not in st.session_state:
+    st.session_state.deck_context = None
 
 
 # Main UI
@@ -339,23 +148,26 @@ st.header("1ï¸âƒ£ Select Card Collection")
 # Create tabs for different input methods
 tab1, tab2 = st.tabs(["ðŸ“‹ Use Cleaned Data", "ðŸ“¤ Upload New CSV"])
 
-csv_content = None
-csv_source = None
+# The selected collection lives in session state so it survives the reruns every widget triggers.
+# Sessions hold a reference to the shared parsed collection, never their own copy of the CSV text
+if 'selected_collection' not in st.session_state:
+    st.session_state.selected_collection = None
 
 with tab1:
-    if 'cleaned_csv' in st.session_state and st.session_state.cleaned_csv:
+    if st.session_state.get('cleaned_collection') is not None:
         st.success(f"âœ… Cleaned data available: {st.session_state.cleaned_csv_name}")
         
-        # Preview
-        cleaned_df = pd.read_csv(StringIO(st.session_state.cleaned_csv))
-        st.info(f"ðŸ“Š {len(cleaned_df)} cards in collection")
+        # Preview (parsed once, shared with analytics and the build)
+        cleaned = st.session_state.cleaned_collection
+        st.info(f"ðŸ“Š {len(cleaned)} cards in collection")
         
         with st.expander("ðŸ‘ï¸ Preview Collection"):
-            st.dataframe(cleaned_df.head(10), use_container_width=True)
+            st.dataframe(cleaned.df.head(10), use_container_width=True)
+        
+        show_collection_analytics(cleaned)
         
-        if st.button("âœ… Use This Collection", type="primary", use_container_width=True):
-            csv_content = st.session_state.cleaned_csv
-            csv_source = "cleaned"
+        if st.button("âœ… Use This Collection", type="primary", use_container_width=True, key="use_cleaned"):
+            st.session_state.selected_collection = cleaned
             st.success("Collection selected!")
     else:
         st.info("No cleaned data available. Please visit the **Card Collection Manager** page first, or upload a CSV in the next tab.")
@@ -368,20 +180,23 @@ with tab2:
     )
     
     if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
-        st.success(f"âœ… Loaded {len(df)} cards from {uploaded_file.name}")
+        uploaded = parse_collection(uploaded_file.getvalue().decode('utf-8'),
+                                    st.session_state.get('selected_collection'))
+        st.success(f"âœ… Loaded {len(uploaded)} cards from {uploaded_file.name}")
         
         with st.expander("ðŸ‘ï¸ Preview Collection"):
-            st.dataframe(df.head(10), use_container_width=True)
+            st.dataframe(uploaded.df.head(10), use_container_width=True)
         
-        if st.button("âœ… Use This Collection", type="primary", use_container_width=True):
-            uploaded_file.seek(0)
-            csv_content = uploaded_file.read().decode('utf-8')
-            csv_source = "uploaded"
+        show_collection_analytics(uploaded)
+        
+        if st.button("âœ… Use This Collection", type="primary", use_container_width=True, key="use_uploaded"):
+            st.session_state.selected_collection = uploaded
             st.success("Collection selected!")
 
+collection = st.session_state.selected_collection
+
 # Deck Building Configuration
-if csv_content:
+if collection is not None:
     st.markdown("---")
     st.header("2ï¸âƒ£ Configure Your Deck")
     
@@ -400,11 +215,19 @@ if csv_content:
         if format_type == "Commander":
             use_commander = st.checkbox("Select a specific commander", value=False)
             if use_commander:
-                commander = st.text_input(
-                    "Commander Name",
-                    placeholder="e.g., Aang, Avatar",
-                    help="Enter the exact name of your commander"
-                )
+                candidates = collection.index.commander_candidates()
+                if candidates:
+                    commander = st.selectbox(
+                        "Commander",
+                        options=candidates,
+                        help="Legendary creatures in your collection that are legal commanders"
+                    )
+                else:
+                    commander = st.text_input(
+                        "Commander Name",
+                        placeholder="e.g., Aang, Avatar",
+                        help="Enter the exact name of your commander (enrich the collection to pick from a list)"
+                    )
     
     with col2:
         # Color selection
@@ -433,6 +256,39 @@ if csv_content:
     st.markdown("---")
     st.header("3ï¸âƒ£ Generate Deck")
     
+    regenerate = st.checkbox(
+        "🔄 Regenerate deck",
+        value=False,
+        help="Identical requests return the previously generated deck instantly. Check this to ask the AI for a fresh build."
+    )
+    seed_with_draft = st.checkbox(
+        "🌱 Seed AI with a local draft",
+        value=False,
+        help="Build a legal draft locally first and ask the AI to refine it instead of starting from scratch."
+    )
+    structured_output = st.checkbox(
+        "🧾 Structured JSON output",
+        value=False,
+        help="Ask for a schema-constrained JSON deck. It is validated without table parsing and can be downloaded as JSON."
+    )
+    
+    if st.button("⚡ Instant Local Draft (no AI)", use_container_width=True):
+        st.session_state.generated_deck = MagicDeckBuilder().draft_locally(
+            collection.records,
+            format_type,
+            selected_colors if selected_colors else [],
+            commander if format_type == "Commander" else None,
+            collection.features,
+            collection.synergy
+        )
+        st.session_state.preselection = None
+        st.session_state.deck_json = None
+        st.session_state.deck_context = {'collection': collection, 'commander': commander if format_type == "Commander" else None}
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        color_str = "_".join(selected_colors) if selected_colors else "any"
+        st.session_state.deck_filename = f"draft_{format_type}_{color_str}_{timestamp}.md"
+        st.success("✅ Local draft ready!")
+    
     if st.button("ðŸš€ Build Deck", type="primary", use_container_width=True):
         # Validate API key
         api_key = get_api_key()
@@ -440,8 +296,25 @@ if csv_content:
             st.error("âŒ GEMINI_API_KEY not found! Please add it to Streamlit secrets or .env file!")
             st.stop()
         
+        # With the job queue enabled a worker process builds the deck; the job id in the URL
+        # lets the page pick the result up again after a reload
+        if queue_enabled():
+            ensure_workers(api_key=api_key)
+            st.query_params['deck_job'] = JobQueue().submit('build_deck', {
+                'csv_content': collection.to_csv(),
+                'collection_key': collection.key,
+                'format_type': format_type,
+                'colors': selected_colors if selected_colors else [],
+                'commander': commander if format_type == "Commander" else None,
+                'additional_notes': additional_notes,
+                'regenerate': regenerate,
+                'seed_with_draft': seed_with_draft,
+                'output_mode': "json" if structured_output else "markdown",
+            }, streamlit_session_id())
+            st.rerun()
+        
         # Create deck builder
-        builder = MagicDeckBuilder(api_key)
+        builder = MagicDeckBuilder(api_key, session_id=streamlit_session_id(), entry='web')
         
         # Progress tracking
         progress_container = st.container()
@@ -475,16 +348,22 @@ if csv_content:
         with st.spinner("Building your deck..."):
             try:
                 result = builder.build_deck(
-                    csv_content,
+                    collection,
                     format_type,
                     selected_colors if selected_colors else [],
                     commander if format_type == "Commander" else None,
                     additional_notes,
-                    log_callback
+                    log_callback,
+                    regenerate=regenerate,
+                    seed_with_draft=seed_with_draft,
+                    output_mode="json" if structured_output else "markdown"
                 )
                 
                 # Store in session state
                 st.session_state.generated_deck = result
+                st.session_state.preselection = builder.last_preselection
+                st.session_state.deck_json = builder.last_deck.to_json() if builder.last_deck else None
+                st.session_state.deck_context = {'collection': collection, 'commander': commander if format_type == "Commander" else None}
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 color_str = "_".join(selected_colors) if selected_colors else "any"
                 st.session_state.deck_filename = f"deck_{format_type}_{color_str}_{timestamp}.md"
@@ -495,6 +374,88 @@ if csv_content:
             except Exception as e:
                 st.error(f"âŒ Error building deck: {e}")
                 st.stop()
+    
+    # Multi-variant comparison
+    st.markdown("---")
+    st.header("4️⃣ Compare Variants (Optional)")
+    st.caption("Build several variants side by side. They are generated in parallel, so ten variants take about as long as one.")
+    
+    variant_mode = st.radio(
+        "Vary by",
+        options=["Color pairs", "Commanders"],
+        horizontal=True
+    )
+    
+    if variant_mode == "Color pairs":
+        pair_colors = st.multiselect(
+            "Colors to pair",
+            options=COLOR_NAMES,
+            default=selected_colors if len(selected_colors) >= 2 else COLOR_NAMES,
+            help="Every two-color combination of these colors becomes one variant"
+        )
+        variants = color_combination_variants(
+            format_type, 2, pair_colors,
+            commander if format_type == "Commander" else None,
+            additional_notes
+        )
+    else:
+        commander_list = st.text_area(
+            "Candidate commanders (one per line)",
+            placeholder="Aang, Avatar\nKatara, Waterbending Master"
+        )
+        variants = commander_variants(commander_list.splitlines(), selected_colors, additional_notes)
+    
+    max_workers = st.slider("Parallel builds", min_value=1, max_value=10, value=4)
+    st.info(f"📊 {len(variants)} variant(s) will be built")
+    
+    if st.button("🚀 Build Variants", use_container_width=True, disabled=not variants):
+        api_key = get_api_key()
+        if not api_key:
+            st.error("❌ GEMINI_API_KEY not found! Please add it to Streamlit secrets or .env file!")
+            st.stop()
+        
+        session_id = streamlit_session_id()
+        st.session_state.variant_decks = []
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+        finished = st.empty()
+        
+        # Workers never touch Streamlit; each deck is shown here as soon as it finishes
+        make_builder = lambda: MagicDeckBuilder(api_key, session_id=session_id, entry='web')
+        for done, (variant, deck, elapsed) in enumerate(
+                build_variants(make_builder, collection, variants, max_workers,
+                               progress_callback=lambda message: None, regenerate=regenerate), 1):
+            label = variant_label(variant)
+            st.session_state.variant_decks.append({'label': label, 'deck': deck, 'seconds': elapsed})
+            progress_bar.progress(int(done / len(variants) * 100))
+            status_text.text(f"✅ {done}/{len(variants)} finished - {label} ({elapsed:.1f}s)")
+            with finished.container():
+                for built in st.session_state.variant_decks:
+                    with st.expander(f"🃏 {built['label']} ({built['seconds']:.1f}s)"):
+                        st.markdown(built['deck'])
+        
+        # The full results (with downloads) are listed below
+        finished.empty()
+        status_text.success(f"✅ Built {len(variants)} variant(s)!")
+
+# Queued build (survives page reloads through the URL)
+if 'deck_job' in st.query_params:
+    show_deck_job(st.query_params['deck_job'])
+
+# Display variant results
+if st.session_state.variant_decks:
+    st.markdown("---")
+    st.header("🔀 Variant Decks")
+    for idx, variant in enumerate(st.session_state.variant_decks):
+        with st.expander(f"🃏 {variant['label']} ({variant['seconds']:.1f}s)"):
+            st.download_button(
+                label="💾 Download Deck as Markdown",
+                data=variant['deck'],
+                file_name=f"deck_variant_{idx + 1}.md",
+                mime="text/markdown",
+                key=f"variant_download_{idx}"
+            )
+            st.markdown(variant['deck'])
 
 # Display results
 if st.session_state.generated_deck:
@@ -512,9 +473,34 @@ if st.session_state.generated_deck:
             use_container_width=True,
             type="primary"
         )
+        if st.session_state.deck_json:
+            st.download_button(
+                label="🧾 Download Deck as JSON",
+                data=st.session_state.deck_json,
+                file_name=st.session_state.deck_filename.replace('.md', '.json'),
+                mime="application/json",
+                use_container_width=True
+            )
+    
+    # Show what was left out of the prompt for large collections
+    preselection = st.session_state.preselection
+    if preselection and preselection['pruned']:
+        with st.expander(f"✂️ Pruned cards ({len(preselection['pruned'])} of {preselection['unique']} not sent to the AI)"):
+            st.caption("Your collection was too large to send in full, so only the best candidates per role were kept.")
+            st.write(", ".join(f"{role}: {count}" for role, count in preselection['per_role'].items()))
+            st.dataframe(pd.DataFrame(preselection['pruned']), use_container_width=True, hide_index=True)
     
-    # Display deck
-    st.markdown(st.session_state.generated_deck)
+    # Display deck with its goldfish simulation alongside
+    deck_col, sim_col = st.columns([3, 2])
+    with deck_col:
+        st.markdown(st.session_state.generated_deck)
+    with sim_col:
+        if st.session_state.deck_context:
+            show_goldfish(
+                st.session_state.generated_deck,
+                st.session_state.deck_context['collection'],
+                st.session_state.deck_context['commander']
+            )
 
 # Help section
 st.markdown("---")
@@ -535,6 +521,8 @@ with st.expander("â„¹ï¸ Help & Tips"):
     - Be specific in your additional notes (e.g., "aggressive strategy" vs "control")
     - For Commander, let the AI choose the commander if you're unsure
     - The AI will only use cards from your collection and suggest upgrades separately
+    - Repeating the exact same request returns the cached deck instantly; check **Regenerate deck** for a new one
+    - **Instant Local Draft** builds a legal deck in milliseconds without AI; **Seed AI with a local draft** asks the AI to refine it
     
     ### Deck Format Requirements:
     - **Commander**: 100 cards including commander, singleton format
@@ -0,0 +1,140 @@
+import time
+
+import streamlit as st
+
+from collection_cache import parse_collection
+from deck_variants import COLOR_NAMES
+
+PAGE_SIZES = [25, 50, 100]
+RESULT_COLUMNS = ['Name', 'Mana Cost', 'Type Line', 'Card color(s)', 'Rarity', 'Set code', 'Quantity', 'Card Text']
+
+st.title("🔎 Collection Search")
+st.markdown("""
+Browse and search your collection by name, card text, color identity, mana value, rarity and set.
+""")
+
+if 'search_page' not in st.session_state:
+    st.session_state.search_page = 1
+
+# Pick the collection: the cleaned one from the Card Collection Manager or a fresh upload
+sources = []
+if st.session_state.get('cleaned_collection') is not None:
+    sources.append(f"Cleaned data ({st.session_state.get('cleaned_csv_name') or 'collection'})")
+sources.append("Upload a CSV")
+source = st.radio("Collection", sources, horizontal=True)
+
+collection = None
+if source == "Upload a CSV":
+    uploaded_file = st.file_uploader("Choose a CSV file", type=['csv'])
+    if uploaded_file is not None:
+        collection = parse_collection(uploaded_file.getvalue().decode('utf-8'))
+else:
+    collection = st.session_state.cleaned_collection
+
+if collection is None:
+    st.info("Process a collection in the **Card Collection Manager** or upload a CSV to search it.")
+    st.stop()
+
+# Built once per collection content and shared by every session searching it
+with st.spinner("Indexing collection..."):
+    index = collection.search_index
+
+# Filters
+col1, col2 = st.columns(2)
+with col1:
+    name = st.text_input("Name", placeholder="e.g. katara")
+with col2:
+    text = st.text_input("Card text", placeholder="e.g. create ally token")
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    colors = st.multiselect("Fits color identity", COLOR_NAMES, help="Cards playable in a deck of these colors")
+with col2:
+    rarities = st.multiselect("Rarity", index.rarity_options())
+with col3:
+    sets = st.multiselect("Set", index.set_options())
+
+low, high = index.cmc_bounds()
+cmc_range = None
+if high > low:
+    selected_range = st.slider("Mana value", low, high, (low, high))
+    # Only filter when narrowed, so cards without a mana value stay visible by default
+    if selected_range != (low, high):
+        cmc_range = selected_range
+
+filters = dict(name=name, text=text, colors=colors, cmc_range=cmc_range, rarities=rarities, sets=sets)
+
+# New filters or page size start again at the first page
+page_size = st.session_state.get('search_page_size', PAGE_SIZES[1])
+signature = (collection.key, page_size, repr(sorted(filters.items())))
+if st.session_state.get('search_signature') != signature:
+    st.session_state.search_signature = signature
+    st.session_state.search_page = 1
+
+start = time.perf_counter()
+total, rows = index.search(page=st.session_state.search_page, page_size=page_size, **filters)
+elapsed_ms = (time.perf_counter() - start) * 1000
+
+pages = max(1, -(-total // page_size))
+st.caption(f"{total:,} of {len(index):,} cards match · {elapsed_ms:.1f} ms")
+
+columns = [column for column in RESULT_COLUMNS if column in rows.columns]
+st.dataframe(rows[columns], use_container_width=True, hide_index=True)
+
+# Pagination
+col1, col2, col3, col4 = st.columns([1, 2, 1, 2])
+with col1:
+    if st.button("◀ Previous", disabled=st.session_state.search_page <= 1, use_container_width=True):
+        st.session_state.search_page -= 1
+        st.rerun()
+with col2:
+    st.markdown(f"Page **{st.session_state.search_page}** of **{pages}**")
+with col3:
+    if st.button("Next ▶", disabled=st.session_state.search_page >= pages, use_container_width=True):
+        st.session_state.search_page += 1
+        st.rerun()
+with col4:
+    st.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(page_size), key='search_page_size')
+
+# Substitutes: cards whose oracle text reads most like a chosen card (TF-IDF, no AI call)
+st.markdown("---")
+st.subheader("🧬 Similar Cards")
+name_column = 'Name' if 'Name' in rows.columns else 'Card Name'
+page_names = list(dict.fromkeys(rows[name_column])) if name_column in rows.columns else []
+if not page_names:
+    st.info("Search for a card above to find similar cards in your collection.")
+else:
+    target = st.selectbox("Find cards similar to", page_names)
+    # Vectors are built once per collection content, before the first query is timed
+    with st.spinner("Building similarity index..."):
+        similarity = collection.similarity.build()
+    start = time.perf_counter()
+    matches = similarity.similar(target, k=10)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if not matches:
+        st.info(f"No card in the collection has text like {target}.")
+    else:
+        details = collection.df.drop_duplicates(name_column).set_index(name_column)
+        similar_rows = details.reindex([name for name, _ in matches]).reset_index()
+        similar_rows.insert(1, 'Similarity', [round(score, 2) for _, score in matches])
+        columns = [name_column, 'Similarity'] + [c for c in RESULT_COLUMNS[1:] if c in similar_rows.columns]
+        st.caption(f"Top {len(matches)} by card text similarity · {elapsed_ms:.1f} ms")
+        st.dataframe(similar_rows[columns], use_container_width=True, hide_index=True)
+
+    # Cards that work with it: shared tribes, set mechanics and enabler/payoff themes
+    st.subheader("🕸️ Synergy Cluster")
+    start = time.perf_counter()
+    cluster = collection.synergy.cluster(target, size=16)[1:]
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if not cluster:
+        st.info(f"No card in the collection shares a tribe, mechanic or theme with {target}.")
+    else:
+        st.caption(f"Strongest synergy cluster around {target} · {elapsed_ms:.1f} ms")
+        st.dataframe(
+            [
+                {'Name': name, 'Synergy': round(gain, 2),
+                 'Shared with it': ', '.join(collection.synergy.shared_tags(target, name))}
+                for name, gain in cluster
+            ],
+            use_container_width=True, hide_index=True
+        )
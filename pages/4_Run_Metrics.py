@@ -0,0 +1,95 @@
+import pandas as pd
+import streamlit as st
+
+from run_metrics import default_store
+
+RUN_KINDS = {'Enrichment': 'enrichment', 'Deck builds': 'deck_build'}
+LIMITS = [25, 100, 500]
+LATENCY_COLUMNS = ['p50_ms', 'p99_ms', 'scryfall_p50_ms', 'scryfall_p99_ms', 'gemini_p50_ms', 'gemini_p99_ms']
+
+st.title("📈 Run Metrics")
+st.markdown("""
+How every enrichment and deck-build run went: throughput, cache hit rate, Scryfall and Gemini calls,
+retries and latency. Use it to spot throughput regressions and API quota pressure.
+""")
+
+store = default_store()
+if store is None:
+    st.info("Run metrics are turned off (`RUN_METRICS_DB=off`).")
+    st.stop()
+
+col1, col2 = st.columns([3, 1])
+with col1:
+    kind_label = st.radio("Runs", list(RUN_KINDS), horizontal=True)
+with col2:
+    limit = st.selectbox("Last", LIMITS, index=1)
+
+runs = pd.DataFrame(store.recent(RUN_KINDS[kind_label], limit))
+if runs.empty:
+    st.info(f"No {kind_label.lower()} recorded yet. Runs from the Card Collection Manager, the Deck Builder "
+            f"and the CLIs show up here.")
+    st.stop()
+
+runs['Started'] = pd.to_datetime(runs['started_at'], unit='s')
+# Latencies are NULL for runs without Scryfall or Gemini calls; keep the columns numeric anyway
+runs[LATENCY_COLUMNS] = runs[LATENCY_COLUMNS].apply(pd.to_numeric, errors='coerce')
+runs['rows_per_s'] = runs['rows'] / runs['duration_s'].where(runs['duration_s'] > 0)
+runs['cache_hit_pct'] = 100 * runs['cache_hits'] / runs['cache_lookups'].where(runs['cache_lookups'] > 0)
+runs = runs.set_index('Started')
+
+# Latest run against the median of the runs shown; lower is better for time and failures
+st.subheader(f"Latest run vs. median of {len(runs)}")
+latest, median = runs.iloc[-1], runs.median(numeric_only=True)
+headline = [
+    ("Rows/s", 'rows_per_s', "{:.1f}", 'normal'),
+    ("Duration", 'duration_s', "{:.1f} s", 'inverse'),
+    ("Cache hit rate", 'cache_hit_pct', "{:.0f}%", 'normal'),
+    ("p99 latency", 'p99_ms', "{:.0f} ms", 'inverse'),
+    ("Retries + errors", None, "{:.0f}", 'inverse'),
+]
+for col, (label, column, fmt, delta_color) in zip(st.columns(len(headline)), headline):
+    if column is None:
+        value, typical = latest['retries'] + latest['errors'], median['retries'] + median['errors']
+    else:
+        value, typical = latest[column], median.get(column)
+    if pd.isna(value):
+        col.metric(label, "—")
+    else:
+        delta = None if pd.isna(typical) else fmt.format(value - typical)
+        col.metric(label, fmt.format(value), delta, delta_color=delta_color)
+
+# Trends
+col1, col2 = st.columns(2)
+with col1:
+    st.markdown("**Throughput (rows/s)**")
+    st.line_chart(runs[['rows_per_s']].rename(columns={'rows_per_s': 'rows/s'}))
+    st.markdown("**Call latency (ms)**")
+    latency_columns = [column for column in ('p50_ms', 'p99_ms', 'scryfall_p99_ms', 'gemini_p99_ms')
+                       if runs[column].notna().any()]
+    if latency_columns:
+        st.line_chart(runs[latency_columns])
+    else:
+        st.caption("No Scryfall or Gemini calls in these runs.")
+    st.markdown("**Cache hit rate (%)**")
+    st.line_chart(runs[['cache_hit_pct']].rename(columns={'cache_hit_pct': 'hit %'}))
+with col2:
+    st.markdown("**Duration (s)**")
+    st.line_chart(runs[['duration_s']])
+    st.markdown("**API calls per run**")
+    st.bar_chart(runs[['scryfall_calls', 'gemini_calls']])
+    # Quota pressure: Scryfall rate limits (retries), failed calls and time spent waiting for a Gemini slot
+    st.markdown("**Quota pressure**")
+    st.line_chart(runs[['retries', 'errors', 'gemini_queue_s']])
+
+if runs['input_tokens'].any():
+    st.markdown("**Gemini tokens per run**")
+    st.bar_chart(runs[['input_tokens', 'output_tokens']])
+
+st.subheader("Runs")
+table = runs.reset_index().sort_values('Started', ascending=False)
+st.dataframe(
+    table[['Started', 'entry', 'outcome', 'rows', 'duration_s', 'rows_per_s', 'cache_hit_pct', 'scryfall_calls',
+           'gemini_calls', 'retries', 'errors', 'p50_ms', 'p99_ms', 'gemini_queue_s', 'input_tokens',
+           'output_tokens']].round(2),
+    use_container_width=True, hide_index=True
+)
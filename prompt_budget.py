@@ -0,0 +1,163 @@
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from card_features import REMINDER_TEXT
+from candidate_pool import GENERAL_K, LAND_K, PER_ROLE_K, preselect_candidates
+from deck_drafter import card_name, color_identity, is_fancy
+from instrumentation import span
+from mana import COLORS
+from synergy_graph import SynergyGraph
+
+# Gemini 2.5 Pro takes about 1M input tokens; the default budget is a cost ceiling well below that
+DEFAULT_MAX_PROMPT_TOKENS = 200_000
+# Top-K pruning stops here rather than send the model a pool too small to build a deck from
+MIN_PRUNED_CARDS = 40
+MIN_PRUNE_FACTOR = 1 / 64
+
+TOKEN_PIECE = re.compile(r"\w+|[^\w\s]")
+DOCUMENT_HEADER = re.compile(r"^# [^\n]+\.(?:md|txt)$", re.MULTILINE)
+TRIMMED_NOTE = "(Knowledge base trimmed to fit the prompt budget.)"
+
+
+class PromptTooLarge(ValueError):
+    """Even the most degraded prompt is over budget; the model must not be called"""
+
+
+def max_prompt_tokens() -> int:
+    return int(os.getenv("MAX_PROMPT_TOKENS", str(DEFAULT_MAX_PROMPT_TOKENS)))
+
+
+def estimate_tokens(text: str) -> int:
+    """Local, slightly pessimistic token count: one per punctuation mark, one per word and one
+    more per further 6 characters of long words (Gemini averages about 4 characters a token)
+    """
+    return sum(1 + (len(piece) - 1) // 6 for piece in TOKEN_PIECE.findall(text))
+
+
+def compact_collection_text(cards: List[Dict]) -> str:
+    """The collection as one short line per distinct card instead of a Markdown block per row
+
+    Duplicate printings are merged (fancy if any printing is), reminder text is dropped and
+    colors become WUBRG codes; this roughly halves the tokens of format_collection_for_prompt.
+    """
+    merged: Dict[str, Dict] = {}
+    for card in cards:
+        name = card_name(card)
+        if not name:
+            continue
+        key = name.lower()
+        if key in merged:
+            merged[key]['fancy'] = merged[key]['fancy'] or is_fancy(card)
+            continue
+        identity = color_identity(card)
+        text = REMINDER_TEXT.sub('', card.get('Card Text') or '')
+        merged[key] = {
+            'fields': [
+                name,
+                card.get('Type Line') or '',
+                card.get('Mana Cost') or '',
+                ''.join(color for color in COLORS if color in identity) or 'C',
+                # Power/Toughness is stored as "power.toughness" to dodge spreadsheet date conversion
+                (card.get('Power/Toughness') or '').replace('.', '/', 1),
+                ' '.join(text.split()),
+            ],
+            'fancy': is_fancy(card),
+        }
+
+    lines = [
+        "# USER'S CARD COLLECTION",
+        "One card per line: name; type; mana cost; colors; power/toughness; text; F marks a fancy (foil) copy",
+        "",
+    ]
+    for card in merged.values():
+        lines.append('; '.join(card['fields']) + ('; F' if card['fancy'] else ''))
+    return '\n'.join(lines) + '\n'
+
+
+def trim_knowledge(knowledge: str, max_tokens: int) -> str:
+    """Keep the leading paragraphs of every knowledge document within an equal share of max_tokens"""
+    starts = [match.start() for match in DOCUMENT_HEADER.finditer(knowledge)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    documents = [knowledge[a:b] for a, b in zip(starts, starts[1:] + [len(knowledge)])]
+    share = max_tokens // len(documents)
+
+    kept = []
+    for document in documents:
+        used, paragraphs = 0, []
+        for paragraph in document.strip().split('\n\n'):
+            cost = estimate_tokens(paragraph)
+            if used + cost > share:
+                break
+            paragraphs.append(paragraph)
+            used += cost
+        if paragraphs:
+            kept.append('\n\n'.join(paragraphs))
+    return '\n\n'.join(kept + [TRIMMED_NOTE]) + '\n'
+
+
+def top_k_pruner(commander: Optional[str] = None, additional_notes: str = "",
+                 synergy: Optional[SynergyGraph] = None) -> Callable[[List[Dict], float], List[Dict]]:
+    """Candidate pruning at a fraction of the usual per-role K (see candidate_pool)"""
+    def prune(cards: List[Dict], factor: float) -> List[Dict]:
+        kept, _ = preselect_candidates(
+            cards, commander=commander, additional_notes=additional_notes, synergy=synergy,
+            per_role_k=max(1, int(PER_ROLE_K * factor)), general_k=max(1, int(GENERAL_K * factor)),
+            land_k=max(1, int(LAND_K * factor)),
+        )
+        return kept
+    return prune
+
+
+def fit_prompt(render: Callable[[List[Dict], str, bool], str], cards: List[Dict], knowledge: str,
+               prune: Callable[[List[Dict], float], List[Dict]], max_tokens: Optional[int] = None,
+               log: Optional[Callable[[str], None]] = None) -> Tuple[str, Dict]:
+    """Render the prompt and degrade it until its estimated size fits the token budget
+
+    `render(cards, knowledge, compact)` builds the full prompt. While over budget, in order:
+    1. compact card encoding, 2. trimmed knowledge, 3. top-K pruning of the cards, halving K
+    each round. Every step taken is logged and traced. Raises PromptTooLarge when pruning can't
+    go further, so an oversized prompt never reaches the API.
+    """
+    max_tokens = max_tokens or max_prompt_tokens()
+    log = log or (lambda message: None)
+    compact = False
+    prompt = render(cards, knowledge, compact)
+    tokens = estimate_tokens(prompt)
+    report = {'budget': max_tokens, 'initial_tokens': tokens, 'steps': []}
+
+    def degrade(step: str) -> Tuple[str, int]:
+        with span('prompt_degrade', step=step, tokens_before=tokens) as record:
+            new_prompt = render(cards, knowledge, compact)
+            new_tokens = estimate_tokens(new_prompt)
+            record.update(tokens_after=new_tokens, cards=len(cards))
+        report['steps'].append({'step': step, 'tokens': new_tokens, 'cards': len(cards)})
+        log(f"📉 Prompt over budget ({tokens:,} > {max_tokens:,} tokens): {step} -> ~{new_tokens:,} tokens")
+        return new_prompt, new_tokens
+
+    if tokens > max_tokens:
+        compact = True
+        prompt, tokens = degrade("compact card encoding")
+
+    if tokens > max_tokens:
+        room = max_tokens - estimate_tokens(render(cards, '', compact))
+        knowledge = trim_knowledge(knowledge, max(room, 0))
+        prompt, tokens = degrade("trimmed knowledge base")
+
+    factor = 1.0
+    while tokens > max_tokens:
+        factor /= 2
+        pruned = prune(cards, factor) if factor >= MIN_PRUNE_FACTOR else []
+        if factor >= MIN_PRUNE_FACTOR and len(pruned) >= len(cards):
+            continue
+        if len(pruned) < MIN_PRUNED_CARDS:
+            raise PromptTooLarge(
+                f"Prompt needs ~{tokens:,} tokens, over the {max_tokens:,} token budget (MAX_PROMPT_TOKENS) "
+                f"even after compacting, trimming knowledge and pruning to {len(cards)} cards"
+            )
+        cards = pruned
+        prompt, tokens = degrade(f"top-K pruning to {len(cards)} cards")
+
+    report.update(final_tokens=tokens, cards=len(cards), compact=compact)
+    return prompt, report
@@ -0,0 +1,92 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from cassette import activate, add_cassette_arguments, cassette_from_args
+from instrumentation import summarize
+
+DEFAULT_CSV = os.path.join("collection", "ATLA.csv")
+
+
+def run_once(args: argparse.Namespace, api_key: str) -> Dict:
+    """Enrich the collection, then build a deck from it; returns seconds per phase and the build spans"""
+    from card_updater import MagicCardUpdater
+    from deck_builder import MagicDeckBuilder
+
+    with open(args.csv, encoding='utf-8') as f:
+        csv_content = f.read()
+
+    start = time.perf_counter()
+    updater = MagicCardUpdater(gemini_api_key=api_key if args.verify else None, session_id='benchmark')
+    enriched = updater.update_csv(csv_content)
+    enrich_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    builder = MagicDeckBuilder(api_key, session_id='benchmark', entry='benchmark')
+    deck = builder.build_deck(enriched, args.format, args.colors, args.commander or None, progress_callback=lambda _: None,
+                              regenerate=True)
+    build_seconds = time.perf_counter() - start
+    return {'enrich': enrich_seconds, 'build': build_seconds, 'deck': deck, 'spans': builder.last_spans}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="End-to-end enrichment and deck-building benchmark against recorded Scryfall and Gemini calls",
+        epilog="Record once with network access, then replay anywhere: "
+               "python replay_benchmark.py record cassettes/atla.jsonl && "
+               "python replay_benchmark.py replay cassettes/atla.jsonl --scale 0 --repeat 5")
+    add_cassette_arguments(parser)
+    parser.add_argument('--csv', default=DEFAULT_CSV, help=f"Collection to enrich (default: {DEFAULT_CSV})")
+    parser.add_argument('--format', default='commander', choices=['commander', 'standard'])
+    parser.add_argument('--colors', nargs='*', default=[], help="Color preference, e.g. Green Blue")
+    parser.add_argument('--commander', default='', help="Commander name (optional)")
+    parser.add_argument('--verify', action='store_true', help="Also verify each enriched card with Gemini")
+    parser.add_argument('--repeat', type=int, default=3, help="Replay runs (record always runs once)")
+    args = parser.parse_args()
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if args.mode == 'record' and not api_key:
+        parser.error("recording calls Gemini for real; set GEMINI_API_KEY")
+    # Replay never reaches the API, so any key will do
+    api_key = api_key or "replay"
+
+    # Keep benchmark builds out of the deck cache, the span log and (unless RUN_METRICS_DB is set)
+    # the run metrics of real runs
+    os.environ.setdefault("DECK_CACHE_DIR", tempfile.mkdtemp(prefix="deck_cache_bench_"))
+    os.environ.setdefault("RUN_METRICS_DB", "off")
+    os.environ["BUILD_TRACE_LOG"] = "off"
+
+    runs: List[Dict] = []
+    for run in range(1 if args.mode == 'record' else max(1, args.repeat)):
+        # A fresh cassette per run, so every replay serves the recordings from the start
+        cassette = cassette_from_args(args)
+        activate(cassette)
+        try:
+            runs.append(run_once(args, api_key))
+        finally:
+            activate(None)
+        print(f"Run {run + 1}: enrich {runs[-1]['enrich']:.2f}s, build {runs[-1]['build']:.2f}s "
+              f"({cassette.stats['recorded']} recorded, {cassette.stats['replayed']} replayed, "
+              f"{cassette.stats['unmatched']} unmatched)")
+
+    outcome = next((span.get('outcome') for span in runs[-1]['spans'] if span['span'] == 'build_deck'), None)
+    if outcome != 'ok':
+        print(f"\nBuild did not finish ({outcome}): {runs[-1]['deck'][:300]}")
+        sys.exit(1)
+
+    print(f"\n{'phase':<18}{'median s':>10}{'min s':>9}")
+    for phase in ('enrich', 'build'):
+        seconds = [run[phase] for run in runs]
+        print(f"{phase:<18}{statistics.median(seconds):>10.3f}{min(seconds):>9.3f}")
+
+    print("\nBuild stages (last run)")
+    for row in summarize(runs[-1]['spans']):
+        print(f"  {row['span']:<18}{row['total_s']:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from instrumentation import DISABLED
+
+DEFAULT_DB = os.path.join(".run_metrics", "runs.sqlite3")
+KINDS = {'enrichment': 'enrichment', 'build_deck': 'deck_build'}
+
+# One row per run; latencies are per external call, Gemini's without the wait for a pool slot
+COLUMNS = [
+    'trace_id', 'kind', 'entry', 'session', 'started_at', 'duration_s', 'outcome',
+    'rows', 'cache_hits', 'cache_lookups', 'scryfall_calls', 'gemini_calls', 'retries', 'errors',
+    'p50_ms', 'p99_ms', 'scryfall_p50_ms', 'scryfall_p99_ms', 'gemini_p50_ms', 'gemini_p99_ms',
+    'gemini_queue_s', 'input_tokens', 'output_tokens',
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    trace_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    entry TEXT NOT NULL DEFAULT '',
+    session TEXT NOT NULL DEFAULT '',
+    started_at REAL NOT NULL,
+    duration_s REAL NOT NULL,
+    outcome TEXT NOT NULL DEFAULT '',
+    rows INTEGER NOT NULL DEFAULT 0,
+    cache_hits INTEGER NOT NULL DEFAULT 0,
+    cache_lookups INTEGER NOT NULL DEFAULT 0,
+    scryfall_calls INTEGER NOT NULL DEFAULT 0,
+    gemini_calls INTEGER NOT NULL DEFAULT 0,
+    retries INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    p50_ms REAL,
+    p99_ms REAL,
+    scryfall_p50_ms REAL,
+    scryfall_p99_ms REAL,
+    gemini_p50_ms REAL,
+    gemini_p99_ms REAL,
+    gemini_queue_s REAL NOT NULL DEFAULT 0,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS runs_kind ON runs (kind, started_at);
+"""
+
+
+def percentile_ms(seconds: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of call durations, in milliseconds (None without calls)"""
+    if not seconds:
+        return None
+    ordered = sorted(seconds)
+    return round(1000 * ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+def _failed(call: Dict) -> bool:
+    """Rate limits, server errors and exceptions; a card Scryfall doesn't know is not an error"""
+    status = call.get('status', 200)
+    return 'error' in call or status == 429 or status >= 500
+
+
+def metrics_from_spans(spans: List[Dict]) -> Optional[Dict]:
+    """One run's row from its trace: the root span's counts plus every Scryfall and Gemini call
+
+    Enrichment runs put rows and cache counts on their root span; deck builds get them from
+    the load_collection and cache_lookup stages. Returns None for traces of other kinds.
+    """
+    root = next((span for span in spans if span['parent'] is None), None)
+    if root is None or root['span'] not in KINDS:
+        return None
+    scryfall = [span for span in spans if span['span'] == 'scryfall_call']
+    gemini = [span for span in spans if span['span'] == 'model_call']
+    scryfall_seconds = [span['seconds'] for span in scryfall]
+    gemini_seconds = [span['seconds'] - span.get('queue_seconds', 0) for span in gemini]
+
+    run = {
+        'trace_id': root['trace_id'], 'kind': KINDS[root['span']],
+        'entry': root.get('entry', ''), 'session': root.get('session', ''),
+        'started_at': root['start'], 'duration_s': root['seconds'],
+        'outcome': root.get('outcome') or ('error' if 'error' in root else ''),
+        'rows': root.get('rows', 0), 'cache_hits': root.get('cache_hits', 0),
+        'cache_lookups': root.get('cache_lookups', 0),
+        'scryfall_calls': len(scryfall), 'gemini_calls': len(gemini),
+        'retries': sum(1 for span in scryfall if span.get('attempt')),
+        'errors': sum(1 for span in scryfall + gemini if _failed(span)),
+        'p50_ms': percentile_ms(scryfall_seconds + gemini_seconds, 0.5),
+        'p99_ms': percentile_ms(scryfall_seconds + gemini_seconds, 0.99),
+        'scryfall_p50_ms': percentile_ms(scryfall_seconds, 0.5),
+        'scryfall_p99_ms': percentile_ms(scryfall_seconds, 0.99),
+        'gemini_p50_ms': percentile_ms(gemini_seconds, 0.5),
+        'gemini_p99_ms': percentile_ms(gemini_seconds, 0.99),
+        'gemini_queue_s': round(sum(span.get('queue_seconds', 0) for span in gemini), 3),
+        'input_tokens': sum(span.get('input_tokens', 0) for span in gemini),
+        'output_tokens': sum(span.get('output_tokens', 0) for span in gemini),
+    }
+    if run['kind'] == 'deck_build':
+        for span in spans:
+            if span['span'] == 'load_collection':
+                run['rows'] = span.get('cards', 0)
+            elif span['span'] == 'cache_lookup' and not span.get('skipped'):
+                run['cache_lookups'] += 1
+                run['cache_hits'] += int(bool(span.get('hit')))
+    return run
+
+
+class RunMetrics:
+    """SQLite store of per-run metrics for enrichment and deck builds, read by the Run Metrics page
+
+    Each call opens its own connection, so builder threads and job workers can all record.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("RUN_METRICS_DB", DEFAULT_DB)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def record(self, run: Dict):
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                [run.get(column) for column in COLUMNS],
+            )
+
+    def recent(self, kind: Optional[str] = None, limit: int = 200) -> List[Dict]:
+        """Latest runs, oldest first (ready to chart)"""
+        query, params = "SELECT * FROM runs", []
+        if kind:
+            query, params = query + " WHERE kind = ?", [kind]
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY started_at DESC LIMIT ?", params + [limit]).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+
+_stores: Dict[str, RunMetrics] = {}
+_stores_lock = threading.Lock()
+
+
+def default_store() -> Optional[RunMetrics]:
+    """Store at $RUN_METRICS_DB (default .run_metrics/runs.sqlite3); "off" disables run metrics"""
+    path = os.getenv("RUN_METRICS_DB", DEFAULT_DB)
+    if path.strip().lower() in DISABLED:
+        return None
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = RunMetrics(path)
+        return _stores[path]
+
+
+def record_run(spans: List[Dict]):
+    """Tracer on_finish hook: turn a finished enrichment or build trace into a metrics row"""
+    store = default_store()
+    run = metrics_from_spans(spans)
+    if store is not None and run is not None:
+        store.record(run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show recent enrichment and deck-build run metrics")
+    parser.add_argument('--kind', choices=sorted(set(KINDS.values())), help="Only this kind of run")
+    parser.add_argument('--last', type=int, default=20, help="Number of runs (default: 20)")
+    parser.add_argument('--db', default=os.getenv("RUN_METRICS_DB", DEFAULT_DB),
+                        help=f"Metrics database (default: $RUN_METRICS_DB or {DEFAULT_DB})")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"no run metrics at {args.db}")
+    runs = RunMetrics(args.db).recent(args.kind, args.last)
+    print(f"{'kind':<12}{'outcome':<10}{'rows':>6}{'secs':>8}{'hit %':>7}{'scryfall':>9}{'gemini':>7}"
+          f"{'retries':>8}{'errors':>7}{'p50 ms':>9}{'p99 ms':>9}")
+    for run in runs:
+        hit_rate = f"{100 * run['cache_hits'] / run['cache_lookups']:.0f}" if run['cache_lookups'] else '-'
+        print(f"{run['kind']:<12}{run['outcome']:<10}{run['rows']:>6}{run['duration_s']:>8.1f}{hit_rate:>7}"
+              f"{run['scryfall_calls']:>9}{run['gemini_calls']:>7}{run['retries']:>8}{run['errors']:>7}"
+              f"{run['p50_ms'] or 0:>9.0f}{run['p99_ms'] or 0:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
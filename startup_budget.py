@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import List, Dict, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that take a noticeable share of a second to import and are only needed on some paths
+HEAVY_MODULES = ['google.generativeai', 'pandas', 'numpy', 'requests']
+
+# Entry point -> (file to run, seconds allowed, heavy modules it must not load).
+# Budgets are generous for a laptop; they catch a new top-level import, not small jitter.
+BUDGETS = {
+    'landing page': ('app.py', 1.0, ['google.generativeai', 'pandas', 'requests']),
+    'collection manager page': ('pages/1_Card_Collection_Manager.py', 2.0, ['google.generativeai', 'requests']),
+    'deck builder page': ('pages/2_Deck_Builder.py', 2.5, ['google.generativeai', 'requests']),
+    'collection search page': ('pages/3_Collection_Search.py', 2.0, ['google.generativeai', 'requests']),
+    'run metrics page': ('pages/4_Run_Metrics.py', 2.0, ['google.generativeai', 'requests']),
+    'deck builder CLI': ('deck_builder.py', 0.3, ['google.generativeai', 'numpy', 'pandas', 'requests']),
+    'cleanup CLI': ('data_clean/fix_existing_data.py', 0.3, ['google.generativeai', 'pandas', 'requests']),
+}
+
+# Runs in a fresh interpreter: executes the entry point without its __main__ block, then
+# reports the wall time, which heavy modules ended up loaded and any exception it raised.
+# Pages run in Streamlit's bare mode, where st.stop() would not stop; the probe makes it end
+# the script as it does in a real session, so only genuine crashes are reported
+_PROBE = """
+import json, runpy, sys, time
+preloaded = list(sys.modules)
+start = time.perf_counter()
+sys.path[:0] = [{root!r}, {entry_dir!r}]
+
+class PageStopped(Exception):
+    pass
+
+def stop():
+    raise PageStopped()
+
+if {page!r}:
+    import streamlit
+    streamlit.stop = stop
+error = None
+try:
+    runpy.run_path({path!r}, run_name='startup_probe')
+except PageStopped:
+    pass
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'preloaded': preloaded, 'error': error,
+                  'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def probe(path: str) -> Tuple[Dict, List[Tuple[int, int, str]]]:
+    """Run one cold start; returns the probe result and the -X importtime rows"""
+    full_path = os.path.join(ROOT, path)
+    page = path == 'app.py' or path.startswith('pages/')
+    code = _PROBE.format(root=ROOT, entry_dir=os.path.dirname(full_path), path=full_path, heavy=HEAVY_MODULES,
+                         page=page)
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', PYTHONWARNINGS='ignore')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{path} failed to start:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return result, rows
+
+
+def top_imports(rows: List[Tuple[int, int, str]], preloaded: List[str], limit: int) -> List[Tuple[float, str]]:
+    """Slowest imports requested directly by the entry point (nested imports roll up into them)"""
+    skip = set(preloaded)
+    direct = [
+        (cumulative, name.strip()) for _, cumulative, name in rows
+        if not name.startswith('  ') and name.strip() not in skip
+    ]
+    return [(us / 1e6, name) for us, name in sorted(direct, reverse=True)[:limit]]
+
+
+def check(name: str, runs: int = 3, top: int = 8, scale: float = 1.0) -> bool:
+    path, budget, forbidden = BUDGETS[name]
+    budget *= scale
+    timings, loaded, rows, result = [], set(), [], {}
+    for _ in range(runs):
+        result, rows = probe(path)
+        timings.append(result['seconds'])
+        loaded.update(result['loaded'])
+
+    median = statistics.median(timings)
+    unexpected = sorted(loaded & set(forbidden))
+    ok = median <= budget and not unexpected and not result.get('error')
+
+    print(f"{'✅' if ok else '❌'} {name} ({path}): {median:.2f}s median of {runs} (budget {budget:.2f}s)")
+    if result.get('error'):
+        print(f"   raised {result['error']}")
+    if loaded:
+        print(f"   heavy modules loaded: {', '.join(sorted(loaded))}")
+    if unexpected:
+        print(f"   should be deferred: {', '.join(unexpected)}")
+    for seconds, module in top_imports(rows, result['preloaded'], top):
+        print(f"   {seconds:6.3f}s  {module}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure cold-start time of the app and CLIs and fail when an entry point exceeds its budget"
+    )
+    parser.add_argument('entries', nargs='*', metavar='ENTRY',
+                        help=f"Entry points to check (default: all of {', '.join(BUDGETS)})")
+    parser.add_argument('--runs', type=int, default=3, help="Cold starts per entry point (default: 3)")
+    parser.add_argument('--top', type=int, default=8, help="Slowest direct imports to list (default: 8)")
+    parser.add_argument('--scale', type=float, default=float(os.getenv("STARTUP_BUDGET_SCALE", "1")),
+                        help="Multiply every budget, e.g. 2 on slow CI machines (default: $STARTUP_BUDGET_SCALE or 1)")
+    args = parser.parse_args()
+    unknown = [entry for entry in args.entries if entry not in BUDGETS]
+    if unknown:
+        parser.error(f"unknown entry point(s): {', '.join(unknown)}")
+
+    results = [check(name, args.runs, args.top, args.scale) for name in (args.entries or BUDGETS)]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import math
+import re
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from card_features import _CardTexts, _creature_types
+
+# Each theme lists enabler patterns (the card makes or is the thing) and payoff patterns (the card
+# rewards it). Like ROLE_PATTERNS, every pattern starts with a literal so the regex engine can skip ahead.
+SYNERGY_THEMES = {
+    'tokens': (
+        [r"creates? (?:a|an|one|two|three|four|five|x|that many|\d+) .{0,80}?tokens?", r"populate"],
+        [r"whenever (?:a|another|one or more) (?:other )?(?:nontoken )?creatures? (?:you control )?enters?",
+         r"for each creature you control", r"creatures you control get \+"],
+    ),
+    'counters': (
+        [r"put (?:a|an|one|two|three|x|that many|\d+) \+1/\+1 counters?", r"proliferate"],
+        [r"with (?:a|one or more) \+1/\+1 counters? on (?:it|them)", r"for each \+1/\+1 counter", r"proliferate"],
+    ),
+    'graveyard': (
+        [r"mills? (?:a|one|two|three|four|five|x|that many|\d+) cards?", r"surveil",
+         r"discards? (?:a|one|two|x|that) cards?"],
+        [r"from your graveyard", r"flashback", r"cards? in your graveyard"],
+    ),
+    'lifegain': (
+        [r"gains? (?:\d+|x|that much) life", r"lifelink"],
+        [r"whenever you gain life", r"if you gained life"],
+    ),
+    'spells': (
+        [],  # Instants and sorceries themselves, from the type line
+        [r"whenever you cast (?:a|an|your) (?:instant|sorcery|noncreature)", r"prowess",
+         r"instant and sorcery spells you cast"],
+    ),
+    'artifacts': (
+        [r"creates? (?:a|an|one|two|three|x|\d+) (?:tapped )?(?:treasure|clue|food|map) tokens?"],
+        [r"whenever (?:an|another|one or more) (?:other )?(?:nontoken )?artifacts? (?:you control )?enters?",
+         r"for each artifact you control", r"sacrifice an artifact"],
+    ),
+    'sacrifice': (
+        [r"sacrifice (?:a|another) (?:creature|nonland permanent|permanent)"],
+        [r"whenever (?:a|another) (?:nontoken )?creature (?:you control )?dies"],
+    ),
+}
+# Set mechanics: cards that bend are enablers, "whenever you waterbend" cards are payoffs
+MECHANICS = {
+    mechanic: ([mechanic], [f"whenever you {mechanic}"])
+    for mechanic in ('waterbend', 'airbend', 'earthbend', 'firebend')
+}
+# Card types that are themselves enablers of a theme
+TYPE_THEMES = {'Instant': 'theme:spells', 'Sorcery': 'theme:spells', 'Artifact': 'theme:artifacts'}
+
+_PATTERNS = [
+    (f"{kind}:{name}", side, [re.compile(p) for p in patterns])
+    for kind, themes in (('theme', SYNERGY_THEMES), ('mechanic', MECHANICS))
+    for name, (enablers, payoffs) in themes.items()
+    for side, patterns in (('e', enablers), ('p', payoffs)) if patterns
+]
+
+# Edge weight per pair of sides: an enabler feeding a payoff counts most
+_SIDE_WEIGHTS = {('e', 'e'): 0.5, ('e', 'p'): 1.0, ('p', 'e'): 1.0, ('p', 'p'): 0.5}
+_PAIR = {
+    (a, b): max(_SIDE_WEIGHTS[x, y] for x in a for y in b)
+    for a in ('e', 'p', 'ep') for b in ('e', 'p', 'ep')
+}
+
+
+def _column(df: pd.DataFrame, *names: str) -> pd.Series:
+    for name in names:
+        if name in df.columns:
+            return df[name].fillna('').astype(str)
+    return pd.Series([''] * len(df), index=df.index, dtype=object)
+
+
+def _distinct_cards(df: pd.DataFrame) -> Tuple[List[str], List[str], List[str]]:
+    """Names, oracle texts and front type lines of the first row per card name"""
+    names = _column(df, 'Name', 'Card Name').str.strip()
+    keys = names.str.lower()
+    first = ~keys.duplicated() & keys.ne('')
+    type_lines = _column(df, 'Type Line')[first].str.split('//').str[0].str.strip()
+    return names[first].tolist(), _column(df, 'Card Text')[first].tolist(), type_lines.tolist()
+
+
+def _add_side(tags: Dict[str, str], tag: str, side: str):
+    tags[tag] = ''.join(sorted(set(tags.get(tag, '')) | {side}))
+
+
+def card_tags(texts: List[str], type_lines: List[str]) -> List[Dict[str, str]]:
+    """Synergy tags per card: {"tribe:Ally": "e", "theme:tokens": "ep", ...}
+
+    "e" marks an enabler (the card is an Ally, makes tokens), "p" a payoff (it rewards Allies or
+    tokens). Patterns run once per distinct text, like extract_features.
+    """
+    codes, unique_texts = pd.factorize(pd.Series(texts, dtype=object))
+    unique_tags: List[Dict[str, str]] = [{} for _ in range(len(unique_texts))]
+    if len(unique_texts):
+        card_texts = _CardTexts(unique_texts)
+        for tag, side, patterns in _PATTERNS:
+            for row in np.flatnonzero(card_texts.mask(patterns)).tolist():
+                _add_side(unique_tags[row], tag, side)
+        # Creature types named in the text: tokens it creates, lords and tribal payoffs
+        for row, types in enumerate(_creature_types(card_texts)):
+            for creature_type in filter(None, types.split(', ')):
+                _add_side(unique_tags[row], f"tribe:{creature_type}", 'p')
+
+    tags = []
+    for code, type_line in zip(codes, type_lines):
+        card = dict(unique_tags[code])
+        supertypes, _, subtypes = type_line.partition('—')
+        if 'Creature' in supertypes or 'Kindred' in supertypes:
+            for creature_type in subtypes.split():
+                _add_side(card, f"tribe:{creature_type}", 'e')
+        for card_type, tag in TYPE_THEMES.items():
+            if card_type in supertypes:
+                _add_side(card, tag, 'e')
+        tags.append(card)
+    return tags
+
+
+class SynergyGraph:
+    """Weighted synergy graph between the distinct cards of a collection
+
+    Cards are linked when they share a tribe, a set mechanic or an enabler/payoff theme (see
+    card_tags). The graph is stored sparsely as card -> tags and tag -> cards; a card's adjacency
+    row is summed from the tags it has when first asked for and kept until a card sharing one of
+    those tags changes. Each tag's weight shrinks with its size, so sharing "Ally" in a collection
+    of 40 Allies means more than sharing "Human" with 900 other cards.
+
+    The graph is built incrementally: `sync` only analyzes cards that are new or whose text
+    changed, and collection_cache starts a re-uploaded collection from a copy of its previous
+    version's graph.
+    """
+
+    def __init__(self):
+        self.cards: Dict[str, Dict[str, str]] = {}
+        self.names: Dict[str, str] = {}
+        self.signatures: Dict[str, str] = {}
+        self.members: Dict[str, Dict[str, str]] = defaultdict(dict)
+        self._adjacency: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def from_collection(cls, df: pd.DataFrame) -> "SynergyGraph":
+        graph = cls()
+        graph.sync(df)
+        return graph
+
+    @classmethod
+    def from_cards(cls, cards: List[Dict]) -> "SynergyGraph":
+        return cls.from_collection(pd.DataFrame(cards))
+
+    def copy(self) -> "SynergyGraph":
+        """Independent copy to sync another collection from (adjacency rows are rebuilt on demand)"""
+        graph = SynergyGraph()
+        graph.cards = dict(self.cards)
+        graph.names = dict(self.names)
+        graph.signatures = dict(self.signatures)
+        graph.members = defaultdict(dict, {tag: dict(cards) for tag, cards in self.members.items()})
+        return graph
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __contains__(self, name: str) -> bool:
+        return name.strip().lower() in self.cards
+
+    def _invalidate(self, tags: Iterable[str]):
+        for tag in tags:
+            for key in self.members.get(tag, ()):
+                self._adjacency.pop(key, None)
+
+    def _remove(self, key: str) -> Dict[str, str]:
+        tags = self.cards.pop(key)
+        for tag in tags:
+            self.members[tag].pop(key, None)
+            if not self.members[tag]:
+                del self.members[tag]
+        self.names.pop(key, None)
+        self.signatures.pop(key, None)
+        self._adjacency.pop(key, None)
+        return tags
+
+    def add_cards(self, df: pd.DataFrame) -> int:
+        """Add the cards in `df`, replacing any already in the graph; returns how many were tagged"""
+        names, texts, type_lines = _distinct_cards(df)
+        touched = set()
+        for name, text, type_line, tags in zip(names, texts, type_lines, card_tags(texts, type_lines)):
+            key = name.lower()
+            if key in self.cards:
+                touched.update(self._remove(key))
+            self.cards[key] = tags
+            self.names[key] = name
+            self.signatures[key] = f"{text}\x1f{type_line}"
+            for tag, sides in tags.items():
+                self.members[tag][key] = sides
+            touched.update(tags)
+        # Rows of every card sharing a touched tag are stale (new neighbors, new tag weights)
+        self._invalidate(touched)
+        return len(names)
+
+    def remove_cards(self, names: Iterable[str]) -> int:
+        keys = [key for key in {name.strip().lower() for name in names} if key in self.cards]
+        touched = set()
+        for key in keys:
+            touched.update(self._remove(key))
+        self._invalidate(touched)
+        return len(keys)
+
+    def sync(self, df: pd.DataFrame) -> Dict[str, int]:
+        """Make the graph hold exactly the cards in `df`, tagging only new or changed ones"""
+        names, texts, type_lines = _distinct_cards(df)
+        incoming = {
+            name.lower(): f"{text}\x1f{type_line}" for name, text, type_line in zip(names, texts, type_lines)
+        }
+        removed = self.remove_cards([key for key in self.cards if key not in incoming])
+        changed = {key for key, signature in incoming.items() if self.signatures.get(key) != signature}
+        updated = len(changed & set(self.cards))
+        if changed:
+            keys = _column(df, 'Name', 'Card Name').str.strip().str.lower()
+            self.add_cards(df[np.fromiter((key in changed for key in keys), dtype=bool, count=len(df))])
+        return {'added': len(changed) - updated, 'updated': updated, 'removed': removed}
+
+    def tag_weight(self, tag: str) -> float:
+        return 1 / math.log2(1 + len(self.members.get(tag, ())))
+
+    def _row(self, key: str) -> Dict[str, float]:
+        row = self._adjacency.get(key)
+        if row is None:
+            row = defaultdict(float)
+            for tag, sides in self.cards[key].items():
+                weight = self.tag_weight(tag)
+                for other, other_sides in self.members[tag].items():
+                    if other != key:
+                        row[other] += weight * _PAIR[sides, other_sides]
+            row = self._adjacency[key] = dict(row)
+        return row
+
+    def weight(self, a: str, b: str) -> float:
+        """Synergy between two cards (0 when they share nothing or either is unknown)"""
+        a, b = a.strip().lower(), b.strip().lower()
+        if a not in self.cards or b not in self.cards:
+            return 0.0
+        return self._row(a).get(b, 0.0)
+
+    def weights(self, name: str) -> Dict[str, float]:
+        """Synergy of every linked card with `name`, keyed by lowercased card name"""
+        key = name.strip().lower()
+        return self._row(key) if key in self.cards else {}
+
+    def shared_tags(self, a: str, b: str) -> List[str]:
+        """Tags two cards have in common, i.e. why they are linked"""
+        tags_a = self.cards.get(a.strip().lower(), {})
+        return sorted(set(tags_a) & set(self.cards.get(b.strip().lower(), {})))
+
+    def neighbors(self, name: str, k: Optional[int] = 10,
+                  accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """Cards with the most synergy with `name`, best first"""
+        ranked = sorted(self.weights(name).items(), key=lambda item: (-item[1], item[0]))
+        results = []
+        for key, weight in ranked:
+            if accept is None or accept(self.names[key]):
+                results.append((self.names[key], weight))
+                if len(results) == k:
+                    break
+        return results
+
+    def cluster(self, name: str, size: int = 20,
+                accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """Strongest synergy cluster around a card (typically the commander), seed first
+
+        Greedy: each step adds the card with the most synergy to the cards picked so far, with
+        synergy to the seed counted double so the cluster stays centred on it. Each card comes
+        with the gain it added. `accept` can veto cards (off-color, not legal...).
+        """
+        seed = name.strip().lower()
+        if seed not in self.cards:
+            return []
+        gains = defaultdict(float)
+        for key, weight in self._row(seed).items():
+            gains[key] += 2 * weight
+        picked = [(self.names[seed], 0.0)]
+        closed = {seed}
+        while len(picked) < size and gains:
+            best = max(gains, key=gains.get)
+            gain = gains.pop(best)
+            closed.add(best)
+            if gain <= 0 or (accept is not None and not accept(self.names[best])):
+                continue
+            picked.append((self.names[best], gain))
+            for key, weight in self._row(best).items():
+                if key not in closed:
+                    gains[key] += weight
+        return picked